@@ -2,6 +2,8 @@ from django.contrib.auth.models import AbstractUser
 from django.db import models
 from uuid import uuid4
 
+from main.validators import validate_unreserved_slug
+
 
 def get_avatar_uuid(instance, filename):
     ext = filename.split('.')[-1]
@@ -9,7 +11,50 @@ def get_avatar_uuid(instance, filename):
 
 
 class User(AbstractUser):
+    # Aggregates of the user's live images, maintained by images.stats.
+    STATS_FIELDS = ('image_count', 'image_bytes', 'last_upload_at')
+    # Shown on image cards and indexed for search, so saves changing them refresh the user's images.
+    CARD_FIELDS = ('username', 'first_name', 'last_name', 'avatar')
+
+    # AbstractUser's field, with the names of site pages reserved: usernames are board URLs.
+    username = models.CharField(
+        'username',
+        max_length=150,
+        unique=True,
+        help_text='Required. 150 characters or fewer. Letters, digits and @/./+/-/_ only.',
+        validators=[AbstractUser.username_validator, validate_unreserved_slug],
+        error_messages={'unique': 'A user with that username already exists.'},
+    )
     avatar = models.ImageField(upload_to=get_avatar_uuid, blank=True, null=True, verbose_name='avatar')
+    image_count = models.PositiveIntegerField(default=0, editable=False)
+    image_bytes = models.PositiveBigIntegerField(default=0, editable=False)
+    last_upload_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     def __str__(self):
         return self.username
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.track_state()
+        return instance
+
+    def track_state(self):
+        """Remember the card fields as they were loaded."""
+        self._tracked_state = {name: self._meta.get_field(name).value_from_object(self)
+                               for name in self.CARD_FIELDS if name in self.__dict__}
+
+    def get_changed_fields(self, fields=CARD_FIELDS):
+        """The card fields among `fields` whose value differs from the loaded one, or that were not loaded."""
+        tracked = getattr(self, '_tracked_state', None) or dict()
+        return {name for name in fields if name not in tracked
+                or self._meta.get_field(name).value_from_object(self) != tracked[name]}
+
+    def save(self, *args, **kwargs):
+        # A profile saved from an instance loaded earlier must not write back stale image statistics. The
+        # receivers of post_save compare the card fields with get_changed_fields() rather than update_fields.
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name not in self.STATS_FIELDS]
+        super().save(*args, **kwargs)
+        self.track_state()
@@ -64,6 +64,14 @@ class RegisterUserTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTrue(bool(response.context['form'].errors), "The form must contain errors")
 
+    def test_register_user_with_reserved_username(self):
+        data_auth = self.user
+        data_auth['username'] = 'search'
+
+        response = self.client.post(self.url, data_auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('username', response.context['form'].errors)
+
     def test_register_user_with_exist_email(self):
         data_auth = self.user
         data_auth['email'] = self.old_user['email']
@@ -6,14 +6,18 @@ from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 from drf_spectacular.utils import extend_schema_field
 
+from main.instrumentation import TimedSerializerMixin
 
-class AccountSerializer(serializers.ModelSerializer):
+
+class AccountSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     open_url = serializers.SerializerMethodField()
     avatar_url = serializers.SerializerMethodField()
 
     class Meta:
         model = get_user_model()
-        fields = ['id', 'open_url', 'avatar_url', 'email', 'username', 'first_name', 'last_name']
+        fields = ['id', 'open_url', 'avatar_url', 'email', 'username', 'first_name', 'last_name',
+                  'image_count', 'image_bytes', 'last_upload_at']
+        read_only_fields = ['image_count', 'image_bytes', 'last_upload_at']
 
     @extend_schema_field(serializers.CharField())
     def get_open_url(self, obj):
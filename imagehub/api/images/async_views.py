@@ -0,0 +1,171 @@
+from urllib.parse import unquote
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.http import JsonResponse
+from django.views import View
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from images.fragments import render_image_items
+from images.models import Category, Image
+from images.neighbors import ACCOUNT, CATEGORY, get_following_queryset
+from images.sampling import sample_live_images
+
+from .pagination import AsyncImagePagination
+from .serializers import ImageSerializer
+
+
+def json_response(data, status=200, **kwargs):
+    # Encoded like DRF's JSONRenderer, so both read paths return byte-identical bodies.
+    return JsonResponse(data, status=status, safe=False,
+                        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')}, **kwargs)
+
+
+class AsyncAPIView(View):
+    """
+    Read-only JSON endpoint for ASGI deployments.
+
+    Authenticates JWT bearer tokens like the DRF views and converts DRF API
+    exceptions into the same error payloads, but runs its handlers as
+    coroutines so a request waiting on the database does not hold a thread.
+    """
+    authenticator = JWTAuthentication()
+
+    async def dispatch(self, request, *args, **kwargs):
+        request = self.request = Request(request)
+        try:
+            result = await sync_to_async(self.authenticator.authenticate)(request)
+            request.user = result[0] if result else AnonymousUser()
+            return await super().dispatch(request, *args, **kwargs)
+        except APIException as error:
+            detail = error.detail if isinstance(error.detail, (list, dict)) else {'detail': error.detail}
+            response = json_response(detail, status=error.status_code)
+            if error.status_code == 401:
+                response['WWW-Authenticate'] = self.authenticator.authenticate_header(request)
+            return response
+
+    def get_serializer_context(self):
+        return {'request': self.request, 'format': None, 'view': self}
+
+
+class RandomImageListView(AsyncAPIView):
+    async def get(self, request, *args, **kwargs):
+        exclude = unquote(request.query_params.get('exclude', ''))
+        exclude = [int(_) for _ in exclude.split(',') if _.isdigit()]
+
+        # Sampling is a short sequence of dependent primary key lookups, run together off the event loop.
+        images = await sync_to_async(sample_live_images)(10, exclude=exclude)
+
+        if request.query_params.get('html'):
+            return JsonResponse(await sync_to_async(render_image_items)(images, request), safe=False)
+
+        serializer = ImageSerializer(images, many=True, context=self.get_serializer_context())
+        return json_response(serializer.data)
+
+
+class ImageListView(AsyncAPIView):
+    """Paginated image list; subclasses set `queryset` or override get_queryset() when it depends on the request."""
+    queryset = None
+    account = False
+
+    async def get_queryset(self):
+        assert self.queryset is not None, (
+            f'{self.__class__.__name__} should either include a `queryset` attribute, or override get_queryset()'
+        )
+        # Cloned, so results cached on the class attribute never leak between requests.
+        return self.queryset.all()
+
+    async def get(self, request, *args, **kwargs):
+        paginator = AsyncImagePagination()
+        page = await paginator.apaginate_queryset(await self.get_queryset(), request)
+
+        if request.query_params.get('html'):
+            # Cards go through the fragment cache and the CSRF middleware, both synchronous.
+            data = await sync_to_async(render_image_items)(page, request, account=self.account)
+        else:
+            data = ImageSerializer(page, many=True, context=self.get_serializer_context()).data
+        return json_response(paginator.get_paginated_data(data))
+
+
+class RecentsImageListView(ImageListView):
+    queryset = Image.live.with_related().order_by('-uploaded_at', '-id')
+
+
+class CategoryImageListView(ImageListView):
+    async def get_queryset(self):
+        slug = self.kwargs.get('slug')
+        category_id = self.kwargs.get('id')
+
+        if slug:
+            category = await Category.objects.filter(slug=slug).afirst()
+        elif category_id:
+            category = await Category.objects.filter(id=category_id).afirst()
+        else:
+            return Image.objects.none()
+
+        if category:
+            return Image.live.with_related().filter(category=category).order_by('-uploaded_at', '-id')
+        return Image.objects.none()
+
+
+class AccountImageListView(ImageListView):
+    account = True
+
+    async def get_queryset(self):
+        username = self.kwargs.get('username')
+        user_id = self.kwargs.get('id')
+
+        if username:
+            user = await get_user_model().objects.filter(username=username).afirst()
+        elif user_id:
+            user = await get_user_model().objects.filter(id=user_id).afirst()
+        else:
+            return Image.objects.none()
+
+        if user:
+            return Image.live.with_related().filter(user=user).order_by('-uploaded_at', '-id')
+        return Image.objects.none()
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['filter_by'] = 'account'
+        return context
+
+
+class NextImagesView(ImageListView):
+    @property
+    def filter_by(self):
+        return self.request.query_params.get('filter_by', 'category')
+
+    @property
+    def account(self):
+        return self.filter_by == 'account'
+
+    async def get_queryset(self):
+        image_id = self.kwargs.get('id')
+        image = await Image.live.filter(id=image_id).only('id', 'user_id', 'category_id', 'uploaded_at').afirst()
+
+        if not image:
+            raise NotFound("Image not found")
+
+        timeline = ACCOUNT if self.filter_by == 'account' else CATEGORY
+        return await sync_to_async(get_following_queryset)(image, timeline)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['filter_by'] = self.filter_by
+        return context
+
+
+class ImageDetailView(AsyncAPIView):
+    async def get(self, request, *args, **kwargs):
+        image = await Image.live.with_related().filter(id=self.kwargs.get('id')).afirst()
+        if image is None:
+            raise NotFound('No Image matches the given query.')
+
+        context = self.get_serializer_context()
+        context['rendition'] = 'detail'
+        return json_response(ImageSerializer(image, context=context).data)
@@ -0,0 +1,60 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+class ConditionalResponse(Exception):
+    def __init__(self, response):
+        self.response = response
+
+
+class ConditionalGetMixin:
+    """
+    Conditional GET for read-only API views.
+
+    `get_change_marker()` returns when the data behind the response last
+    changed, plus an optional tag for state that does not move that time.
+    Matching If-None-Match or If-Modified-Since headers are answered with
+    304 right after authentication, before the page is fetched or serialized.
+    """
+
+    def get_change_marker(self):
+        """Return (changed_at, tag), or None to skip conditional handling, as views without a marker do."""
+        return None
+
+    def get_etag(self, changed_at, tag):
+        request = self.request
+        # Cards rendered with html=1 differ for their owner, the browsable API from JSON.
+        parts = [changed_at.isoformat(), tag, request.get_full_path(), request.accepted_renderer.format,
+                 str(request.user.pk) if request.user.is_authenticated else '']
+        return quote_etag(hashlib.md5('|'.join(parts).encode()).hexdigest())
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.etag = self.last_modified = None
+        if request.method not in ('GET', 'HEAD'):
+            return
+
+        marker = self.get_change_marker()
+        if marker is None:
+            return
+
+        changed_at, tag = marker
+        self.etag, self.last_modified = self.get_etag(changed_at, tag), int(changed_at.timestamp())
+        response = get_conditional_response(request, etag=self.etag, last_modified=self.last_modified)
+        if response is not None:
+            raise ConditionalResponse(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, ConditionalResponse):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, 'etag', None) and response.status_code in (200, 304):
+            response['ETag'] = self.etag
+            response['Last-Modified'] = http_date(self.last_modified)
+            patch_vary_headers(response, ['Authorization'])
+        return response
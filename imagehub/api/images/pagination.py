@@ -1,28 +1,176 @@
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 
+from images.cursors import decode_cursor, encode_cursor
+
 
 class ImagePagination(PageNumberPagination):
+    """
+    Page number pagination with an opt-in keyset mode.
+
+    Passing `cursor` (empty for the first page) switches to keyset pagination on
+    (uploaded_at, id): the response carries an opaque `next` cursor instead of a
+    page number and the total is only counted when `count=1` is passed too.
+    """
     page_size = 25
     page_size_query_param = 'limit'
     max_page_size = 100
     page_query_param = 'p'
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
 
-    def get_paginated_response(self, data):
-        return Response({
+    cursor_mode = False
+    next_cursor = None
+    total = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self.cursor_query_param in request.query_params
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+
+        if request.query_params.get(self.count_query_param):
+            self.total = queryset.count()
+
+        queryset = self.filter_after_cursor(queryset, request.query_params[self.cursor_query_param])
+        page = list(queryset[:page_size + 1])
+        if len(page) > page_size:
+            page = page[:page_size]
+            self.next_cursor = encode_cursor(page[-1])
+        return page
+
+    @staticmethod
+    def filter_after_cursor(queryset, cursor):
+        """Narrow an (uploaded_at, id) ordered queryset to the rows after `cursor`, if one is given."""
+        if not cursor:
+            return queryset
+
+        try:
+            uploaded_at, pk = decode_cursor(cursor)
+        except ValueError:
+            raise NotFound('Invalid cursor')
+
+        descending = str(queryset.query.order_by[0]).startswith('-') if queryset.query.order_by else True
+        if descending:
+            return queryset.filter(Q(uploaded_at__lt=uploaded_at) | Q(uploaded_at=uploaded_at, id__lt=pk))
+        return queryset.filter(Q(uploaded_at__gt=uploaded_at) | Q(uploaded_at=uploaded_at, id__gt=pk))
+
+    def get_paginated_data(self, data):
+        if self.cursor_mode:
+            response = {'next': self.next_cursor, 'results': data}
+            if self.total is not None:
+                response['count'] = self.total
+            return response
+
+        return {
             'count': self.page.paginator.count,
             'results': data
-        })
+        }
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
 
     def get_paginated_response_schema(self, schema):
         return {
             'type': 'object',
-            'required': ['count', 'results'],
+            'required': ['results'],
             'properties': {
                 'count': {
                     'type': 'integer',
                     'example': 123,
                 },
+                'next': {
+                    'type': 'string',
+                    'nullable': True,
+                    'description': 'Opaque cursor of the next page, returned when `cursor` is passed',
+                },
                 'results': schema,
             },
         }
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        parameters.extend([
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Keyset cursor; pass it empty for the first page',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.count_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Include the total count in cursor mode',
+                'schema': {'type': 'boolean'},
+            },
+        ])
+        return parameters
+
+
+class SearchPagination(ImagePagination):
+    """Page number pagination for ranked results, which have no (uploaded_at, id) order to take a cursor from."""
+    cursor_query_param = None
+
+    def get_paginated_data(self, data):
+        return {
+            'count': self.page.paginator.count,
+            'next': self.page.next_page_number() if self.page.has_next() else None,
+            'results': data
+        }
+
+    def get_paginated_response_schema(self, schema):
+        response = super().get_paginated_response_schema(schema)
+        response['properties']['next'] = {'type': 'integer', 'nullable': True, 'description': 'Next page number'}
+        return response
+
+    def get_schema_operation_parameters(self, view):
+        return PageNumberPagination.get_schema_operation_parameters(self, view)
+
+
+class AsyncImagePagination(ImagePagination):
+    """ImagePagination for async views: the same parameters and payloads, fetched with the async ORM."""
+
+    async def apaginate_queryset(self, queryset, request):
+        self.request = request
+        self.cursor_mode = self.cursor_query_param in request.query_params
+        page_size = self.get_page_size(request)
+
+        if self.cursor_mode:
+            if request.query_params.get(self.count_query_param):
+                self.total = await queryset.acount()
+
+            queryset = self.filter_after_cursor(queryset, request.query_params[self.cursor_query_param])
+            page = [_ async for _ in queryset[:page_size + 1]]
+            if len(page) > page_size:
+                page = page[:page_size]
+                self.next_cursor = encode_cursor(page[-1])
+            return page
+
+        self.total = await queryset.acount()
+        pages = max(1, -(-self.total // page_size))
+        number = request.query_params.get(self.page_query_param) or 1
+        if number in self.last_page_strings:
+            number = pages
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_page_message)
+        if not 1 <= number <= pages:
+            raise NotFound(self.invalid_page_message)
+
+        offset = (number - 1) * page_size
+        return [_ async for _ in queryset[offset:offset + page_size]]
+
+    def get_paginated_data(self, data):
+        if self.cursor_mode:
+            return super().get_paginated_data(data)
+        return {
+            'count': self.total,
+            'results': data
+        }
@@ -5,15 +5,20 @@ from rest_framework import serializers
 from rest_framework.generics import get_object_or_404
 from drf_spectacular.utils import extend_schema_field
 
+from images.batch import MAX_BATCH_SIZE
+from images.forms import ImageHeaderField
 from images.models import Category, Image
+from images.registry import registry
+from main.instrumentation import TimedSerializerMixin
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(TimedSerializerMixin, serializers.ModelSerializer):
     open_url = serializers.SerializerMethodField()
 
     class Meta:
         model = Category
-        fields = ['id', 'open_url', 'name', 'slug']
+        fields = ['id', 'open_url', 'name', 'slug', 'image_count', 'latest_image_id', 'last_uploaded_at']
+        read_only_fields = ['image_count', 'latest_image_id', 'last_uploaded_at']
 
     @extend_schema_field(serializers.CharField())
     def get_open_url(self, obj):
@@ -27,21 +32,29 @@ class CategorySerializer(serializers.ModelSerializer):
             raise serializers.ValidationError({"slug": "Category with this slug already exists."})
 
 
-class ImageSerializer(serializers.ModelSerializer):
-    file = serializers.ImageField(write_only=True)
+class ImageSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    file = serializers.ImageField(write_only=True, _DjangoImageField=ImageHeaderField)
     file_url = serializers.SerializerMethodField()
+    original_url = serializers.SerializerMethodField()
     open_url = serializers.SerializerMethodField()
     category_id = serializers.IntegerField()
 
     class Meta:
         model = Image
         fields = [
-            'id', 'file', 'file_url', 'open_url', 'description',
-            'category_id', 'user_id', 'uploaded_at', 'updated_at']
-        read_only_fields = ['user', 'uploaded_at', 'updated_at', 'deleted_at']
+            'id', 'file', 'file_url', 'original_url', 'open_url', 'description',
+            'category_id', 'user_id', 'processing_status', 'width', 'height', 'file_size', 'mime_type',
+            'dominant_color', 'placeholder', 'uploaded_at', 'updated_at']
+        read_only_fields = ['user', 'processing_status', 'width', 'height', 'file_size', 'mime_type',
+                            'dominant_color', 'placeholder', 'uploaded_at', 'updated_at', 'deleted_at']
 
     @extend_schema_field(serializers.CharField())
     def get_file_url(self, obj):
+        request = self.context.get('request')
+        return request.build_absolute_uri(obj.get_rendition_url(self.context.get('rendition', 'card')))
+
+    @extend_schema_field(serializers.CharField())
+    def get_original_url(self, obj):
         request = self.context.get('request')
         return request.build_absolute_uri(settings.MEDIA_URL + str(obj.file))
 
@@ -85,3 +98,43 @@ class ImageSerializer(serializers.ModelSerializer):
         instance.category = data.get('category', instance.category)
         instance.save()
         return instance
+
+
+class SimilarImageSerializer(ImageSerializer):
+    distance = serializers.IntegerField(read_only=True, help_text='Hamming distance between the perceptual hashes')
+
+    class Meta(ImageSerializer.Meta):
+        fields = ImageSerializer.Meta.fields + ['distance']
+
+
+class ImageBatchSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False,
+                                max_length=MAX_BATCH_SIZE)
+
+    def validate_ids(self, value):
+        return list(dict.fromkeys(value))
+
+
+class ImageBatchEditSerializer(ImageBatchSerializer):
+    description = serializers.CharField(required=False, allow_blank=True)
+    category_id = serializers.IntegerField(required=False, source='category')
+
+    def validate_category_id(self, value):
+        category = registry.get_by_id(value)
+        if category is not None:
+            # A copy: registry instances are shared between threads.
+            return Category(id=category.id, name=category.name, slug=category.slug)
+        # Possibly created in another worker since this one loaded the registry.
+        category = Category.objects.filter(pk=value).only('id', 'name', 'slug').first()
+        if category is None:
+            raise serializers.ValidationError('Category not found.')
+        return category
+
+    def validate(self, data):
+        if 'description' not in data and 'category' not in data:
+            raise serializers.ValidationError('Nothing to change: pass description and/or category_id.')
+        return data
+
+    def get_fields_to_update(self):
+        return {field: self.validated_data[field] for field in ('description', 'category')
+                if field in self.validated_data}
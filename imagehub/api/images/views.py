@@ -2,18 +2,26 @@ from rest_framework import generics, status
 from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
-from django.db.models.functions import Random
 from django.contrib.auth import get_user_model
 from django.utils import timezone
-from django.template.loader import render_to_string
+from django.utils.functional import cached_property
 from django.http import JsonResponse
-from drf_spectacular.utils import extend_schema
+from drf_spectacular.utils import extend_schema, OpenApiParameter
 from urllib.parse import unquote
 
+from images.batch import MAX_BATCH_SIZE, NOT_FOUND, OK, soft_delete_images, update_images
+from images.fragments import render_image_item
+from images.markers import ALL, category_scope, get_changed_at, user_scope
 from images.models import Category, Image
+from images.neighbors import ACCOUNT, CATEGORY, get_following_queryset
+from images.sampling import sample_live_images
+from images.search import search_images
+from images.similarity import DEFAULT_DISTANCE, MAX_DISTANCE, find_similar
 
-from .serializers import CategorySerializer, ImageSerializer
-from .pagination import ImagePagination
+from .serializers import (CategorySerializer, ImageBatchEditSerializer, ImageBatchSerializer, ImageSerializer,
+                          SimilarImageSerializer)
+from .conditional import ConditionalGetMixin
+from .pagination import ImagePagination, SearchPagination
 
 
 class CategoryListAPIView(generics.ListAPIView):
@@ -36,26 +44,11 @@ class RandomImageListAPIView(generics.ListAPIView):
         else:
             exclude = []
 
-        # queryset = Image.objects.filter(deleted_at__isnull=True).exclude(id__in=exclude if exclude else []).order_by(Random())[:10]
-        total_count = Image.objects.filter(deleted_at__isnull=True).exclude(id__in=exclude).count()
-        if total_count <= 10:
-            queryset = Image.objects.filter(deleted_at__isnull=True).exclude(id__in=exclude)
-        else:
-            selected_images = list()
-            while len(selected_images) < 10:
-                random_images = Image.objects.filter(deleted_at__isnull=True).exclude(
-                    id__in=exclude + [_.id for _ in selected_images]).order_by(Random())[:10]
-
-                if random_images:
-                    for image in random_images:
-                        if image.id not in exclude:
-                            selected_images.append(image)
-
-            queryset = list(selected_images)
+        queryset = sample_live_images(10, exclude=exclude)
 
         if request.query_params.get('html'):
             rendered_images = [
-                render_to_string('images/image_item.html', {'image': image}) for image in queryset
+                render_image_item(image, request) for image in queryset
             ]
             return JsonResponse(rendered_images, safe=False)
 
@@ -63,18 +56,21 @@ class RandomImageListAPIView(generics.ListAPIView):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class RecentsImageListAPIView(generics.ListAPIView):
+class RecentsImageListAPIView(ConditionalGetMixin, generics.ListAPIView):
     serializer_class = ImageSerializer
     permission_classes = []
     pagination_class = ImagePagination
 
+    def get_change_marker(self):
+        return get_changed_at(ALL), ''
+
     def get(self, request, *args, **kwargs):
-        queryset = Image.objects.filter(deleted_at__isnull=True).order_by('-uploaded_at')
+        queryset = Image.live.with_related().order_by('-uploaded_at', '-id')
         page = self.paginate_queryset(queryset)
 
         if request.query_params.get('html'):
             rendered_images = [
-                render_to_string('images/image_item.html', {'image': image}) for image in page
+                render_image_item(image, request) for image in page
             ]
             return self.get_paginated_response(rendered_images)
 
@@ -82,24 +78,32 @@ class RecentsImageListAPIView(generics.ListAPIView):
         return self.get_paginated_response(serializer.data)
 
 
-class CategoryImageListAPIView(generics.ListAPIView):
+class CategoryImageListAPIView(ConditionalGetMixin, generics.ListAPIView):
     serializer_class = ImageSerializer
     permission_classes = []
     pagination_class = ImagePagination
 
-    def get_queryset(self):
+    @cached_property
+    def category(self):
         slug = self.kwargs.get('slug')
         category_id = self.kwargs.get('id')
 
         if slug:
-            category = Category.objects.filter(slug=slug).first()
+            return Category.objects.filter(slug=slug).first()
         elif category_id:
-            category = Category.objects.filter(id=category_id).first()
-        else:
-            return Image.objects.none()
+            return Category.objects.filter(id=category_id).first()
+        return None
+
+    def get_change_marker(self):
+        if self.category is None:
+            return None
+        return get_changed_at(category_scope(self.category.id)), ''
+
+    def get_queryset(self):
+        category = self.category
 
         if category:
-            return Image.objects.filter(category=category, deleted_at__isnull=True).order_by('-uploaded_at')
+            return Image.live.with_related().filter(category=category).order_by('-uploaded_at', '-id')
         return Image.objects.none()
 
     def get(self, request, *args, **kwargs):
@@ -107,7 +111,7 @@ class CategoryImageListAPIView(generics.ListAPIView):
 
         if request.query_params.get('html'):
             rendered_images = [
-                render_to_string('images/image_item.html', {'image': image}) for image in page
+                render_image_item(image, request) for image in page
             ]
             return self.get_paginated_response(rendered_images)
 
@@ -115,24 +119,32 @@ class CategoryImageListAPIView(generics.ListAPIView):
         return self.get_paginated_response(serializer.data)
 
 
-class AccountImageListAPIView(generics.ListAPIView):
+class AccountImageListAPIView(ConditionalGetMixin, generics.ListAPIView):
     serializer_class = ImageSerializer
     permission_classes = []
     pagination_class = ImagePagination
 
-    def get_queryset(self):
+    @cached_property
+    def user(self):
         username = self.kwargs.get('username')
         user_id = self.kwargs.get('id')
 
         if username:
-            user = get_user_model().objects.filter(username=username).first()
+            return get_user_model().objects.filter(username=username).first()
         elif user_id:
-            user = get_user_model().objects.filter(id=user_id).first()
-        else:
-            return Image.objects.none()
+            return get_user_model().objects.filter(id=user_id).first()
+        return None
+
+    def get_change_marker(self):
+        if self.user is None:
+            return None
+        return get_changed_at(user_scope(self.user.id)), ''
+
+    def get_queryset(self):
+        user = self.user
 
         if user:
-            return Image.objects.filter(user=user, deleted_at__isnull=True).order_by('-uploaded_at')
+            return Image.live.with_related().filter(user=user).order_by('-uploaded_at', '-id')
         return Image.objects.none()
 
     def get_serializer_context(self):
@@ -145,10 +157,31 @@ class AccountImageListAPIView(generics.ListAPIView):
 
         if request.query_params.get('html'):
             rendered_images = [
-                render_to_string('images/image_item.html', {
-                    'image': image,
-                    'account': True
-                }) for image in page
+                render_image_item(image, request, account=True) for image in page
+            ]
+            return self.get_paginated_response(rendered_images)
+
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+class SearchImageListAPIView(ConditionalGetMixin, generics.ListAPIView):
+    serializer_class = ImageSerializer
+    permission_classes = []
+    pagination_class = SearchPagination
+
+    def get_change_marker(self):
+        return get_changed_at(ALL), ''
+
+    @extend_schema(parameters=[OpenApiParameter('q', str, description='Words to look for in descriptions, '
+                                                                      'category names and usernames')])
+    def get(self, request, *args, **kwargs):
+        queryset = search_images(Image.live.with_related(), request.query_params.get('q', ''))
+        page = self.paginate_queryset(queryset)
+
+        if request.query_params.get('html'):
+            rendered_images = [
+                render_image_item(image, request) for image in page
             ]
             return self.get_paginated_response(rendered_images)
 
@@ -156,12 +189,26 @@ class AccountImageListAPIView(generics.ListAPIView):
         return self.get_paginated_response(serializer.data)
 
 
-class ImageDetailAPIView(generics.RetrieveAPIView):
-    queryset = Image.objects.filter(deleted_at__isnull=True)
+class ImageDetailAPIView(ConditionalGetMixin, generics.RetrieveAPIView):
+    queryset = Image.live.with_related()
     serializer_class = ImageSerializer
     permission_classes = []
     lookup_field = 'id'
 
+    def get_change_marker(self):
+        # Processing and renames change the payload without touching updated_at.
+        image = (Image.live.filter(id=self.kwargs.get('id'))
+                 .values_list('updated_at', 'processing_status', 'width', 'category__slug', 'user__username')
+                 .first())
+        if image is None:
+            return None
+        return image[0], '|'.join(str(_) for _ in image[1:])
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['rendition'] = 'detail'
+        return context
+
     def get_object(self):
         image = super().get_object()
         if image is None:
@@ -176,36 +223,13 @@ class NextImagesAPIView(generics.ListAPIView):
 
     def get_queryset(self):
         image_id = self.kwargs.get('id')
-        image = Image.objects.filter(id=image_id, deleted_at__isnull=True).first()
+        image = Image.live.filter(id=image_id).only('id', 'user_id', 'category_id', 'uploaded_at').first()
 
         if not image:
             raise NotFound("Image not found")
 
         filter_by = self.request.query_params.get('filter_by', 'category')
-
-        if filter_by == 'account':
-            queryset = Image.objects.filter(
-                user=image.user,
-                uploaded_at__gt=image.uploaded_at,
-                deleted_at__isnull=True
-            ).order_by('uploaded_at')
-
-            if not queryset.exists():
-                queryset = (Image.objects.filter(user=image.user, deleted_at__isnull=True)
-                            .exclude(id=image_id).order_by('uploaded_at'))
-
-        else:
-            queryset = Image.objects.filter(
-                category=image.category,
-                uploaded_at__gt=image.uploaded_at,
-                deleted_at__isnull=True
-            ).order_by('uploaded_at')
-
-            if not queryset.exists():
-                queryset = (Image.objects.filter(category=image.category, deleted_at__isnull=True)
-                            .exclude(id=image_id).order_by('uploaded_at'))
-
-        return queryset
+        return get_following_queryset(image, ACCOUNT if filter_by == 'account' else CATEGORY)
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -218,10 +242,7 @@ class NextImagesAPIView(generics.ListAPIView):
 
         if request.query_params.get('html'):
             rendered_images = [
-                render_to_string('images/image_item.html', {
-                    'image': image,
-                    'account': True if filter_by == 'account' else False
-                }) for image in page
+                render_image_item(image, request, account=filter_by == 'account') for image in page
             ]
             return self.get_paginated_response(rendered_images)
 
@@ -229,6 +250,29 @@ class NextImagesAPIView(generics.ListAPIView):
         return self.get_paginated_response(serializer.data)
 
 
+class SimilarImagesAPIView(generics.ListAPIView):
+    serializer_class = SimilarImageSerializer
+    permission_classes = []
+    max_distance = MAX_DISTANCE
+
+    @extend_schema(parameters=[OpenApiParameter(
+        'distance', int, description=f'Maximum Hamming distance, {DEFAULT_DISTANCE} by default and at most {MAX_DISTANCE}')])
+    def get(self, request, *args, **kwargs):
+        image = Image.live.filter(id=self.kwargs.get('id')).only('id', 'phash').first()
+        if not image:
+            raise NotFound("Image not found")
+
+        try:
+            distance = int(request.query_params.get('distance', DEFAULT_DISTANCE))
+        except ValueError:
+            raise ValidationError("Invalid distance. Integer expected.")
+        if not 0 <= distance <= self.max_distance:
+            raise ValidationError(f"Distance must be between 0 and {self.max_distance}.")
+
+        serializer = self.get_serializer(find_similar(image, distance), many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
 class UploadImageView(generics.CreateAPIView):
     serializer_class = ImageSerializer
     permission_classes = [IsAuthenticated]
@@ -251,22 +295,17 @@ class UpdateImageView(generics.UpdateAPIView):
 
     def get_object(self):
         try:
-            image = Image.objects.get(pk=self.kwargs.get('id'))
+            return Image.live.with_related().get(pk=self.kwargs.get('id'))
         except Image.DoesNotExist:
             raise NotFound("Image not found")
 
-        if image.deleted_at is not None:
-            raise NotFound("Image not found")
-
-        return image
-
     @extend_schema(exclude=True)
     def put(self, request, *args, **kwargs):
         return Response({"detail": "Method 'PUT' not allowed."}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
     def patch(self, request, *args, **kwargs):
         image = self.get_object()
-        if image.user != request.user:
+        if image.user_id != request.user.id:
             return Response({"detail": "You do not have permission to edit this image."},
                             status=status.HTTP_403_FORBIDDEN)
 
@@ -283,19 +322,14 @@ class DeleteImageView(generics.GenericAPIView):
 
     def get_object(self):
         try:
-            image = Image.objects.get(pk=self.kwargs.get('id'))
+            return Image.live.with_related().get(pk=self.kwargs.get('id'))
         except Image.DoesNotExist:
             raise NotFound("Image not found")
 
-        if image.deleted_at is not None:
-            raise NotFound("Image not found")
-
-        return image
-
     def delete(self, request, *args, **kwargs):
         image = self.get_object()
 
-        if image.user != request.user:
+        if image.user_id != request.user.id:
             return Response({"detail": "You do not have permission to delete this image."},
                             status=status.HTTP_403_FORBIDDEN)
 
@@ -305,6 +339,59 @@ class DeleteImageView(generics.GenericAPIView):
         return Response({"detail": "Image marked as deleted."}, status=status.HTTP_200_OK)
 
 
+class ImageBatchMixin:
+    """Per-id results of batch requests, in the order the ids were given, with the payloads of the images returned."""
+
+    def get_results(self, statuses, images=None):
+        results = list()
+        for pk, code in statuses.items():
+            result = {'id': pk, 'status': code}
+            if code == OK and images is not None and pk in images:
+                result['image'] = ImageSerializer(images[pk], context=self.get_serializer_context()).data
+            results.append(result)
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
+
+class ImageBatchAPIView(ImageBatchMixin, generics.GenericAPIView):
+    serializer_class = ImageSerializer
+    permission_classes = []
+
+    @extend_schema(parameters=[OpenApiParameter(
+        'ids', str, description=f'Comma separated image ids, at most {MAX_BATCH_SIZE}')])
+    def get(self, request, *args, **kwargs):
+        ids = [_.strip() for _ in request.query_params.get('ids', '').split(',') if _.strip()]
+        serializer = ImageBatchSerializer(data={'ids': ids})
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+
+        images = Image.live.with_related().in_bulk(ids)
+        return self.get_results({pk: OK if pk in images else NOT_FOUND for pk in ids}, images)
+
+
+class DeleteImageBatchView(ImageBatchMixin, generics.GenericAPIView):
+    serializer_class = ImageBatchSerializer
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return self.get_results(soft_delete_images(request.user, serializer.validated_data['ids']))
+
+
+class UpdateImageBatchView(ImageBatchMixin, generics.GenericAPIView):
+    serializer_class = ImageBatchEditSerializer
+    permission_classes = [IsAuthenticated]
+
+    def patch(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+
+        statuses = update_images(request.user, ids, **serializer.get_fields_to_update())
+        images = Image.live.with_related().in_bulk([pk for pk, code in statuses.items() if code == OK])
+        return self.get_results(statuses, images)
+
+
 class CreateCategoryView(generics.CreateAPIView):
     serializer_class = CategorySerializer
     permission_classes = [IsAuthenticated, IsAdminUser]
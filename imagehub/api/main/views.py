@@ -0,0 +1,25 @@
+from django.conf import settings
+from drf_spectacular.utils import extend_schema
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from main.instrumentation import aggregate
+
+
+@extend_schema(exclude=True)
+class MetricsView(APIView):
+    """Rolling per URL name request metrics collected by InstrumentationMiddleware."""
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response({
+            'enabled': getattr(settings, 'INSTRUMENTATION_ENABLED', False),
+            'window': getattr(settings, 'INSTRUMENTATION_WINDOW', 1000),
+            'views': aggregate.snapshot()
+        })
+
+    def delete(self, request, *args, **kwargs):
+        aggregate.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
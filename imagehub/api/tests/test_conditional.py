@@ -0,0 +1,127 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.images.conditional import ConditionalGetMixin
+from images.models import Category, Image
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='testuser', password='testpassword')
+        self.other = get_user_model().objects.create_user(username='otheruser', password='testpassword')
+        self.cars = Category.objects.create(name='Cars', slug='cars')
+        self.animals = Category.objects.create(name='Animals', slug='animals')
+        self.car = Image.objects.create(file='images/car.jpg', category=self.cars, user=self.user)
+        self.cat = Image.objects.create(file='images/cat.jpg', category=self.animals, user=self.other)
+
+    def revalidate(self, path, response, **headers):
+        return self.client.get(path, headers={'if-none-match': response['ETag'], **headers})
+
+    def test_not_modified_before_serialization(self):
+        for path in ('/api/v1/images/recents', '/api/v1/images/category/cars',
+                     f'/api/v1/images/category/id/{self.cars.id}', '/api/v1/images/account/testuser',
+                     f'/api/v1/images/account/id/{self.user.id}', f'/api/v1/image/id/{self.car.id}',
+                     '/api/v1/images/search?q=testuser'):
+            response = self.client.get(path)
+            self.assertEqual(response.status_code, 200, path)
+            self.assertIn('Last-Modified', response)
+
+            # Validators, then nothing: no page query, no serialization.
+            with self.assertNumQueries(2 if '/category/' in path or '/account/' in path else 1):
+                revalidated = self.revalidate(path, response)
+            self.assertEqual(revalidated.status_code, 304, path)
+            self.assertEqual(revalidated.content, b'')
+            self.assertEqual(revalidated['ETag'], response['ETag'])
+
+    def test_without_marker(self):
+        class View(ConditionalGetMixin, APIView):
+            def get(self, request):
+                return Response([])
+
+        response = View.as_view()(APIRequestFactory().get('/', HTTP_IF_NONE_MATCH='*'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+
+    def test_if_modified_since(self):
+        response = self.client.get('/api/v1/images/recents')
+        revalidated = self.client.get('/api/v1/images/recents',
+                                      headers={'if-modified-since': response['Last-Modified']})
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_scopes(self):
+        paths = ['/api/v1/images/recents', '/api/v1/images/category/cars', '/api/v1/images/category/animals',
+                 '/api/v1/images/account/testuser', '/api/v1/images/account/otheruser']
+        responses = {path: self.client.get(path) for path in paths}
+
+        self.cat.description = 'Edited'
+        self.cat.save()
+        changed = {path for path in paths if self.revalidate(path, responses[path]).status_code == 200}
+        self.assertEqual(changed, {'/api/v1/images/recents', '/api/v1/images/category/animals',
+                                   '/api/v1/images/account/otheruser'})
+
+    def test_changes(self):
+        path = '/api/v1/images/category/cars'
+
+        def changed():
+            nonlocal response
+            revalidated = self.revalidate(path, response)
+            response = self.client.get(path)
+            return revalidated.status_code == 200
+
+        response = self.client.get(path)
+        Image.objects.create(file='images/car2.jpg', category=self.cars, user=self.other)
+        self.assertTrue(changed())
+
+        # Soft delete, then hard delete.
+        self.car.deleted_at = self.car.updated_at
+        self.car.save()
+        self.assertTrue(changed())
+        Image.objects.filter(category=self.cars).delete()
+        self.assertTrue(changed())
+
+        # Renames show up in the cards of other lists.
+        response = self.client.get('/api/v1/images/account/otheruser')
+        path = '/api/v1/images/account/otheruser'
+        self.animals.name = 'Pets'
+        self.animals.save()
+        self.assertTrue(changed())
+
+        self.other.last_login = self.car.updated_at
+        self.other.save(update_fields=['last_login'])
+        self.assertFalse(changed())
+
+        # Full saves only count when a field the cards show differs.
+        other = get_user_model().objects.get(pk=self.other.pk)
+        other.set_password('newpassword')
+        other.email = 'other@example.com'
+        other.save()
+        self.assertFalse(changed())
+        other.first_name = 'Other'
+        other.save()
+        self.assertTrue(changed())
+        other.save()
+        self.assertFalse(changed())
+
+    def test_query_and_user_in_etag(self):
+        first = self.client.get('/api/v1/images/recents?limit=1')
+        second = self.client.get('/api/v1/images/recents?limit=1&p=2')
+        self.assertNotEqual(first['ETag'], second['ETag'])
+
+        token = RefreshToken.for_user(self.user).access_token
+        response = self.revalidate('/api/v1/images/recents?limit=1', first, authorization=f'Bearer {token}')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Authorization', response['Vary'])
+
+    def test_detail_processing(self):
+        path = f'/api/v1/image/id/{self.car.id}'
+        response = self.client.get(path)
+        Image.objects.filter(pk=self.car.pk).update(processing_status=Image.READY)
+        self.assertEqual(self.revalidate(path, response).status_code, 200)
+
+        self.car.deleted_at = self.car.updated_at
+        self.car.save()
+        self.assertEqual(self.revalidate(path, response).status_code, 404)
@@ -0,0 +1,68 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+
+from images.models import Category, Image
+
+
+class CursorPaginationTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='testuser', password='testpassword')
+        self.category = Category.objects.create(name='Cars', slug='cars')
+
+        Image.objects.bulk_create([
+            Image(file=f'images/{_}.jpg', category=self.category, user=self.user) for _ in range(12)
+        ])
+        # Share timestamps between pairs of images so the id tie-breaker is exercised.
+        now = timezone.now()
+        for image in Image.objects.order_by('id'):
+            Image.objects.filter(pk=image.pk).update(uploaded_at=now - timedelta(minutes=image.id // 2))
+
+    def walk(self, url, limit=5):
+        ids, cursor = list(), ''
+        while cursor is not None:
+            response = self.client.get(url, {'limit': limit, 'cursor': cursor})
+            self.assertEqual(response.status_code, 200)
+            ids.extend(_['id'] for _ in response.json()['results'])
+            cursor = response.json()['next']
+        return ids
+
+    def test_recents_cursor_matches_order(self):
+        expected = list(Image.objects.order_by('-uploaded_at', '-id').values_list('id', flat=True))
+        self.assertEqual(self.walk('/api/v1/images/recents'), expected)
+
+    def test_category_cursor(self):
+        expected = list(Image.objects.order_by('-uploaded_at', '-id').values_list('id', flat=True))
+        self.assertEqual(self.walk('/api/v1/images/category/cars'), expected)
+
+    def test_account_cursor(self):
+        expected = list(Image.objects.order_by('-uploaded_at', '-id').values_list('id', flat=True))
+        self.assertEqual(self.walk('/api/v1/images/account/testuser'), expected)
+
+    def test_next_images_cursor_ascending(self):
+        first = Image.objects.order_by('uploaded_at', 'id').first()
+        expected = list(Image.objects.filter(uploaded_at__gt=first.uploaded_at)
+                        .order_by('uploaded_at', 'id').values_list('id', flat=True))
+        self.assertEqual(self.walk(f'/api/v1/image/id/{first.id}/after'), expected)
+
+    def test_cursor_skips_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/v1/images/recents', {'cursor': ''})
+        self.assertNotIn('count', response.json())
+        self.assertFalse([_ for _ in queries if 'COUNT(' in _['sql']], 'Cursor mode must not count rows')
+
+        response = self.client.get('/api/v1/images/recents', {'cursor': '', 'count': 1})
+        self.assertEqual(response.json()['count'], 12)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/v1/images/recents', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_page_number_mode_unchanged(self):
+        response = self.client.get('/api/v1/images/recents', {'limit': 5, 'p': 2})
+        self.assertEqual(response.json()['count'], 12)
+        self.assertEqual(len(response.json()['results']), 5)
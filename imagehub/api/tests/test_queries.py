@@ -0,0 +1,81 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+
+from images.models import Category, Image
+
+
+class QueryBudgetTest(TestCase):
+    """Each endpoint runs a fixed number of queries, however many images a page holds."""
+
+    # Conditional GET endpoints add the lookup of their validators.
+    budgets = {
+        '/api/v1/images': 3,
+        '/api/v1/images?html=1': 3,
+        '/api/v1/images/recents': 3,
+        '/api/v1/images/recents?html=1': 3,
+        '/api/v1/images/recents?cursor=': 2,
+        '/api/v1/images/category/cars': 4,
+        '/api/v1/images/category/cars?html=1': 4,
+        '/api/v1/images/account/testuser': 4,
+        '/api/v1/images/account/testuser?html=1': 4,
+        '/api/v1/image/id/{first}': 2,
+        # The timeline's marker and, with a cold cache, its neighbors replace the exists() probe.
+        '/api/v1/image/id/{first}/after': 5,
+        '/api/v1/image/id/{first}/after?html=1': 5,
+    }
+
+    def setUp(self):
+        self.users = [
+            get_user_model().objects.create_user(username='testuser', password='testpassword'),
+            get_user_model().objects.create_user(username='otheruser', password='testpassword'),
+        ]
+        self.categories = [Category.objects.create(name='Cars', slug='cars'),
+                           Category.objects.create(name='Animals', slug='animals')]
+
+    def create_images(self, count):
+        Image.objects.bulk_create([
+            Image(file=f'images/{_}.jpg', category=self.categories[_ % 2], user=self.users[_ % 3 == 0],
+                  description=f'Image {_}')
+            for _ in range(count)
+        ])
+
+    def count_queries(self, url):
+        cache.clear()
+        url = url.format(first=Image.objects.order_by('id').first().id)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(queries)
+
+    def test_api_query_budget(self):
+        self.create_images(4)
+        small = {url: self.count_queries(url) for url in self.budgets}
+
+        self.create_images(40)
+        for url, budget in self.budgets.items():
+            with self.subTest(url=url):
+                queries = self.count_queries(url)
+                self.assertEqual(queries, small[url], 'Query count must not grow with the page size')
+                self.assertLessEqual(queries, budget)
+
+    def test_board_query_budget(self):
+        self.create_images(4)
+        small = {url: self.count_queries(url) for url in (reverse('index'), reverse('recents'))}
+
+        self.create_images(40)
+        for url, queries in small.items():
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), queries)
+
+    def test_detail_query_budget(self):
+        self.create_images(4)
+        image = Image.objects.order_by('id').first()
+        url = reverse('image_open', args=['cars', image.user_id, image.id])
+        small = self.count_queries(url)
+
+        self.create_images(40)
+        self.assertEqual(self.count_queries(url), small)
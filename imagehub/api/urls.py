@@ -4,15 +4,28 @@ from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 from .accounts.views import *
 from .images.views import *
+from .main.views import MetricsView
+from .images import async_views
 
 urlpatterns = [
     path('images', RandomImageListAPIView.as_view()),
     path('images/recents', RecentsImageListAPIView.as_view()),
+    path('images/search', SearchImageListAPIView.as_view()),
     path('images/category/<slug:slug>', CategoryImageListAPIView.as_view()),
     path('images/category/id/<int:id>', CategoryImageListAPIView.as_view()),
     path('images/account/<slug:username>', AccountImageListAPIView.as_view()),
     path('images/account/id/<int:id>', AccountImageListAPIView.as_view()),
 
+    # Native async versions of the read endpoints above, for ASGI deployments.
+    path('async/images', async_views.RandomImageListView.as_view()),
+    path('async/images/recents', async_views.RecentsImageListView.as_view()),
+    path('async/images/category/<slug:slug>', async_views.CategoryImageListView.as_view()),
+    path('async/images/category/id/<int:id>', async_views.CategoryImageListView.as_view()),
+    path('async/images/account/<slug:username>', async_views.AccountImageListView.as_view()),
+    path('async/images/account/id/<int:id>', async_views.AccountImageListView.as_view()),
+    path('async/image/id/<int:id>', async_views.ImageDetailView.as_view()),
+    path('async/image/id/<int:id>/after', async_views.NextImagesView.as_view()),
+
     path('category/create', CreateCategoryView.as_view(), name='api-category-create'),
     path('category/list', CategoryListAPIView.as_view()),
     path('category/id/<int:id>/edit', UpdateCategoryView.as_view()),
@@ -23,12 +36,19 @@ urlpatterns = [
     path('account/settings', AccountSettingsView.as_view(), name='api-account-settings'),
     path('account/delete', AccountDeleteView.as_view()),
 
+    path('images/batch', ImageBatchAPIView.as_view()),
+    path('images/batch/delete', DeleteImageBatchView.as_view()),
+    path('images/batch/edit', UpdateImageBatchView.as_view()),
+
     path('image/upload', UploadImageView.as_view(), name='api-image-upload'),
     path('image/id/<int:id>', ImageDetailAPIView.as_view()),
     path('image/id/<int:id>/after', NextImagesAPIView.as_view()),
+    path('image/id/<int:id>/similar', SimilarImagesAPIView.as_view()),
     path('image/id/<int:id>/edit', UpdateImageView.as_view()),
     path('image/id/<int:id>/delete', DeleteImageView.as_view()),
 
+    path('metrics', MetricsView.as_view(), name='api-metrics'),
+
     path('token', TokenObtainPairView.as_view(), name='api-token'),
     path('token/refresh', TokenRefreshView.as_view()),
     path('token/logout', TokenBlacklistView.as_view()),
@@ -37,6 +37,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'main.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -133,6 +134,48 @@ AUTH_USER_MODEL = 'accounts.User'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Let the front proxy send media files: "X-Accel-Redirect" (nginx, with MEDIA_OFFLOAD_PREFIX as an internal
+# location aliased to MEDIA_ROOT) or "X-Sendfile" (Apache, lighttpd). Unset, Django streams them itself.
+MEDIA_OFFLOAD_HEADER = None
+MEDIA_OFFLOAD_PREFIX = '/protected-media/'
+
+FILE_UPLOAD_HANDLERS = [
+    'images.uploadhandler.ImageUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+IMAGE_UPLOAD_MAX_BYTES = 20 * 2 ** 20
+IMAGE_UPLOAD_MAX_PIXELS = 40_000_000
+
+# Perceptual hash index used for near-duplicate search, rebuilt with `manage.py rebuildsimilarity`.
+PHASH_INDEX_PATH = BASE_DIR / 'phash.index'
+
+# Full-text search: "fts5" (SQLite), "inverted" (a term table, for any database) or "auto" to pick the first available.
+SEARCH_BACKEND = 'auto'
+
+# Background jobs run by `manage.py runjobs`; eager mode runs them inline instead.
+JOBS_RUN_EAGER = False
+JOBS_WORKERS = 4
+# Done and failed jobs are deleted by `runjobs` after this many days.
+JOBS_KEEP_FINISHED_DAYS = 7
+
+# Soft deleted images are hard deleted, files included, by `manage.py purgeimages` after this many days.
+DELETED_IMAGE_RETENTION_DAYS = 30
+
+# Card fragments, the category registry and timeline neighbors are cached here and invalidated
+# from whichever process changes the data, `runjobs` workers included. Use a cache shared by every process in
+# production (Redis, Memcached, database): the default LocMemCache is private to each one.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Query and timing instrumentation: Server-Timing headers and the admin-only /api/v1/metrics endpoint.
+INSTRUMENTATION_ENABLED = False
+INSTRUMENTATION_WINDOW = 1000
+
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
 REST_FRAMEWORK = {
@@ -1,14 +1,17 @@
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 
 from django.conf import settings
 from django.conf.urls.static import static
 
+from main.media import serve_media
+
 urlpatterns = [
     path('', include('main.urls')),
     path('admin/', admin.site.urls),
     path('api/v1/', include('api.urls')),
+    # Served in production too: front proxies take over the transfer through MEDIA_OFFLOAD_HEADER.
+    re_path(r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')), serve_media, name='media'),
 ] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
-
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
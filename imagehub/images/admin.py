@@ -1,14 +1,17 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.admin import SimpleListFilter
+from django.http import HttpResponseRedirect
 from django.urls import reverse
 from django.utils.html import format_html
 
 from .models import Category, Image
+from .search import search_images
+from .similarity import find_similar
 
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ('id', 'name', 'slug_link', 'created_at')
+    list_display = ('id', 'name', 'slug_link', 'image_count', 'last_uploaded_at', 'created_at')
     search_fields = ('name', 'slug')
 
     @admin.display(description="Slug")
@@ -29,9 +32,9 @@ class DeletedFilter(SimpleListFilter):
 
     def queryset(self, request, queryset):
         if self.value() == 'deleted':
-            return queryset.exclude(deleted_at__isnull=True)
+            return queryset.deleted()
         if self.value() == 'not_deleted':
-            return queryset.filter(deleted_at__isnull=True)
+            return queryset.live()
         return queryset
 
 
@@ -41,6 +44,13 @@ class ImageAdmin(admin.ModelAdmin):
     list_filter = ('category', DeletedFilter)
     search_fields = ('description',)
     exclude = ('delete',)
+    actions = ['show_similar']
+
+    def get_search_results(self, request, queryset, search_term):
+        # The full-text index covers deleted images too, so they stay searchable here.
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(id__in=search_images(Image.objects.all(), search_term).values('id')), False
 
     @admin.display(description="User")
     def user_link(self, obj):
@@ -57,7 +67,7 @@ class ImageAdmin(admin.ModelAdmin):
             })
             return format_html(
                 '<a href="{}" target="_blank"><img src="{}" style="width: 100px; height: auto;"/></a>',
-                url, obj.file.url)
+                url, obj.thumb_url)
         return ''
 
     @admin.display(description="Delete")
@@ -66,3 +76,15 @@ class ImageAdmin(admin.ModelAdmin):
             return format_html('<img src="/static/admin/img/icon-yes.svg" alt="True">')
         else:
             return format_html('<img src="/static/admin/img/icon-no.svg" alt="False">')
+
+    @admin.action(description="Show near-duplicates of selected images")
+    def show_similar(self, request, queryset):
+        selected = list(queryset.only('id', 'phash'))
+        similar = {image.id for source in selected for image in find_similar(source)}
+        if not similar:
+            self.message_user(request, "No near-duplicates found.", messages.WARNING)
+            return None
+
+        ids = sorted(similar | {image.id for image in selected})
+        url = reverse('admin:images_image_changelist')
+        return HttpResponseRedirect(f"{url}?id__in={','.join(map(str, ids))}")
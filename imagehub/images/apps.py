@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class ImagesConfig(AppConfig):
@@ -6,4 +7,7 @@ class ImagesConfig(AppConfig):
     name = 'images'
 
     def ready(self):
+        import images.jobs
         import images.signals
+
+        post_migrate.connect(images.signals.install_search_index_on_post_migrate, sender=self)
@@ -0,0 +1,76 @@
+from collections import namedtuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from .fragments import invalidate_image_items
+from .markers import category_scope, get_image_scopes, mark_changed
+from .models import Image
+from .search import index_images
+from .stats import refresh_category_stats, refresh_user_stats
+
+MAX_BATCH_SIZE = 100
+# Per-id outcomes, as the HTTP status a single image request would have answered with.
+OK, FORBIDDEN, NOT_FOUND = 200, 403, 404
+
+Row = namedtuple('Row', ['id', 'user_id', 'category_id', 'updated_at'])
+
+
+def check_ownership(user, ids):
+    """
+    Return the rows of the live images among `ids` that `user` owns, and the
+    status of every id, in one query. The rows stay locked until the end of
+    the caller's transaction, so the outcomes still hold when it writes them.
+    """
+    rows = {row[0]: Row(*row) for row in Image.live.select_for_update().filter(pk__in=ids)
+            .values_list('id', 'user_id', 'category_id', 'updated_at')}
+
+    statuses = dict()
+    for pk in ids:
+        if pk not in rows:
+            statuses[pk] = NOT_FOUND
+        else:
+            statuses[pk] = OK if rows[pk].user_id == user.id else FORBIDDEN
+    return [rows[pk] for pk in ids if statuses[pk] == OK], statuses
+
+
+def soft_delete_images(user, ids):
+    """
+    Soft delete the images among `ids` that `user` owns with a single UPDATE,
+    returning the status of each id. The UPDATE skips the post_save receivers,
+    so their statistics, list markers and card invalidations are applied here
+    for the whole batch.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        owned, statuses = check_ownership(user, ids)
+        if not owned:
+            return statuses
+        Image.live.filter(pk__in=[row.id for row in owned], user=user).update(deleted_at=now, updated_at=now)
+        refresh_category_stats({row.category_id for row in owned})
+        refresh_user_stats([user.id])
+        mark_changed(get_image_scopes(*owned))
+    invalidate_image_items((row.id, row.updated_at) for row in owned)
+    return statuses
+
+
+def update_images(user, ids, **fields):
+    """
+    Set `fields`, description and/or category, on the images among `ids` that
+    `user` owns with a single UPDATE, returning the status of each id.
+    """
+    with transaction.atomic():
+        owned, statuses = check_ownership(user, ids)
+        if not owned:
+            return statuses
+        owned_ids = [row.id for row in owned]
+        scopes = get_image_scopes(*owned)
+        Image.live.filter(pk__in=owned_ids, user=user).update(**fields, updated_at=timezone.now())
+        if 'category' in fields:
+            # Moving between categories leaves the owner's aggregates as they are.
+            refresh_category_stats({row.category_id for row in owned} | {fields['category'].id})
+            scopes.add(category_scope(fields['category'].id))
+        index_images(Image.objects.filter(pk__in=owned_ids))
+        mark_changed(scopes)
+    invalidate_image_items((row.id, row.updated_at) for row in owned)
+    return statuses
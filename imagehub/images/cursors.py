@@ -0,0 +1,23 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+
+from django.utils.dateparse import parse_datetime
+
+
+def encode_cursor(image):
+    position = f'{image.uploaded_at.isoformat()}|{image.id}'
+    return urlsafe_b64encode(position.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return the (uploaded_at, id) position of a cursor, raising ValueError when it is malformed."""
+    try:
+        position = urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        uploaded_at, pk = position.split('|')
+        uploaded_at, pk = parse_datetime(uploaded_at), int(pk)
+    except (BinasciiError, UnicodeDecodeError) as error:
+        raise ValueError(error)
+
+    if uploaded_at is None:
+        raise ValueError('Invalid cursor timestamp')
+    return uploaded_at, pk
@@ -1,17 +1,102 @@
 from django import forms
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.template.defaultfilters import filesizeformat
+from PIL import Image as PILImage
 
 from .models import Image, Category
+from .registry import registry
+
+
+class ImageHeaderField(forms.ImageField):
+    """
+    Image field that validates only what Pillow reads from the header: the
+    format and the dimensions. Byte and pixel limits are enforced before any
+    decoding, which happens later and off the request in the rendition step.
+    """
+    allowed_formats = ('JPEG', 'PNG', 'GIF', 'WEBP')
+    default_error_messages = {
+        'too_large': 'The file is too large. The maximum size is %(limit)s.',
+        'too_many_pixels': 'The image is too large. The maximum is %(limit)s megapixels.',
+    }
+
+    def to_python(self, data):
+        f = forms.FileField.to_python(self, data)
+        if f is None:
+            return None
+
+        max_bytes = getattr(settings, 'IMAGE_UPLOAD_MAX_BYTES', 20 * 2 ** 20)
+        if getattr(data, 'oversized', False) or data.size > max_bytes:
+            raise ValidationError(self.error_messages['too_large'], code='too_large',
+                                  params={'limit': filesizeformat(max_bytes)})
+
+        if hasattr(data, 'temporary_file_path'):
+            file = data.temporary_file_path()
+        else:
+            file = data
+            file.seek(0)
+
+        max_pixels = getattr(settings, 'IMAGE_UPLOAD_MAX_PIXELS', 40_000_000)
+        try:
+            with PILImage.open(file) as image:
+                image_format, (width, height) = image.format, image.size
+        except PILImage.DecompressionBombError:
+            raise ValidationError(self.error_messages['too_many_pixels'], code='too_many_pixels',
+                                  params={'limit': max_pixels // 10 ** 6})
+        except Exception as exc:
+            raise ValidationError(self.error_messages['invalid_image'], code='invalid_image') from exc
+
+        if image_format not in self.allowed_formats:
+            raise ValidationError(self.error_messages['invalid_image'], code='invalid_image')
+        if width * height > max_pixels:
+            raise ValidationError(self.error_messages['too_many_pixels'], code='too_many_pixels',
+                                  params={'limit': max_pixels // 10 ** 6})
+
+        f.content_type = PILImage.MIME.get(image_format)
+        if hasattr(f, 'seek') and callable(f.seek):
+            f.seek(0)
+        return f
+
+
+class CategoryIterator(forms.models.ModelChoiceIterator):
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield '', self.field.empty_label
+        for category in registry.all():
+            yield self.choice(category)
+
+    def __len__(self):
+        return len(registry.all()) + (self.field.empty_label is not None)
+
+
+class CategoryChoiceField(forms.ModelChoiceField):
+    """Category select whose options and validation come from the category registry, without a query."""
+    iterator = CategoryIterator
+
+    def __init__(self, **kwargs):
+        super().__init__(queryset=Category.objects.all(), **kwargs)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            category = registry.get_by_id(int(value))
+        except (TypeError, ValueError):
+            category = None
+        if category is None:
+            # Possibly created in another worker since this one loaded the registry.
+            return super().to_python(value)
+        return Category(id=category.id, name=category.name, slug=category.slug)
 
 
 class ImageUploadForm(forms.ModelForm):
-    file = forms.ImageField(
+    file = ImageHeaderField(
         label='File',
         widget=forms.FileInput(attrs={'class': 'd-none', 'id': 'hidden-file-input'}),
         required=True
     )
 
-    category = forms.ModelChoiceField(
-        queryset=Category.objects.all(),
+    category = CategoryChoiceField(
         widget=forms.Select(attrs={'class': 'form-select', 'aria-label': 'Select category'}),
         empty_label="Select category",
         required=True
@@ -33,8 +118,7 @@ class ImageUploadForm(forms.ModelForm):
 
 
 class ImageEditForm(forms.ModelForm):
-    category = forms.ModelChoiceField(
-        queryset=Category.objects.all(),
+    category = CategoryChoiceField(
         widget=forms.Select(attrs={'class': 'form-select', 'aria-label': 'Select category'}),
         empty_label="Select category",
         required=True
@@ -0,0 +1,81 @@
+from datetime import timedelta
+from hashlib import md5
+from itertools import product
+
+from django.conf import settings
+from django.core.cache import cache
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+from main.instrumentation import timer
+
+# Rendered into cached owner cards in place of the per-session token.
+CSRF_PLACEHOLDER = 'IMAGE-ITEM-CSRF-TOKEN'
+# Cards of images touched within a day show relative times ("5 minutes ago").
+RECENT_TIMEOUT = 60
+
+
+def get_cache_key(image_id, updated_at, account, owner):
+    return f'image_item:{image_id}:{updated_at.timestamp()}:{int(account)}:{int(owner)}'
+
+
+def get_cache_keys(image_id, updated_at):
+    return [get_cache_key(image_id, updated_at, *_) for _ in product((False, True), repeat=2)]
+
+
+def get_related_version(image):
+    """
+    Digest of the author and category fields a card shows. Renames do not touch
+    the image's updated_at, so cached cards are only reused while it matches.
+    """
+    user, category = image.user, image.category
+    shown = (user.username, user.first_name, user.last_name, user.avatar.name or '', category.name, category.slug)
+    return md5('\0'.join(shown).encode()).hexdigest()
+
+
+def render_image_item(image, request=None, account=False):
+    """Render images/image_item.html through the fragment cache."""
+    user = getattr(request, 'user', None)
+    owner = bool(user is not None and user.is_authenticated and user.id == image.user_id)
+    key = get_cache_key(image.id, image.updated_at, account, owner)
+    version = get_related_version(image)
+
+    cached = cache.get(key)
+    html = cached[1] if isinstance(cached, tuple) and cached[0] == version else None
+    if html is None:
+        with timer('template'):
+            html = render_to_string('images/image_item.html', {
+                'image': image,
+                'account': account,
+                'user': user if owner else None,
+                'csrf_token': CSRF_PLACEHOLDER
+            })
+
+        if timezone.now() - image.updated_at < timedelta(days=1):
+            timeout = RECENT_TIMEOUT
+        else:
+            timeout = getattr(settings, 'IMAGE_ITEM_CACHE_TIMEOUT', 60 * 60 * 24)
+        cache.set(key, (version, html), timeout)
+
+    if owner:
+        html = html.replace(CSRF_PLACEHOLDER, get_token(request))
+    return mark_safe(html)
+
+
+def render_image_items(images, request=None, account=False):
+    """render_image_item for a page of images, for async views to run off the event loop in one call."""
+    return [render_image_item(image, request, account=account) for image in images]
+
+
+def invalidate_image_item(image, *updated_at):
+    keys = list()
+    for value in filter(None, updated_at):
+        keys.extend(get_cache_keys(image.id, value))
+    cache.delete_many(keys)
+
+
+def invalidate_image_items(items):
+    """invalidate_image_item for many (id, updated_at) pairs, in a single cache call."""
+    cache.delete_many([key for pk, updated_at in items for key in get_cache_keys(pk, updated_at)])
@@ -0,0 +1,18 @@
+from main.jobs import job
+
+from .models import Image
+from .processing import PROCESSING_FIELDS, mark_failed, process_image
+from .purge import purge_deleted_images
+
+
+# Failed attempts are retried with the image left pending; it is marked failed once they run out.
+@job('images.process', on_failure=mark_failed)
+def process_uploaded_image(image_id):
+    image = Image.objects.filter(pk=image_id).only(*PROCESSING_FIELDS).first()
+    if image is not None and image.file:
+        process_image(image)
+
+
+@job('images.purge')
+def purge_images(days=None, batch_size=500):
+    purge_deleted_images(days, batch_size)
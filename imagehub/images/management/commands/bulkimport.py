@@ -0,0 +1,151 @@
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image as PILImage, UnidentifiedImageError
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.management import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from images.markers import get_image_scopes, mark_changed
+from images.metadata import extract_metadata
+from images.models import Category, Image
+from images.renditions import build_renditions
+from images.search import index_images
+from images.similarity import dhash
+from images.stats import refresh_category_stats, refresh_user_stats
+from images.storage import content_storage, hash_file
+
+EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp')
+
+
+def inspect_file(path):
+    """Hash a source file and check that Pillow can read it. Runs in a worker process."""
+    try:
+        with PILImage.open(path) as source:
+            source.verify()
+        with File(open(path, 'rb')) as file:
+            return path, hash_file(file), os.path.getsize(path), None
+    except (OSError, UnidentifiedImageError) as error:
+        return path, None, 0, str(error)
+
+
+def store_file(path, content_hash):
+    """Copy a file into media storage, build its renditions, perceptual hash and metadata. Runs in a worker process."""
+    ext = path.split('.')[-1].lower().replace('jpeg', 'jpg')
+    with File(open(path, 'rb')) as file:
+        image = Image(content_hash=content_hash, file=content_storage.save(f'images/{content_hash}.{ext}', file))
+    try:
+        with open(path, 'rb') as file:
+            metadata = extract_metadata(file)
+        return content_hash, image.file.name, build_renditions(image), dhash(path), metadata, None
+    except (OSError, ValueError) as error:
+        return content_hash, image.file.name, dict(), '', dict(), str(error)
+
+
+class Command(BaseCommand):
+    help = 'Import a directory of images, one category per folder, directly through the ORM'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?',
+                            help='Directory with a folder per category (default: api/imagetest_data)')
+        parser.add_argument('--user', action='append', dest='users', default=list(),
+                            help='Username the images are attributed to, may be repeated (default: all active users)')
+        parser.add_argument('--exclude', action='append', default=['avatars'], help='Folders to skip')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Number of worker processes')
+        parser.add_argument('--batch-size', type=int, default=500, help='Number of rows inserted per query')
+
+    def handle(self, *args, **options):
+        root = options['path'] or os.path.join(apps.get_app_config('api').path, 'imagetest_data')
+        if not os.path.isdir(root):
+            raise CommandError(f'"{root}" is not a directory.')
+
+        users = get_user_model().objects.filter(is_active=True)
+        if options['users']:
+            users = users.filter(username__in=options['users'])
+        user_ids = list(users.values_list('id', flat=True))
+        if not user_ids:
+            raise CommandError('No users to attribute the images to.')
+
+        sources, category_ids = list(), list()
+        for folder in sorted(os.listdir(root)):
+            directory = os.path.join(root, folder)
+            if folder in options['exclude'] or not os.path.isdir(directory):
+                continue
+
+            category = Category.objects.filter(slug=folder).first()
+            if category is None:
+                name = folder.replace('-', ' ').replace('_', ' ').title()
+                category = Category.objects.create(name=name, slug=folder)
+            category_ids.append(category.id)
+            sources.extend((os.path.join(directory, name), category.id) for name in sorted(os.listdir(directory))
+                           if name.lower().endswith(EXTENSIONS))
+
+        # Forked workers must not inherit the parent's database connections.
+        connections.close_all()
+        started = time.monotonic()
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            inspected = dict()
+            total_bytes = 0
+            results = executor.map(inspect_file, [path for path, _ in sources], chunksize=16)
+            for path, content_hash, size, error in results:
+                if error:
+                    self.stdout.write(self.style.WARNING(f'{path} skipped: {error}'))
+                    continue
+                inspected[path] = content_hash
+                total_bytes += size
+            hashed_in = max(time.monotonic() - started, 0.001)
+
+            # Resuming: files already imported into the same category are recognised by their content hash.
+            existing = set(Image.objects.filter(category_id__in=category_ids)
+                           .values_list('content_hash', 'category_id'))
+            pending = dict()
+            for path, category_id in sources:
+                content_hash = inspected.get(path)
+                if content_hash is None or (content_hash, category_id) in existing:
+                    continue
+                existing.add((content_hash, category_id))
+                pending.setdefault(content_hash, (path, list()))[1].append(category_id)
+
+            created = failed = 0
+            batch = list()
+            paths = [path for path, _ in pending.values()]
+            results = executor.map(store_file, paths, pending, chunksize=4)
+            for content_hash, name, renditions, phash, metadata, error in results:
+                if error:
+                    failed += 1
+                    self.stdout.write(self.style.WARNING(f'{pending[content_hash][0]} has no renditions: {error}'))
+
+                batch.extend(
+                    Image(file=name, content_hash=content_hash, renditions=renditions, phash=phash, **metadata,
+                          category_id=category_id, user_id=random.choice(user_ids),
+                          processing_status=Image.FAILED if error else Image.READY)
+                    for category_id in pending[content_hash][1]
+                )
+                if len(batch) >= options['batch_size']:
+                    created += self.insert(batch)
+            created += self.insert(batch)
+
+        refresh_category_stats()
+        refresh_user_stats(user_ids)
+        elapsed = max(time.monotonic() - started, 0.001)
+        self.stdout.write(self.style.SUCCESS(
+            f'{created} images imported, {len(sources) - created} skipped, {failed} without renditions in '
+            f'{elapsed:.1f}s ({created / elapsed:.1f} images/s, {total_bytes / 2 ** 20 / hashed_in:.1f} MB/s hashed)'
+        ))
+
+    @staticmethod
+    def insert(batch):
+        # Committed per batch, so an interrupted import resumes after the last full batch.
+        with transaction.atomic():
+            Image.objects.bulk_create(batch)
+            # bulk_create skips post_save, so the search documents are written here.
+            index_images(Image.objects.filter(pk__in=[image.pk for image in batch]))
+            mark_changed(get_image_scopes(*batch))
+        count = len(batch)
+        batch.clear()
+        return count
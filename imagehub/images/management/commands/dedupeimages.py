@@ -0,0 +1,75 @@
+import os
+
+from django.core.management import BaseCommand
+
+from images.models import Image
+from images.renditions import get_rendition_name
+from images.storage import hash_file
+
+
+class Command(BaseCommand):
+    help = 'Move stored images to content hash names and collapse duplicate files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report duplicates without touching files')
+        parser.add_argument('--batch-size', type=int, default=500, help='Number of images loaded per query')
+
+    def handle(self, *args, **options):
+        storage = Image._meta.get_field('file').storage
+        hashes, relocated = dict(), dict()
+        moved = collapsed = reclaimed = 0
+
+        queryset = Image.objects.order_by('id').only('id', 'file', 'content_hash', 'renditions')
+        for image in queryset.iterator(chunk_size=options['batch_size']):
+            name = image.file.name
+            if name in relocated and not options['dry_run']:
+                Image.objects.filter(pk=image.pk).update(**relocated[name])
+                continue
+            if not name or not storage.exists(name):
+                continue
+
+            if name not in hashes:
+                with storage.open(name, 'rb') as file:
+                    hashes[name] = hash_file(file)
+            content_hash = hashes[name]
+
+            ext = name.split('.')[-1].lower().replace('jpeg', 'jpg')
+            target = f'images/{content_hash}.{ext}'
+            if name == target:
+                if image.content_hash != content_hash and not options['dry_run']:
+                    Image.objects.filter(pk=image.pk).update(content_hash=content_hash)
+                continue
+
+            duplicate = storage.exists(target)
+            if duplicate:
+                collapsed += 1
+                reclaimed += storage.size(name)
+            else:
+                moved += 1
+
+            if options['dry_run']:
+                continue
+
+            renditions = dict()
+            for size, rendition in (image.renditions or {}).items():
+                renamed = get_rendition_name(target, size, rendition.split('.')[-1])
+                if storage.exists(rendition):
+                    if storage.exists(renamed):
+                        storage.delete(rendition)
+                    else:
+                        os.replace(storage.path(rendition), storage.path(renamed))
+                if storage.exists(renamed):
+                    renditions[size] = renamed
+
+            if duplicate:
+                storage.delete(name)
+            else:
+                os.replace(storage.path(name), storage.path(target))
+            hashes[target] = content_hash
+
+            relocated[name] = {'file': target, 'content_hash': content_hash, 'renditions': renditions}
+            Image.objects.filter(pk=image.pk).update(**relocated[name])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{moved} files renamed, {collapsed} duplicates collapsed, {reclaimed} bytes reclaimed'
+        ))
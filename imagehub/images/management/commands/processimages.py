@@ -0,0 +1,34 @@
+from django.core.management import BaseCommand
+from django.db.models import Q
+
+from images.models import Image
+from images.processing import PROCESSING_FIELDS, mark_failed, process_image
+
+
+class Command(BaseCommand):
+    help = 'Generate missing renditions, perceptual hashes and metadata for existing images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Rebuild renditions that already exist')
+        parser.add_argument('--batch-size', type=int, default=500, help='Number of images loaded per query')
+
+    def handle(self, *args, **options):
+        queryset = Image.objects.order_by('id')
+        if not options['force']:
+            queryset = queryset.filter(Q(renditions={}) | Q(phash='') | Q(width__isnull=True)
+                                       | ~Q(processing_status=Image.READY))
+
+        processed = 0
+        for image in queryset.only(*PROCESSING_FIELDS).iterator(chunk_size=options['batch_size']):
+            if not image.file:
+                continue
+
+            try:
+                process_image(image, force=options['force'])
+            except (OSError, ValueError) as error:
+                mark_failed(image.id)
+                self.stdout.write(self.style.WARNING(f'Image {image.id} skipped: {error}'))
+                continue
+            processed += 1
+
+        self.stdout.write(self.style.SUCCESS(f'{processed} images processed'))
@@ -0,0 +1,22 @@
+from django.core.management import BaseCommand
+
+from images.purge import purge_deleted_images
+
+
+class Command(BaseCommand):
+    help = 'Hard delete images soft deleted longer ago than the retention period, along with their files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Retention period, DELETED_IMAGE_RETENTION_DAYS by default')
+        parser.add_argument('--batch-size', type=int, default=500, help='Number of images deleted per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Report expired images without deleting them')
+
+    def handle(self, *args, **options):
+        images, files, reclaimed = purge_deleted_images(options['days'], options['batch_size'], options['dry_run'])
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'{images} images to purge, {reclaimed} bytes of originals'))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'{images} images purged, {files} files deleted, {reclaimed} bytes reclaimed'
+        ))
@@ -0,0 +1,16 @@
+import time
+
+from django.core.management import BaseCommand
+
+from images.search import get_backend, rebuild
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index of image descriptions, category names and usernames'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        count = rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'{count} images indexed with the {get_backend().__name__} in {time.monotonic() - started:.1f}s'
+        ))
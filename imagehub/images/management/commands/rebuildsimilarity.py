@@ -0,0 +1,16 @@
+import time
+
+from django.core.management import BaseCommand
+
+from images.similarity import index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the perceptual hash index used for near-duplicate search and save it to PHASH_INDEX_PATH'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        size = index.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'{size} images indexed in {time.monotonic() - started:.1f}s, saved to {index.get_path()}'
+        ))
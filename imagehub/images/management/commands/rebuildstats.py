@@ -0,0 +1,12 @@
+from django.core.management import BaseCommand
+
+from images.stats import refresh_category_stats, refresh_user_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized per-category and per-user image statistics'
+
+    def handle(self, *args, **options):
+        categories = refresh_category_stats()
+        users = refresh_user_stats()
+        self.stdout.write(self.style.SUCCESS(f'Statistics rebuilt for {categories} categories and {users} users'))
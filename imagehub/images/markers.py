@@ -0,0 +1,49 @@
+from datetime import datetime, timezone as dt_timezone
+
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import ChangeMarker
+
+ALL = 'all'
+EPOCH = datetime.fromtimestamp(0, dt_timezone.utc)
+
+
+def category_scope(category_id):
+    return f'category:{category_id}'
+
+
+def user_scope(user_id):
+    return f'user:{user_id}'
+
+
+def get_image_scopes(*images):
+    """Scopes of the lists an image appears in, given objects with category_id and user_id."""
+    scopes = {ALL}
+    for image in images:
+        scopes.update((category_scope(image.category_id), user_scope(image.user_id)))
+    return scopes
+
+
+def get_queryset_scopes(queryset):
+    """Scopes of every list showing one of the images in `queryset`."""
+    scopes = {ALL}
+    for category_id, user_id in queryset.order_by().values_list('category_id', 'user_id').distinct():
+        scopes.update((category_scope(category_id), user_scope(user_id)))
+    return scopes
+
+
+def mark_changed(scopes):
+    ChangeMarker.objects.bulk_create(
+        [ChangeMarker(scope=scope, changed_at=timezone.now()) for scope in scopes],
+        update_conflicts=True, unique_fields=['scope'], update_fields=['changed_at']
+    )
+
+
+def get_changed_at(*scopes):
+    """
+    Latest change of any of `scopes`. Lists that have not changed since
+    markers were introduced have none yet and count as changed at EPOCH.
+    """
+    changed_at = ChangeMarker.objects.filter(scope__in=scopes).aggregate(latest=Max('changed_at'))['latest']
+    return changed_at or EPOCH
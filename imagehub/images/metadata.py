@@ -0,0 +1,50 @@
+import base64
+import os
+from io import BytesIO
+
+from PIL import Image as PILImage, ImageOps
+
+# Longest side of the inline placeholder, stretched and smoothed by the browser while the card loads.
+PLACEHOLDER_SIZE = 8
+PALETTE_SIZE = 5
+FIELDS = ('width', 'height', 'file_size', 'mime_type', 'dominant_color', 'placeholder')
+# EXIF orientations that rotate the picture by 90 degrees, swapping its width and height.
+TRANSPOSED = (5, 6, 7, 8)
+
+
+def extract_metadata(file):
+    """
+    Intrinsic metadata of an image file, as a dict of the FIELDS columns:
+    displayed dimensions (after EXIF rotation), byte size, MIME type, the most
+    common color as #rrggbb and a tiny PNG of the picture as a data URI.
+    """
+    file.seek(0, os.SEEK_END)
+    file_size = file.tell()
+    file.seek(0)
+
+    with PILImage.open(file) as source:
+        mime_type = source.get_format_mimetype() or ''
+        width, height = source.size
+        if source.getexif().get(0x0112) in TRANSPOSED:
+            width, height = height, width
+
+        source.draft('RGB', (PLACEHOLDER_SIZE * 8, PLACEHOLDER_SIZE * 8))
+        small = ImageOps.exif_transpose(source).convert('RGB')
+        small.thumbnail((PLACEHOLDER_SIZE * 8, PLACEHOLDER_SIZE * 8))
+
+    palette = small.quantize(PALETTE_SIZE)
+    _, index = max(palette.getcolors())
+    red, green, blue = palette.getpalette()[index * 3:index * 3 + 3]
+
+    small.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+    buffer = BytesIO()
+    small.save(buffer, 'PNG', optimize=True)
+
+    return {
+        'width': width,
+        'height': height,
+        'file_size': file_size,
+        'mime_type': mime_type,
+        'dominant_color': f'#{red:02x}{green:02x}{blue:02x}',
+        'placeholder': f'data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode()}',
+    }
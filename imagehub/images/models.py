@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Q
 from django.contrib.auth import get_user_model
 from django.utils.text import slugify
 from django.utils import timezone
@@ -8,11 +9,20 @@ from uuid import uuid4
 from unidecode import unidecode
 from datetime import timedelta
 
+from main.validators import validate_unreserved_slug
+
+from .storage import content_storage, hash_file
+
 
 class Category(models.Model):
-    name = models.CharField(max_length=100, unique=True)
-    slug = models.SlugField(max_length=100, unique=True, blank=True)
+    # The slug defaults to the slugified name, and both are checked against the names of site pages.
+    name = models.CharField(max_length=100, unique=True, validators=[validate_unreserved_slug])
+    slug = models.SlugField(max_length=100, unique=True, blank=True, validators=[validate_unreserved_slug])
     created_at = models.DateTimeField(auto_now_add=True)
+    image_count = models.PositiveIntegerField(default=0, editable=False)
+    latest_image = models.ForeignKey('Image', on_delete=models.SET_NULL, null=True, blank=True,
+                                     editable=False, related_name='+')
+    last_uploaded_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     def __str__(self):
         return self.name
@@ -28,8 +38,59 @@ def get_images_uuid(instance, filename):
     return f'images/{uuid4().hex}.{ext}'
 
 
+def get_images_hash(instance, filename):
+    ext = filename.split('.')[-1].lower().replace('jpeg', 'jpg')
+    if not instance.content_hash:
+        # Uploads streamed in by ImageUploadHandler arrive already hashed.
+        instance.content_hash = getattr(instance.file.file, 'content_hash', None) or hash_file(instance.file)
+    return f'images/{instance.content_hash}.{ext}'
+
+
+class ImageQuerySet(models.QuerySet):
+    # Columns read by ImageSerializer and images/image_item.html.
+    list_fields = (
+        'id', 'file', 'renditions', 'processing_status', 'description', 'category_id', 'user_id',
+        'width', 'height', 'file_size', 'mime_type', 'dominant_color', 'placeholder',
+        'uploaded_at', 'updated_at', 'deleted_at',
+        'category__id', 'category__name', 'category__slug',
+        'user__id', 'user__username', 'user__first_name', 'user__last_name', 'user__avatar',
+    )
+
+    def with_related(self):
+        return self.select_related('user', 'category').only(*self.list_fields)
+
+    def live(self):
+        return self.filter(deleted_at__isnull=True)
+
+    def deleted(self):
+        return self.filter(deleted_at__isnull=False)
+
+
+class LiveImageManager(models.Manager.from_queryset(ImageQuerySet)):
+    """Only images that have not been soft deleted, matching the partial indexes below."""
+
+    def get_queryset(self):
+        return super().get_queryset().live()
+
+
 class Image(models.Model):
-    file = models.ImageField(upload_to=get_images_uuid)
+    PENDING = 'pending'
+    READY = 'ready'
+    FAILED = 'failed'
+    PROCESSING_CHOICES = [(PENDING, 'Pending'), (READY, 'Ready'), (FAILED, 'Failed')]
+
+    file = models.ImageField(upload_to=get_images_hash, storage=content_storage)
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True, editable=False)
+    renditions = models.JSONField(default=dict, blank=True, editable=False)
+    processing_status = models.CharField(max_length=10, choices=PROCESSING_CHOICES, default=PENDING,
+                                         editable=False)
+    phash = models.CharField(max_length=16, blank=True, editable=False)
+    width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    file_size = models.PositiveBigIntegerField(null=True, blank=True, editable=False)
+    mime_type = models.CharField(max_length=32, blank=True, editable=False)
+    dominant_color = models.CharField(max_length=7, blank=True, editable=False)
+    placeholder = models.TextField(blank=True, editable=False)
     description = models.TextField(blank=True)
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
     user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE)
@@ -38,9 +99,74 @@ class Image(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     deleted_at = models.DateTimeField(null=True, blank=True)
 
+    objects = ImageQuerySet.as_manager()
+    live = LiveImageManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-uploaded_at', '-id'], condition=Q(deleted_at__isnull=True),
+                         name='image_live_uploaded_idx'),
+            models.Index(fields=['category', '-uploaded_at', '-id'], condition=Q(deleted_at__isnull=True),
+                         name='image_live_category_idx'),
+            models.Index(fields=['user', '-uploaded_at', '-id'], condition=Q(deleted_at__isnull=True),
+                         name='image_live_user_idx'),
+            models.Index(fields=['deleted_at', 'id'], condition=Q(deleted_at__isnull=False),
+                         name='image_deleted_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.description[:30]}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.track_state()
+        return instance
+
+    def track_state(self):
+        """Remember the fields that denormalized statistics depend on, as they were loaded."""
+        if {'category_id', 'deleted_at'} <= self.__dict__.keys():
+            self._tracked_state = {'category_id': self.category_id, 'live': self.deleted_at is None}
+        else:
+            self._tracked_state = None
+        self._tracked_updated_at = self.__dict__.get('updated_at')
+
+    def load_tracked_state(self):
+        """Read the tracked fields from the database, for instances loaded without them."""
+        row = Image.objects.filter(pk=self.pk).values('category_id', 'deleted_at').first()
+        if row is not None:
+            self._tracked_state = {'category_id': row['category_id'], 'live': row['deleted_at'] is None}
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and getattr(self, '_tracked_state', None) is None:
+            # Loaded with only() or defer(): the statistics need the previous category and state.
+            self.load_tracked_state()
+        if self.file_size is None and self.file and not self.file._committed:
+            # Known for free from the upload, and needed by the owner's byte count before processing runs.
+            self.file_size = self.file.size
+        # Statistics are updated by post_save receivers and must commit together with the row.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+        self.track_state()
+
+    def get_rendition_url(self, size):
+        name = (self.renditions or {}).get(size)
+        if name:
+            return self.file.storage.url(name)
+        return self.file.url
+
+    @property
+    def card_url(self):
+        return self.get_rendition_url('card')
+
+    @property
+    def detail_url(self):
+        return self.get_rendition_url('detail')
+
+    @property
+    def thumb_url(self):
+        return self.get_rendition_url('thumb')
+
     def format_uploaded_at(self):
         return self._get_formatted_time(self.uploaded_at)
 
@@ -56,3 +182,16 @@ class Image(models.Model):
             return time_diff + " ago"
         else:
             return dt.strftime("%d.%m.%Y %H:%M")
+
+
+class SearchTerm(models.Model):
+    """Inverted index row used for search on databases without SQLite FTS5."""
+    term = models.CharField(max_length=64, db_index=True)
+    image = models.ForeignKey(Image, on_delete=models.CASCADE, related_name='+')
+    weight = models.PositiveSmallIntegerField(default=1)
+
+
+class ChangeMarker(models.Model):
+    """When a list of images last changed: every image ("all"), one category's or one user's."""
+    scope = models.CharField(max_length=64, primary_key=True)
+    changed_at = models.DateTimeField()
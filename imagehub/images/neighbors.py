@@ -0,0 +1,75 @@
+from bisect import bisect_left
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db.models import Q
+
+from .markers import category_scope, get_changed_at, user_scope
+from .models import Image
+from .resolver import ACCOUNT, CATEGORY
+
+FOLLOWING = 10
+# Entries are keyed by the timeline's change marker, so this only bounds how long superseded ones linger.
+CACHE_TIMEOUT = 60 * 60
+
+Neighbors = namedtuple('Neighbors', ['previous', 'next', 'following'])
+
+
+def get_timeline(image, timeline):
+    """The live images of the category or account timeline `image` belongs to, and the scope of its marker."""
+    if timeline == ACCOUNT:
+        return Image.live.filter(user_id=image.user_id), user_scope(image.user_id)
+    return Image.live.filter(category_id=image.category_id), category_scope(image.category_id)
+
+
+def after(queryset, image):
+    return queryset.filter(
+        Q(uploaded_at__gt=image.uploaded_at) | Q(uploaded_at=image.uploaded_at, id__gt=image.id)
+    ).order_by('uploaded_at', 'id')
+
+
+def before(queryset, image):
+    return queryset.filter(
+        Q(uploaded_at__lt=image.uploaded_at) | Q(uploaded_at=image.uploaded_at, id__lt=image.id)
+    ).order_by('-uploaded_at', '-id')
+
+
+def find_neighbors(image, timeline, count=FOLLOWING):
+    """
+    Ids of the images around `image` in its timeline, ordered by (uploaded_at, id).
+
+    Both sides come from one query, each read from the timeline's index: the
+    `count` images after it and as many before it. The newest image has no
+    following ones, so the images before it, newest first, take their place.
+    """
+    queryset, _ = get_timeline(image, timeline)
+    rows = sorted(queryset.filter(
+        Q(id__in=after(queryset, image).values('id')[:count]) | Q(id__in=before(queryset, image).values('id')[:count])
+    ).order_by().values_list('uploaded_at', 'id'))
+
+    position = bisect_left(rows, (image.uploaded_at, image.id))
+    older, newer = [pk for _, pk in rows[:position]], [pk for _, pk in rows[position:]]
+    return Neighbors(
+        previous=older[-1] if older else None,
+        next=newer[0] if newer else None,
+        following=newer or older[::-1],
+    )
+
+
+def get_neighbors(image, timeline, count=FOLLOWING):
+    """find_neighbors, cached until the timeline changes. `image` needs id, user_id, category_id and uploaded_at."""
+    _, scope = get_timeline(image, timeline)
+    key = f'neighbors:{scope}:{image.id}:{count}:{get_changed_at(scope).timestamp()}'
+    neighbors = cache.get(key)
+    if neighbors is None:
+        neighbors = find_neighbors(image, timeline, count)
+        cache.set(key, neighbors, CACHE_TIMEOUT)
+    return neighbors
+
+
+def get_following_queryset(image, timeline, neighbors=None):
+    """Every image following `image` in the order of Neighbors.following, ready for listing and pagination."""
+    queryset, _ = get_timeline(image, timeline)
+    neighbors = neighbors or get_neighbors(image, timeline)
+    queryset = queryset.with_related()
+    return after(queryset, image) if neighbors.next is not None else before(queryset, image)
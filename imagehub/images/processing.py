@@ -0,0 +1,54 @@
+from .fragments import invalidate_image_item
+from .markers import get_image_scopes, mark_changed
+from .metadata import FIELDS as METADATA_FIELDS, extract_metadata
+from .models import Image
+from .renditions import build_renditions, delete_renditions
+from .similarity import dhash, index
+
+# Columns process_image reads, for callers loading images with only().
+PROCESSING_FIELDS = ('id', 'file', 'renditions', 'phash', 'width', 'content_hash', 'category_id', 'user_id',
+                     'updated_at')
+
+
+def process_image(image, force=False):
+    """
+    Build the renditions, perceptual hash and metadata of an image and mark it
+    ready, skipping the parts that already exist unless `force` is set.
+    Duplicate uploads share the stored file, and with it the results of the
+    first copy.
+    """
+    shared = None
+    if force:
+        delete_renditions(image)
+    else:
+        shared = (Image.objects.filter(file=image.file.name, width__isnull=False).exclude(pk=image.pk)
+                  .exclude(renditions={}).exclude(phash='').values('renditions', 'phash', *METADATA_FIELDS).first())
+
+    if shared:
+        values = shared
+    else:
+        # OSError and ValueError propagate with the image still pending: only the caller knows whether it retries.
+        values = dict()
+        if force or not image.renditions:
+            values['renditions'] = build_renditions(image)
+        with image.file.open('rb') as file:
+            if force or not image.phash:
+                values['phash'] = dhash(file)
+            if force or image.width is None:
+                values.update(extract_metadata(file))
+
+    for field, value in values.items():
+        setattr(image, field, value)
+    image.processing_status = Image.READY
+    # A queryset update keeps updated_at, and with it cached fragments and the edit history, untouched.
+    Image.objects.filter(pk=image.pk).update(processing_status=Image.READY, **values)
+    index.add(image.pk, image.phash)
+    # Cards cached while the image was pending point at the original file.
+    invalidate_image_item(image, image.__dict__.get('updated_at'))
+    # Lists serialize the rendition URLs, so their validators must change although updated_at did not.
+    mark_changed(get_image_scopes(image))
+    return image.renditions
+
+
+def mark_failed(image_id):
+    Image.objects.filter(pk=image_id).update(processing_status=Image.FAILED)
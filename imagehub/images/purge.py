@@ -0,0 +1,91 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .models import Image
+from .search import remove_images
+
+_purging = ContextVar('purging_images', default=False)
+
+
+@contextmanager
+def purging():
+    """Make the per-row post_delete receivers step aside while images are deleted in bulk."""
+    token = _purging.set(True)
+    try:
+        yield
+    finally:
+        _purging.reset(token)
+
+
+def is_purging():
+    return _purging.get()
+
+
+def get_cutoff(days=None):
+    if days is None:
+        days = getattr(settings, 'DELETED_IMAGE_RETENTION_DAYS', 30)
+    return timezone.now() - timedelta(days=days)
+
+
+def delete_files(rows):
+    """
+    Delete the originals and renditions of purged (file, renditions) rows that
+    no image still points at, returning (files deleted, bytes reclaimed).
+    Run after the rows' deletion committed, never inside its transaction.
+    """
+    storage = Image._meta.get_field('file').storage
+    names = {name for name, _ in rows if name}
+
+    deleted = reclaimed = 0
+    # Checked under the lock uploads restore their file under, so one committed in the meantime keeps it.
+    with storage.lock(*names):
+        # Deduplicated uploads share one stored file between several rows.
+        referenced = set(Image.objects.filter(file__in=names).values_list('file', flat=True))
+        for name, renditions in rows:
+            if not name or name in referenced:
+                continue
+            referenced.add(name)
+            for path in (name, *(renditions or {}).values()):
+                try:
+                    size = storage.size(path)
+                    storage.delete(path)
+                except OSError:
+                    continue
+                deleted += 1
+                reclaimed += size
+    return deleted, reclaimed
+
+
+def purge_deleted_images(days=None, batch_size=500, dry_run=False):
+    """
+    Hard delete the images soft deleted more than `days` days ago, default
+    DELETED_IMAGE_RETENTION_DAYS, in batches of `batch_size` rows.
+
+    Each batch commits on its own; its files are only removed afterwards, so
+    a rollback never leaves rows pointing at missing files. Returns (images,
+    files, bytes), bytes being the originals' recorded sizes for a dry run.
+    """
+    expired = Image.objects.filter(deleted_at__lt=get_cutoff(days)).order_by('deleted_at', 'id')
+    if dry_run:
+        totals = expired.aggregate(images=Count('id'), size=Sum('file_size'))
+        return totals['images'], None, totals['size'] or 0
+
+    images = files = reclaimed = 0
+    while True:
+        with transaction.atomic(), purging():
+            batch = list(expired.values_list('id', 'file', 'renditions')[:batch_size])
+            if not batch:
+                break
+            ids = [pk for pk, _, _ in batch]
+            Image.objects.filter(pk__in=ids).delete()
+            remove_images(ids)
+
+        deleted, size = delete_files([(name, renditions) for _, name, renditions in batch])
+        images, files, reclaimed = images + len(batch), files + deleted, reclaimed + size
+    return images, files, reclaimed
@@ -0,0 +1,65 @@
+import threading
+import time
+from uuid import uuid4
+
+from django.core.cache import cache
+
+from .models import Category
+
+VERSION_KEY = 'category_registry:version'
+# Upper bound on staleness when the cache is not shared between workers, as with the default LocMemCache.
+MAX_AGE = 60
+
+
+class CategoryRegistry:
+    """
+    Process-local snapshot of the categories' id, name and slug.
+
+    Every worker keeps its own copy and reloads it when the version stored in
+    the cache moves, which saving or deleting a category does, or after
+    MAX_AGE seconds. The instances are shared between threads and only carry
+    id, name and slug; callers must not modify them.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.loaded_at = 0
+        self.categories = ()
+        self.by_id = dict()
+        self.by_slug = dict()
+
+    @staticmethod
+    def get_version():
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            cache.add(VERSION_KEY, uuid4().hex, None)
+            version = cache.get(VERSION_KEY)
+        return version
+
+    def ensure_current(self):
+        version = self.get_version()
+        with self.lock:
+            if version != self.version or time.monotonic() - self.loaded_at > MAX_AGE:
+                categories = tuple(Category.objects.order_by('id').only('id', 'name', 'slug'))
+                self.categories = categories
+                self.by_id = {category.id: category for category in categories}
+                self.by_slug = {category.slug.lower(): category for category in categories}
+                self.version, self.loaded_at = version, time.monotonic()
+            return self
+
+    def all(self):
+        return self.ensure_current().categories
+
+    def get(self, slug):
+        """The category with `slug`, matched case-insensitively, or None."""
+        return self.ensure_current().by_slug.get((slug or '').lower())
+
+    def get_by_id(self, pk):
+        return self.ensure_current().by_id.get(pk)
+
+    def invalidate(self):
+        cache.set(VERSION_KEY, uuid4().hex, None)
+
+
+registry = CategoryRegistry()
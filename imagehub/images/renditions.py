@@ -0,0 +1,51 @@
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image as PILImage, ImageOps
+
+RENDITIONS = {
+    'card': 600,
+    'detail': 1600,
+    'thumb': 200,
+}
+
+
+def get_rendition_name(name, size, ext):
+    root, _ = os.path.splitext(name)
+    return f'{root}_{size}.{ext}'
+
+
+def build_renditions(image):
+    """Write every size from RENDITIONS next to the original and return a {size: name} map."""
+    storage = image.file.storage
+    renditions = dict()
+
+    with image.file.open('rb') as file:
+        with PILImage.open(file) as source:
+            # Let JPEG decode at a reduced scale so memory is bounded by the largest rendition.
+            largest = max(RENDITIONS.values())
+            source.draft(None, (largest, largest))
+            source = ImageOps.exif_transpose(source)
+            has_alpha = source.mode in ('RGBA', 'LA') or 'transparency' in source.info
+            fmt, ext = ('PNG', 'png') if has_alpha else ('JPEG', 'jpg')
+            source = source.convert('RGBA' if has_alpha else 'RGB')
+
+            for size, width in RENDITIONS.items():
+                name = get_rendition_name(image.file.name, size, ext)
+                if not storage.exists(name):
+                    copy = source.copy()
+                    copy.thumbnail((width, width * 4))
+
+                    buffer = BytesIO()
+                    copy.save(buffer, fmt, quality=85, optimize=True)
+                    name = storage.save(name, ContentFile(buffer.getvalue()))
+                renditions[size] = name
+
+    return renditions
+
+
+def delete_renditions(image):
+    storage = image.file.storage
+    for name in (image.renditions or {}).values():
+        storage.delete(name)
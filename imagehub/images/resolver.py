@@ -0,0 +1,34 @@
+from django.contrib.auth import get_user_model
+
+from .registry import registry
+
+CATEGORY = 'category'
+ACCOUNT = 'account'
+
+
+class SlugResolver:
+    """
+    Maps the first segment of board and image URLs to a category or an account.
+
+    Categories come from the registry and take precedence. Usernames are
+    matched exactly, through their unique index, in a single query; its row
+    is the one the page needs anyway, so it is not cached.
+    """
+
+    @staticmethod
+    def get_kind(slug):
+        """Whether `slug` names a category or, failing that, an account, without a query."""
+        return CATEGORY if registry.get(slug) is not None else ACCOUNT
+
+    @staticmethod
+    def get_object(slug):
+        """The (kind, Category or User) `slug` names, or None, with at most one query."""
+        category = registry.get(slug)
+        if category is not None:
+            return CATEGORY, category
+
+        user = get_user_model().objects.filter(username=slug).first()
+        return (ACCOUNT, user) if user is not None else None
+
+
+resolver = SlugResolver()
@@ -0,0 +1,74 @@
+import random
+
+from django.db.models import Max, Min
+
+from .models import Image
+
+# Id ranges at most this wide are sampled exactly from the full list of live ids.
+DENSE_SPAN = 2000
+# How many random ids are probed per wanted image, to make up for gaps left by deleted rows.
+OVERSAMPLE = 4
+PROBE_ROUNDS = 3
+SCAN_LIMIT = 500
+
+
+def sample_live_images(count, exclude=()):
+    """
+    Pick up to `count` random live images without sorting or counting the table.
+
+    Random ids are drawn from the [min(id), max(id)] range and resolved with a
+    primary key lookup, so the cost depends on `count`, not on the table size.
+    Excluded ids are filtered in Python and never sent to the database.
+    """
+    exclude = set(exclude)
+    queryset = Image.live.all()
+
+    bounds = Image.objects.aggregate(low=Min('id'), high=Max('id'))
+    low, high = bounds['low'], bounds['high']
+    if low is None:
+        return list()
+
+    if high - low < DENSE_SPAN:
+        ids = [_ for _ in queryset.values_list('id', flat=True) if _ not in exclude]
+        return _fetch(random.sample(ids, min(count, len(ids))))
+
+    selected = list()
+    probed = set(exclude)
+    for _ in range(PROBE_ROUNDS):
+        wanted = count - len(selected)
+        if wanted <= 0:
+            break
+
+        candidates = set()
+        for _ in range(wanted * OVERSAMPLE):
+            candidate = random.randint(low, high)
+            if candidate not in probed:
+                candidates.add(candidate)
+        probed.update(candidates)
+
+        found = list(queryset.filter(id__in=candidates).values_list('id', flat=True))
+        random.shuffle(found)
+        selected.extend(found[:wanted])
+
+    if len(selected) < count:
+        # Sparse or mostly excluded ranges: walk the primary key index both ways from a random pivot,
+        # one keyset window at a time, until enough images are found or the table runs out.
+        pivot = random.randint(low, high)
+        skip = exclude | set(selected)
+        for window, order, lookup in ((queryset.filter(id__gte=pivot), 'id', 'id__gt'),
+                                      (queryset.filter(id__lt=pivot), '-id', 'id__lt')):
+            last = None
+            while len(selected) < count:
+                page = window.filter(**{lookup: last}) if last is not None else window
+                ids = list(page.order_by(order).values_list('id', flat=True)[:SCAN_LIMIT])
+                selected.extend([_ for _ in ids if _ not in skip][:count - len(selected)])
+                if len(ids) < SCAN_LIMIT:
+                    break
+                last = ids[-1]
+
+    return _fetch(selected)
+
+
+def _fetch(ids):
+    images = Image.objects.with_related().in_bulk(ids)
+    return [images[_] for _ in ids if _ in images]
@@ -0,0 +1,177 @@
+import re
+from collections import Counter
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import FloatField, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
+from unidecode import unidecode
+
+from .models import Image, SearchTerm
+
+FTS_TABLE = 'images_image_fts'
+# Relative weight of a match in each indexed field.
+WEIGHTS = {'description': 1, 'category': 3, 'username': 2}
+MAX_TERMS = 8
+CHUNK_SIZE = 1000
+
+
+def tokenize(text):
+    return list(dict.fromkeys(re.findall(r'\w+', (text or '').lower())))[:MAX_TERMS]
+
+
+def get_documents(queryset):
+    # Soft deleted images stay indexed for the admin; public searches start from Image.live.
+    return (queryset.order_by().values_list('id', 'description', 'category__name', 'user__username')
+            .iterator(chunk_size=CHUNK_SIZE))
+
+
+def chunked(iterable, size=CHUNK_SIZE):
+    chunk = list()
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = list()
+    if chunk:
+        yield chunk
+
+
+class FTS5Backend:
+    """SQLite FTS5 virtual table keyed by image id, ranked with bm25."""
+
+    @staticmethod
+    def install():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                f"description, category, username, tokenize = 'unicode61 remove_diacritics 2')"
+            )
+
+    @staticmethod
+    def index(documents):
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(_[0],) for _ in documents])
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, description, category, username) VALUES (%s, %s, %s, %s)',
+                documents
+            )
+
+    @staticmethod
+    def remove(ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(_,) for _ in ids])
+
+    @staticmethod
+    def clear():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+    @staticmethod
+    def search(queryset, query):
+        terms = tokenize(query)
+        if not terms:
+            return queryset.none()
+
+        # Every term must match, as a prefix so that results show up while a word is still being typed.
+        expression = ' '.join(f'"{term}"*' for term in terms)
+        weights = ', '.join(str(_) for _ in WEIGHTS.values())
+        matching = RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [expression])
+        # Correlated on rowid, which FTS5 seeks to within the match instead of scanning it.
+        rank = RawSQL(
+            f'SELECT -bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = {Image._meta.db_table}.id',
+            [expression], output_field=FloatField()
+        )
+        return queryset.filter(id__in=matching).annotate(search_rank=rank).order_by('-search_rank', '-id')
+
+
+class InvertedIndexBackend:
+    """Term to image table for databases without a full-text engine, ranked by weighted term frequency."""
+
+    @staticmethod
+    def install():
+        pass
+
+    @staticmethod
+    def index(documents):
+        terms = list()
+        for pk, description, category, username in documents:
+            counts = Counter()
+            for field, text in (('description', description), ('category', category), ('username', username)):
+                for term in re.findall(r'\w+', unidecode(text or '').lower()):
+                    counts[term[:SearchTerm._meta.get_field('term').max_length]] += WEIGHTS[field]
+            terms.extend(SearchTerm(term=term, image_id=pk, weight=weight) for term, weight in counts.items())
+
+        SearchTerm.objects.filter(image_id__in=[_[0] for _ in documents]).delete()
+        SearchTerm.objects.bulk_create(terms, batch_size=CHUNK_SIZE)
+
+    @staticmethod
+    def remove(ids):
+        SearchTerm.objects.filter(image_id__in=ids).delete()
+
+    @staticmethod
+    def clear():
+        SearchTerm.objects.all().delete()
+
+    @staticmethod
+    def search(queryset, query):
+        terms = tokenize(unidecode(query))
+        if not terms:
+            return queryset.none()
+
+        matching = Q()
+        for term in terms:
+            queryset = queryset.filter(id__in=SearchTerm.objects.filter(term__startswith=term).values('image_id'))
+            matching |= Q(term__startswith=term)
+
+        rank = (SearchTerm.objects.filter(matching, image_id=OuterRef('pk')).order_by()
+                .values('image_id').annotate(total=Sum('weight')).values('total'))
+        return (queryset.annotate(search_rank=Coalesce(Subquery(rank), 0, output_field=IntegerField()))
+                .order_by('-search_rank', '-id'))
+
+
+@lru_cache
+def _detect_backend(vendor):
+    if vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA compile_options')
+            if 'ENABLE_FTS5' in {row[0] for row in cursor.fetchall()}:
+                return FTS5Backend
+    return InvertedIndexBackend
+
+
+def get_backend():
+    name = getattr(settings, 'SEARCH_BACKEND', 'auto')
+    if name == 'fts5':
+        return FTS5Backend
+    if name == 'inverted':
+        return InvertedIndexBackend
+    return _detect_backend(connection.vendor)
+
+
+def index_images(queryset):
+    """Write the search documents of the images in `queryset`."""
+    backend = get_backend()
+    for documents in chunked(get_documents(queryset)):
+        backend.index(documents)
+
+
+def remove_images(ids):
+    get_backend().remove(list(ids))
+
+
+def rebuild():
+    backend = get_backend()
+    with transaction.atomic():
+        backend.install()
+        backend.clear()
+        index_images(Image.objects.all())
+    return Image.objects.count()
+
+
+def search_images(queryset, query):
+    """Narrow `queryset` to the images matching every word of `query`, best matches first."""
+    return get_backend().search(queryset, query)
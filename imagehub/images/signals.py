@@ -1,10 +1,148 @@
-from django.db.models.signals import post_delete
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
 
-from .models import Image
+from main.jobs import enqueue
+
+from .fragments import invalidate_image_item
+from .markers import category_scope, get_image_scopes, get_queryset_scopes, mark_changed, user_scope
+from .models import Category, Image
+from .purge import delete_files, is_purging
+from .registry import registry
+from .search import get_backend, index_images, remove_images
+from .stats import apply_image_change, refresh_category_stats, refresh_user_stats
+
+
+@receiver(post_save, sender=Image)
+def enqueue_image_processing_on_post_save(sender, instance, created, **kwargs):
+    if created and instance.file and instance.processing_status == Image.PENDING:
+        # Enqueued once the upload commits, so a worker never sees a row that may still roll back.
+        transaction.on_commit(lambda: enqueue('images.process', {'image_id': instance.pk}, priority=10))
+
+
+@receiver(post_save, sender=Image)
+def update_stats_on_post_save(sender, instance, created, **kwargs):
+    if created:
+        apply_image_change(instance, None)
+    elif getattr(instance, '_tracked_state', None) is None:
+        # The row was gone before the save, so there is no previous state to move the image from.
+        refresh_category_stats([instance.category_id])
+        refresh_user_stats([instance.user_id])
+    else:
+        apply_image_change(instance, instance._tracked_state)
+
+
+@receiver(pre_delete, sender=Image)
+def load_deferred_fields_on_pre_delete(sender, instance, **kwargs):
+    # The post_delete receivers read the file, statistics and cache fields, which can no longer be loaded then.
+    deferred = instance.get_deferred_fields()
+    if deferred:
+        instance.refresh_from_db(fields=deferred)
+        instance.track_state()
+
+
+@receiver(post_delete, sender=Image)
+def update_stats_on_post_delete(sender, instance, **kwargs):
+    apply_image_change(instance, instance._tracked_state, deleted=True)
 
 
 @receiver(post_delete, sender=Image)
 def delete_image_file_on_post_delete(sender, instance, **kwargs):
-    if instance.file:
-        instance.file.delete(save=False)
+    # Purges delete the rows in bulk and their files once the batch has committed.
+    if is_purging() or not instance.file:
+        return
+    # Checked and removed after commit: a rollback keeps the row, and an upload of the same bytes
+    # committed in the meantime references the shared file again.
+    rows = [(instance.file.name, instance.renditions)]
+    transaction.on_commit(lambda: delete_files(rows))
+
+
+@receiver(post_save, sender=Image)
+def invalidate_image_item_on_post_save(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_image_item(instance, getattr(instance, '_tracked_updated_at', None), instance.updated_at)
+
+
+@receiver(post_delete, sender=Image)
+def invalidate_image_item_on_post_delete(sender, instance, **kwargs):
+    if is_purging():
+        return
+    invalidate_image_item(instance, instance.updated_at)
+
+
+def install_search_index_on_post_migrate(sender, **kwargs):
+    get_backend().install()
+
+
+@receiver(post_save, sender=Image)
+def index_image_on_post_save(sender, instance, **kwargs):
+    index_images(Image.objects.filter(pk=instance.pk))
+
+
+@receiver(post_delete, sender=Image)
+def remove_image_from_search_on_post_delete(sender, instance, **kwargs):
+    if is_purging():
+        return
+    remove_images([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def reindex_category_images_on_post_save(sender, instance, created, **kwargs):
+    if not created:
+        index_images(Image.objects.filter(category=instance))
+
+
+def get_changed_user_fields(instance, update_fields, fields):
+    """
+    The `fields` of a saved user that differ from their loaded values. User.save
+    fills update_fields on every full save, so it only narrows them down.
+    """
+    if update_fields is not None:
+        fields = [name for name in fields if name in update_fields]
+    return instance.get_changed_fields(fields)
+
+
+@receiver(post_save, sender=get_user_model())
+def reindex_user_images_on_post_save(sender, instance, created, update_fields=None, **kwargs):
+    # Logins, password and email changes leave the indexed username untouched.
+    if not created and get_changed_user_fields(instance, update_fields, ['username']):
+        index_images(Image.objects.filter(user=instance))
+
+
+@receiver(post_save, sender=Image)
+def mark_lists_changed_on_post_save(sender, instance, **kwargs):
+    scopes = get_image_scopes(instance)
+    if getattr(instance, '_tracked_state', None) is not None:
+        scopes.add(category_scope(instance._tracked_state['category_id']))
+    mark_changed(scopes)
+
+
+@receiver(post_delete, sender=Image)
+def mark_lists_changed_on_post_delete(sender, instance, **kwargs):
+    # Purged images left every list when they were soft deleted.
+    if is_purging():
+        return
+    mark_changed(get_image_scopes(instance))
+
+
+@receiver(post_save, sender=Category)
+def mark_lists_changed_on_category_save(sender, instance, created, **kwargs):
+    # Cards in every list show the category name and link to its slug.
+    if not created:
+        mark_changed(get_queryset_scopes(Image.objects.filter(category=instance)) | {category_scope(instance.pk)})
+
+
+@receiver(post_save, sender=get_user_model())
+def mark_lists_changed_on_user_save(sender, instance, created, update_fields=None, **kwargs):
+    # Cards show the username, full name and avatar of their author.
+    if not created and get_changed_user_fields(instance, update_fields, instance.CARD_FIELDS):
+        mark_changed(get_queryset_scopes(Image.objects.filter(user=instance)) | {user_scope(instance.pk)})
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_registry(sender, **kwargs):
+    registry.invalidate()
+    # Again at commit: a worker reloading in between would keep the old rows under the new version.
+    transaction.on_commit(registry.invalidate)
@@ -0,0 +1,277 @@
+import os
+import pickle
+import threading
+import time
+from array import array
+
+from PIL import Image as PILImage, ImageOps
+
+from django.conf import settings
+
+from .models import Image
+
+HASH_SIZE = 8
+# Resized and re-encoded copies land within a few bits.
+DEFAULT_DISTANCE = 6
+SUBSTRINGS = 4
+SUBSTRING_BITS = HASH_SIZE * HASH_SIZE // SUBSTRINGS
+BUCKETS = 1 << SUBSTRING_BITS
+# The largest radius for which some substring is within one bit of the query's, by the pigeonhole principle.
+MAX_DISTANCE = 2 * SUBSTRINGS - 1
+# Bumped when the layout of the file at PHASH_INDEX_PATH changes; other files are ignored and rebuilt from the database.
+INDEX_FORMAT = 2
+# How often a process looks for images hashed by other processes since its index was loaded.
+REFRESH_INTERVAL = 5
+# Ids of images waiting for their hash looked up per catch-up query.
+PENDING_BATCH_SIZE = 1000
+# Rows added since the last compaction, beyond a quarter of the compacted ones, that trigger a new one: bulk
+# additions are then sorted into the tables at once, and their cost stays proportional to what was added.
+COMPACT_ROWS = 10000
+
+
+def dhash(file):
+    """
+    64-bit difference hash of an image, as 16 hex digits. Each bit compares two
+    neighbouring pixels of a 9x8 grayscale thumbnail, so it survives resizing
+    and re-encoding but not crops.
+    """
+    with PILImage.open(file) as source:
+        source.draft('L', (HASH_SIZE * 4, HASH_SIZE * 4))
+        pixels = list(ImageOps.exif_transpose(source).convert('L')
+                      .resize((HASH_SIZE + 1, HASH_SIZE), PILImage.Resampling.LANCZOS).getdata())
+
+    value = 0
+    for row in range(HASH_SIZE):
+        for column in range(HASH_SIZE):
+            offset = row * (HASH_SIZE + 1) + column
+            value = value << 1 | (pixels[offset] > pixels[offset + 1])
+    return f'{value:016x}'
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+class MultiIndexHash:
+    """
+    Multi-index hash table over 64-bit hashes in the Hamming metric.
+
+    Each hash is split into SUBSTRINGS 16-bit substrings, and each substring
+    position has its own table from substring value to rows. Two hashes at
+    most MAX_DISTANCE bits apart differ by at most one bit in one of their
+    substrings, so a search looks up each substring of the query and its 16
+    one-bit neighbours, 68 buckets in all, and verifies the candidates with a
+    popcount. Within 3 bits a substring matches exactly: 4 buckets.
+
+    Hashes and ids live in flat arrays. Tables are counting-sorted rows with
+    bucket offsets, compact to keep and to pickle, plus small per-bucket
+    arrays for the hashes added since they were last compacted.
+    """
+
+    def __init__(self):
+        self.hashes = array('Q')
+        self.ids = array('q')
+        self.rows = [array('I') for _ in range(SUBSTRINGS)]
+        self.offsets = [array('I', [0]) * (BUCKETS + 1) for _ in range(SUBSTRINGS)]
+        self.appended = [dict() for _ in range(SUBSTRINGS)]
+        self.compacted = 0
+
+    @property
+    def size(self):
+        return len(self.ids)
+
+    @staticmethod
+    def get_substring(value, position):
+        return value >> position * SUBSTRING_BITS & BUCKETS - 1
+
+    def add(self, value, pk):
+        self.extend([(value, pk)])
+
+    def extend(self, entries):
+        """Add (hash, id) pairs, compacting the tables instead once the uncompacted rows grow too many."""
+        start = len(self.ids)
+        for value, pk in entries:
+            self.hashes.append(value)
+            self.ids.append(pk)
+
+        if len(self.ids) - self.compacted > max(COMPACT_ROWS, self.compacted // 4):
+            self.compact()
+            return
+        for row in range(start, len(self.ids)):
+            for position, appended in enumerate(self.appended):
+                appended.setdefault(self.get_substring(self.hashes[row], position), array('I')).append(row)
+
+    def compact(self):
+        """Move every row into the sorted tables."""
+        for position in range(SUBSTRINGS):
+            keys = [self.get_substring(value, position) for value in self.hashes]
+            offsets = [0] * (BUCKETS + 1)
+            for key in keys:
+                offsets[key + 1] += 1
+            for key in range(BUCKETS):
+                offsets[key + 1] += offsets[key]
+
+            rows, free = array('I', [0]) * len(keys), offsets[:-1]
+            for row, key in enumerate(keys):
+                rows[free[key]] = row
+                free[key] += 1
+            self.rows[position], self.offsets[position] = rows, array('I', offsets)
+        self.appended = [dict() for _ in range(SUBSTRINGS)]
+        self.compacted = len(self.ids)
+
+    def get_bucket(self, position, key):
+        offsets = self.offsets[position]
+        yield from self.rows[position][offsets[key]:offsets[key + 1]]
+        yield from self.appended[position].get(key, ())
+
+    def search(self, value, radius):
+        """Return [(distance, id)] of every entry within `radius` of `value`, at most MAX_DISTANCE."""
+        if not 0 <= radius <= MAX_DISTANCE:
+            raise ValueError(f'Radius must be between 0 and {MAX_DISTANCE}')
+
+        found = dict()
+        for position in range(SUBSTRINGS):
+            substring = self.get_substring(value, position)
+            keys = [substring]
+            if radius >= SUBSTRINGS:
+                keys.extend(substring ^ 1 << bit for bit in range(SUBSTRING_BITS))
+            for key in keys:
+                for row in self.get_bucket(position, key):
+                    distance = (self.hashes[row] ^ value).bit_count()
+                    if distance <= radius:
+                        # Hashes added again after a reprocessing keep the id's closest one.
+                        pk = self.ids[row]
+                        found[pk] = min(distance, found.get(pk, distance))
+        return [(distance, pk) for pk, distance in found.items()]
+
+    def dump(self):
+        self.compact()
+        return {'hashes': self.hashes, 'ids': self.ids, 'rows': self.rows, 'offsets': self.offsets}
+
+    @classmethod
+    def load(cls, data):
+        table = cls()
+        table.hashes, table.ids, table.rows, table.offsets = data['hashes'], data['ids'], data['rows'], data['offsets']
+        table.compacted = len(table.ids)
+        return table
+
+
+class SimilarityIndex:
+    """
+    Per-process multi-index hash table of image perceptual hashes.
+
+    Loaded from PHASH_INDEX_PATH on first use, then caught up with images
+    hashed since the file was written, which background jobs keep adding:
+    every hashed row above `last_id`, and those among the `pending` ids that
+    were still waiting for their hash when they were passed.
+    Deleted images are only dropped when the index is rebuilt, so callers
+    filter the ids they get back against the database.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.table = None
+        self.last_id = 0
+        self.pending = set()
+        # Ids this process hashed itself, ahead of the catch up that would add them again.
+        self.added = set()
+        self.checked_at = 0
+
+    @staticmethod
+    def get_path():
+        return getattr(settings, 'PHASH_INDEX_PATH', os.path.join(settings.BASE_DIR, 'phash.index'))
+
+    def ensure_loaded(self):
+        with self.lock:
+            if self.table is None:
+                self.table, self.last_id, self.pending, self.added = MultiIndexHash(), 0, set(), set()
+                try:
+                    with open(self.get_path(), 'rb') as file:
+                        data = pickle.load(file)
+                    if data.get('format') == INDEX_FORMAT:
+                        self.table, self.last_id = MultiIndexHash.load(data['table']), data['last_id']
+                        self.pending = set(data['pending'])
+                except (OSError, EOFError, KeyError, AttributeError, pickle.UnpicklingError):
+                    pass
+                self.checked_at = 0
+
+            if time.monotonic() - self.checked_at > REFRESH_INTERVAL:
+                self.catch_up()
+                self.checked_at = time.monotonic()
+
+    def catch_up(self):
+        # Images still waiting for their hash are tracked apart, so one stuck upload never holds back the rest.
+        entries = list()
+        pending = sorted(self.pending)
+        for start in range(0, len(pending), PENDING_BATCH_SIZE):
+            batch = pending[start:start + PENDING_BATCH_SIZE]
+            rows = Image.objects.filter(pk__in=batch).values_list('id', 'phash', 'processing_status')
+            waiting = set()
+            for pk, value, status in rows:
+                if value and pk not in self.added:
+                    entries.append((int(value, 16), pk))
+                elif not value and status == Image.PENDING:
+                    waiting.add(pk)
+            # Hashed, failed and deleted images all stop being tracked.
+            self.pending.difference_update(set(batch) - waiting)
+
+        rows = Image.objects.filter(id__gt=self.last_id).order_by('id')
+        for pk, value, status in rows.values_list('id', 'phash', 'processing_status').iterator(chunk_size=10000):
+            if value and pk not in self.added:
+                entries.append((int(value, 16), pk))
+            elif not value and status == Image.PENDING:
+                self.pending.add(pk)
+            self.last_id = pk
+        self.added = {pk for pk in self.added if pk > self.last_id}
+        self.table.extend(entries)
+
+    def add(self, pk, value):
+        with self.lock:
+            if self.table is not None:
+                self.table.add(int(value, 16), pk)
+                self.added.add(pk)
+
+    def search(self, value, radius=DEFAULT_DISTANCE):
+        self.ensure_loaded()
+        with self.lock:
+            return sorted(self.table.search(int(value, 16), radius))
+
+    def rebuild(self):
+        """Build a fresh table from the database and write it to PHASH_INDEX_PATH."""
+        with self.lock:
+            self.table, self.last_id, self.pending, self.added = MultiIndexHash(), 0, set(), set()
+            self.catch_up()
+            self.checked_at = time.monotonic()
+            data = {'format': INDEX_FORMAT, 'table': self.table.dump(), 'last_id': self.last_id,
+                    'pending': sorted(self.pending)}
+
+        path = self.get_path()
+        with open(f'{path}.part', 'wb') as file:
+            pickle.dump(data, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(f'{path}.part', path)
+        return self.table.size
+
+    def clear(self):
+        with self.lock:
+            self.table = None
+
+
+index = SimilarityIndex()
+
+
+def find_similar(image, distance=DEFAULT_DISTANCE, limit=50):
+    """Live images whose perceptual hash is within `distance` bits of `image`'s, closest first."""
+    if not image.phash:
+        return list()
+
+    matches = [(d, pk) for d, pk in index.search(image.phash, distance) if pk != image.pk]
+    images = Image.live.with_related().in_bulk([pk for _, pk in matches[:limit * 2]])
+
+    results = list()
+    for d, pk in matches:
+        if pk in images:
+            images[pk].distance = d
+            results.append(images[pk])
+            if len(results) >= limit:
+                break
+    return results
@@ -0,0 +1,104 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Category, Image
+
+
+def add_to_category(image):
+    Category.objects.filter(pk=image.category_id).update(image_count=F('image_count') + 1)
+    Category.objects.filter(
+        Q(last_uploaded_at__isnull=True) | Q(last_uploaded_at__lte=image.uploaded_at), pk=image.category_id
+    ).update(latest_image=image.pk, last_uploaded_at=image.uploaded_at)
+
+
+def remove_from_category(image, category_id):
+    Category.objects.filter(pk=category_id, image_count__gt=0).update(image_count=F('image_count') - 1)
+    # Hard deletes have already nulled latest_image through SET_NULL by the time this runs.
+    refresh_latest_image(Category.objects.filter(Q(latest_image=image.pk) | Q(latest_image__isnull=True),
+                                                 pk=category_id))
+
+
+def add_to_user(image):
+    get_user_model().objects.filter(pk=image.user_id).update(
+        image_count=F('image_count') + 1, image_bytes=F('image_bytes') + (image.file_size or 0)
+    )
+    get_user_model().objects.filter(
+        Q(last_upload_at__isnull=True) | Q(last_upload_at__lte=image.uploaded_at), pk=image.user_id
+    ).update(last_upload_at=image.uploaded_at)
+
+
+def remove_from_user(image):
+    get_user_model().objects.filter(pk=image.user_id, image_count__gt=0).update(
+        image_count=F('image_count') - 1, image_bytes=Greatest(F('image_bytes') - (image.file_size or 0), Value(0))
+    )
+    latest = Image.live.filter(user=OuterRef('pk')).order_by('-uploaded_at', '-id')
+    get_user_model().objects.filter(pk=image.user_id, last_upload_at=image.uploaded_at).update(
+        last_upload_at=Subquery(latest.values('uploaded_at')[:1])
+    )
+
+
+def apply_image_change(image, previous, deleted=False):
+    """
+    Move an image between category and user aggregates after it was created,
+    edited, soft deleted, restored or hard deleted. `previous` is the tracked
+    {'category_id': ..., 'live': ...} state, None for a new image.
+    """
+    current = None
+    if not deleted and image.deleted_at is None:
+        current = {'category_id': image.category_id, 'live': True}
+    if previous is not None and not previous['live']:
+        previous = None
+
+    if previous == current:
+        return
+    if previous is not None:
+        remove_from_category(image, previous['category_id'])
+    if current is not None:
+        add_to_category(image)
+
+    # Moving between categories leaves the owner's aggregates as they are.
+    if previous is None and current is not None:
+        add_to_user(image)
+    elif previous is not None and current is None:
+        remove_from_user(image)
+
+
+def refresh_latest_image(categories):
+    latest = Image.live.filter(category=OuterRef('pk')).order_by('-uploaded_at', '-id')
+    categories.update(
+        latest_image=Subquery(latest.values('id')[:1]),
+        last_uploaded_at=Subquery(latest.values('uploaded_at')[:1])
+    )
+
+
+def refresh_category_stats(category_ids=None):
+    """Recompute the aggregates of the given categories (all of them by default) in one UPDATE."""
+    count = (Image.live.filter(category=OuterRef('pk'))
+             .order_by().values('category').annotate(count=Count('id')).values('count'))
+    latest = Image.live.filter(category=OuterRef('pk')).order_by('-uploaded_at', '-id')
+
+    categories = Category.objects.all()
+    if category_ids is not None:
+        categories = categories.filter(pk__in=category_ids)
+
+    return categories.update(
+        image_count=Coalesce(Subquery(count), Value(0)),
+        latest_image=Subquery(latest.values('id')[:1]),
+        last_uploaded_at=Subquery(latest.values('uploaded_at')[:1])
+    )
+
+
+def refresh_user_stats(user_ids=None):
+    """Recompute the image aggregates of the given users (all of them by default) in one UPDATE."""
+    images = Image.live.filter(user=OuterRef('pk')).order_by().values('user')
+
+    users = get_user_model().objects.all()
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+
+    return users.update(
+        image_count=Coalesce(Subquery(images.annotate(count=Count('id')).values('count')), Value(0)),
+        image_bytes=Coalesce(Subquery(images.annotate(total=Sum('file_size')).values('total')), Value(0)),
+        last_upload_at=Subquery(images.annotate(latest=Max('uploaded_at')).values('latest'))
+    )
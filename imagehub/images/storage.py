@@ -0,0 +1,83 @@
+import fcntl
+import hashlib
+import logging
+import os
+from contextlib import ExitStack, contextmanager
+from uuid import uuid4
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+
+CHUNK_SIZE = 64 * 2 ** 10
+# Names are locked through one of this many files, in a directory serve_media never exposes.
+LOCK_DIR = '.locks'
+LOCK_STRIPES = 64
+
+logger = logging.getLogger(__name__)
+
+
+def hash_file(file):
+    digest = hashlib.sha256()
+    for chunk in file.chunks(CHUNK_SIZE):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage for names derived from the file content.
+
+    A name that already exists holds the same bytes, so saving it again is a
+    no-op that returns the existing name. New files are written under a unique
+    temporary name and renamed into place, which keeps concurrent uploads of
+    the same content from clobbering a half-written file.
+
+    A file is shared by every row with its content, and deleting it races with
+    uploads whose row is not committed yet. Deletions check for references and
+    unlink under lock(), and a saved file is checked again under the same
+    lock once the saving transaction commits, and written back if it is gone.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    @contextmanager
+    def lock(self, *names):
+        """
+        Exclusive lock on `names` between the threads and processes sharing this
+        storage. Their lock files are taken in order, so callers never deadlock.
+        """
+        directory = self.path(LOCK_DIR)
+        os.makedirs(directory, exist_ok=True)
+        stripes = sorted({int(hashlib.sha256(name.encode()).hexdigest(), 16) % LOCK_STRIPES for name in names})
+        # Closing the files releases the locks.
+        with ExitStack() as stack:
+            for stripe in stripes:
+                file = stack.enter_context(open(os.path.join(directory, f'{stripe}.lock'), 'ab'))
+                fcntl.flock(file, fcntl.LOCK_EX)
+            yield
+
+    def _save(self, name, content):
+        transaction.on_commit(lambda: self.restore(name, content))
+        if not self.exists(name):
+            self.write(name, content)
+        return name
+
+    def write(self, name, content):
+        root, ext = os.path.splitext(name)
+        temporary = super()._save(f'{root}.{uuid4().hex}.part{ext}', content)
+        os.replace(self.path(temporary), self.path(name))
+
+    def restore(self, name, content):
+        """Write `content` back if the file was deleted before the row referencing it committed."""
+        with self.lock(name):
+            if self.exists(name):
+                return
+            try:
+                content.seek(0)
+                self.write(name, content)
+            except (OSError, ValueError):
+                logger.exception('Could not restore %s, deleted while its upload was committing', name)
+
+
+content_storage = ContentAddressedStorage()
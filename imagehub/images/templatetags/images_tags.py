@@ -1,26 +1,28 @@
 from django import template
 
-from images.models import Category, Image
+from images.cursors import encode_cursor
+from images.fragments import render_image_item
+from images.registry import registry
 
 register = template.Library()
 
 
 @register.simple_tag(takes_context=True)
 def get_categories(context):
-    categories = Category.objects.all()
+    # Boards and image pages name their category in the `object` URL argument.
+    match = getattr(context.get('request'), 'resolver_match', None)
+    current = registry.get(match.kwargs.get('object')) if match else None
+    return {'categories': registry.all(), 'current': current}
 
-    current = None
-    for category in categories:
-        if f'/{category.slug}' in context['request'].path:
-            current = category
-            break
 
-    return {'categories': categories, 'current': current}
+@register.simple_tag(takes_context=True)
+def image_item(context, image):
+    return render_image_item(image, context.get('request'), account=bool(context.get('account')))
 
 
 @register.simple_tag
 def user_image_count(user):
-    return Image.objects.filter(user=user, deleted_at__isnull=True).count()
+    return user.image_count
 
 
 @register.filter
@@ -29,3 +31,9 @@ def truncate_words(value, max_words=32):
     if len(words) > max_words:
         return ' '.join(words[:max_words]) + '...'
     return value
+
+
+@register.filter
+def next_cursor(images):
+    images = list(images)
+    return encode_cursor(images[-1]) if images else str()
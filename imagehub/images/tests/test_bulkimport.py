@@ -0,0 +1,60 @@
+import os
+import shutil
+import tempfile
+
+from PIL import Image as PILImage
+
+from django.test import TestCase
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+
+from images.models import Category, Image
+from images.renditions import RENDITIONS
+from images.tests.utils import MediaTestMixin
+
+
+class BulkImportTest(MediaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.source = tempfile.mkdtemp()
+
+        self.user = get_user_model().objects.create_user(username='testuser', password='testpassword')
+        Category.objects.create(name='Cars', slug='cars')
+
+        for folder, colors in (('cars', ['red', 'blue']), ('animals', ['red', 'green']), ('avatars', ['black'])):
+            os.makedirs(os.path.join(self.source, folder))
+            for color in colors:
+                PILImage.new('RGB', (800, 600), color).save(os.path.join(self.source, folder, f'{color}.jpg'))
+        with open(os.path.join(self.source, 'cars', 'broken.jpg'), 'wb') as file:
+            file.write(b'not an image')
+
+    def tearDown(self):
+        super().tearDown()
+        shutil.rmtree(self.source, ignore_errors=True)
+
+    def run_import(self):
+        call_command('bulkimport', self.source, '--workers=2', stdout=open(os.devnull, 'w'))
+
+    def test_import(self):
+        self.run_import()
+
+        self.assertEqual(Image.objects.count(), 4)
+        self.assertEqual(Category.objects.get(slug='animals').name, 'Animals')
+        self.assertFalse(Category.objects.filter(slug='avatars').exists())
+        self.assertEqual(Category.objects.get(slug='cars').image_count, 2)
+
+        shared = Image.objects.values('file').distinct().count()
+        self.assertEqual(shared, 3, 'The same picture in two folders should be stored once')
+
+        for image in Image.objects.all():
+            self.assertEqual(image.processing_status, Image.READY)
+            self.assertEqual(set(image.renditions), set(RENDITIONS))
+            self.assertTrue(os.path.isfile(os.path.join(self.media_root, image.file.name)))
+
+    def test_import_resumes(self):
+        self.run_import()
+        Image.objects.filter(category__slug='animals').delete()
+
+        self.run_import()
+        self.assertEqual(Image.objects.count(), 4)
+        self.assertEqual(Category.objects.get(slug='animals').image_count, 2)
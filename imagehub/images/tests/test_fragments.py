@@ -0,0 +1,79 @@
+from django.core.cache import cache
+from django.test import TestCase, RequestFactory
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+
+from images.fragments import render_image_item, CSRF_PLACEHOLDER
+from images.models import Category, Image
+
+
+class ImageItemFragmentTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.user = get_user_model().objects.create_user(username='testuser', password='testpassword')
+        self.other = get_user_model().objects.create_user(username='otheruser', password='testpassword')
+        self.category = Category.objects.create(name='Cars')
+
+        Image.objects.bulk_create([Image(file='images/test.jpg', category=self.category, user=self.user,
+                                         description='First description')])
+        self.image = Image.objects.get()
+
+    def get_request(self, user=None):
+        request = self.factory.get('/')
+        request.user = user or AnonymousUser()
+        return request
+
+    def test_cached_render_skips_queries(self):
+        html = render_image_item(self.image, self.get_request())
+        self.assertIn('First description', html)
+
+        # Loaded like every list does, with the author and category the card shows.
+        image = Image.objects.with_related().get()
+        with self.assertNumQueries(0):
+            self.assertEqual(render_image_item(image, self.get_request()), html)
+
+    def test_owner_controls(self):
+        request = self.get_request(self.user)
+        html = render_image_item(self.image, request)
+        self.assertIn(reverse('image_edit', args=[self.user.username, self.user.id, self.image.id]), html)
+        self.assertNotIn(CSRF_PLACEHOLDER, html)
+        self.assertIn('csrfmiddlewaretoken', html)
+
+        html = render_image_item(self.image, self.get_request(self.other))
+        self.assertNotIn('csrfmiddlewaretoken', html)
+
+    def test_account_variant(self):
+        category_html = render_image_item(self.image, self.get_request())
+        account_html = render_image_item(self.image, self.get_request(), account=True)
+        self.assertIn('card-author', category_html)
+        self.assertNotIn('card-author', account_html)
+
+    def test_edit_invalidates(self):
+        render_image_item(self.image, self.get_request())
+
+        image = Image.objects.get()
+        image.description = 'Second description'
+        image.save()
+
+        html = render_image_item(Image.objects.get(), self.get_request())
+        self.assertIn('Second description', html)
+
+    def test_rename_refreshes(self):
+        render_image_item(self.image, self.get_request())
+
+        self.user.username = 'renamed'
+        self.user.save()
+        self.category.name = 'Automobiles'
+        self.category.slug = 'automobiles'
+        self.category.save()
+
+        html = render_image_item(Image.objects.with_related().get(), self.get_request())
+        self.assertIn('Automobiles', html)
+        self.assertIn(reverse('image_board', args=['renamed']), html)
+        self.assertNotIn(reverse('image_board', args=['cars']), html)
+
+    def test_api_html_uses_fragments(self):
+        response = self.client.get('/api/v1/images/recents', {'html': 1})
+        self.assertEqual(response.json()['results'], [render_image_item(self.image, self.get_request())])
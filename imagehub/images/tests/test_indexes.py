@@ -0,0 +1,53 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+
+from images.models import Category, Image
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN output is SQLite specific')
+class LiveImageIndexTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='testuser', password='testpassword')
+        self.category = Category.objects.create(name='Cars')
+
+    def assertUsesIndex(self, queryset, index):
+        plan = queryset.explain()
+        self.assertIn(f'USING INDEX {index}', plan)
+        self.assertNotIn('USE TEMP B-TREE', plan, 'The ordering must come from the index')
+        self.assertNotRegex(plan, r'SCAN images_image(?! USING)', 'The query must not scan the table')
+
+    def test_recents(self):
+        self.assertUsesIndex(Image.live.order_by('-uploaded_at', '-id')[:10], 'image_live_uploaded_idx')
+
+    def test_category_board(self):
+        queryset = Image.live.filter(category=self.category).order_by('-uploaded_at', '-id')[:10]
+        self.assertUsesIndex(queryset, 'image_live_category_idx')
+
+    def test_account_board(self):
+        queryset = Image.live.filter(user=self.user).order_by('-uploaded_at', '-id')[:10]
+        self.assertUsesIndex(queryset, 'image_live_user_idx')
+
+    def test_next_images(self):
+        queryset = Image.live.filter(category=self.category, uploaded_at__gt='2024-01-01T00:00:00Z')
+        self.assertUsesIndex(queryset.order_by('uploaded_at', 'id')[:10], 'image_live_category_idx')
+
+    def test_expired_deleted(self):
+        queryset = Image.objects.filter(deleted_at__lt='2024-01-01T00:00:00Z').order_by('deleted_at', 'id')[:10]
+        self.assertUsesIndex(queryset, 'image_deleted_idx')
+
+    def test_account_count(self):
+        plan = Image.live.filter(user=self.user).values('id').explain()
+        self.assertIn('SEARCH images_image USING', plan)
+
+    def test_live_manager(self):
+        Image.objects.bulk_create([
+            Image(file='images/1.jpg', category=self.category, user=self.user),
+            Image(file='images/2.jpg', category=self.category, user=self.user, deleted_at='2024-01-01T00:00:00Z'),
+        ])
+        self.assertEqual(Image.live.count(), 1)
+        self.assertEqual(Image.objects.live().count(), 1)
+        self.assertEqual(Image.objects.deleted().count(), 1)
+        self.assertEqual(Image.objects.count(), 2)
@@ -0,0 +1,86 @@
+import os
+
+from PIL import Image as PILImage
+from io import BytesIO
+
+from django.test import TestCase
+from django.urls import reverse
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+
+from images.metadata import extract_metadata
+from images.models import Category, Image
+from images.tests.utils import MediaTestMixin
+
+
+class MetadataTest(MediaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = get_user_model().objects.create_user(username='testuser', password='testpassword')
+        self.category = Category.objects.create(name='Cars')
+
+    @staticmethod
+    def encode(img, fmt='jpeg', **kwargs):
+        buffer = BytesIO()
+        img.save(buffer, fmt, **kwargs)
+        buffer.seek(0)
+        return buffer
+
+    def create_image(self, size=(300, 200)):
+        img = PILImage.new('RGB', size, (0, 0, 255))
+        img.paste((255, 0, 0), (0, 0, size[0] // 4, size[1]))
+        file = SimpleUploadedFile('test_image.jpg', self.encode(img).getvalue(), content_type='image/jpeg')
+        return super().create_image(file)
+
+    def test_extract(self):
+        buffer = self.encode(PILImage.new('RGB', (300, 200), (0, 0, 255)))
+        metadata = extract_metadata(buffer)
+        self.assertEqual((metadata['width'], metadata['height']), (300, 200))
+        self.assertEqual(metadata['file_size'], len(buffer.getvalue()))
+        self.assertEqual(metadata['mime_type'], 'image/jpeg')
+        self.assertTrue(metadata['placeholder'].startswith('data:image/png;base64,'))
+        self.assertLess(len(metadata['placeholder']), 512)
+
+        red, green, blue = (int(metadata['dominant_color'][_:_ + 2], 16) for _ in (1, 3, 5))
+        self.assertLess(red + green, 20)
+        self.assertGreater(blue, 235)
+
+    def test_extract_rotated_and_transparent(self):
+        exif = PILImage.Exif()
+        exif[0x0112] = 6
+        metadata = extract_metadata(self.encode(PILImage.new('RGB', (300, 200)), exif=exif))
+        self.assertEqual((metadata['width'], metadata['height']), (200, 300))
+
+        metadata = extract_metadata(self.encode(PILImage.new('RGBA', (40, 30), (0, 255, 0, 128)), 'png'))
+        self.assertEqual(metadata['mime_type'], 'image/png')
+        self.assertEqual(metadata['dominant_color'], '#00ff00')
+
+    def test_stored_on_upload(self):
+        image = self.create_image()
+        self.assertEqual((image.width, image.height), (300, 200))
+        self.assertEqual(image.file_size, image.file.size)
+        self.assertEqual(image.mime_type, 'image/jpeg')
+        self.assertTrue(image.placeholder)
+
+    def test_exposed(self):
+        image = self.create_image()
+        response = self.client.get(f'/api/v1/image/id/{image.id}')
+        for field in ('width', 'height', 'file_size', 'mime_type', 'dominant_color', 'placeholder'):
+            self.assertEqual(response.data[field], getattr(image, field))
+
+        response = self.client.get(reverse('recents'))
+        self.assertContains(response, 'width="300" height="200"')
+        self.assertContains(response, f'background: {image.dominant_color} url({image.placeholder})')
+
+    def test_backfill_command(self):
+        image = self.create_image()
+        phash, renditions = image.phash, image.renditions
+        Image.objects.filter(pk=image.pk).update(width=None, height=None, file_size=None, mime_type='',
+                                                 dominant_color='', placeholder='')
+
+        call_command('processimages', stdout=open(os.devnull, 'w'))
+        image.refresh_from_db()
+        self.assertEqual((image.width, image.height), (300, 200))
+        self.assertTrue(image.placeholder)
+        self.assertEqual((image.phash, image.renditions), (phash, renditions))
@@ -0,0 +1,105 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+
+from images.cursors import encode_cursor
+from images.models import Category, Image
+from images.neighbors import ACCOUNT, CATEGORY, Neighbors, find_neighbors, get_following_queryset, get_neighbors
+
+
+class NeighborsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='testuser', password='testpassword')
+        self.other = get_user_model().objects.create_user(username='otheruser', password='testpassword')
+        self.cars = Category.objects.create(name='Cars')
+        self.animals = Category.objects.create(name='Animals')
+
+        Image.objects.bulk_create([
+            Image(file=f'images/{_}.jpg', category=self.cars if _ % 3 else self.animals,
+                  user=self.user if _ % 2 else self.other)
+            for _ in range(30)
+        ])
+        # Pairs share a timestamp, so the order is only total with the id tie-breaker.
+        now = timezone.now()
+        for image in Image.objects.order_by('id'):
+            Image.objects.filter(pk=image.pk).update(uploaded_at=now - timedelta(minutes=30 - image.id // 2))
+        self.images = list(Image.objects.order_by('uploaded_at', 'id'))
+
+    def timeline(self, **filters):
+        return [_.id for _ in self.images if all(getattr(_, k) == v for k, v in filters.items())]
+
+    def test_middle_of_timeline(self):
+        ids = self.timeline(category_id=self.cars.id)
+        image = Image.objects.get(pk=ids[5])
+        with self.assertNumQueries(1):
+            neighbors = find_neighbors(image, CATEGORY, 3)
+        self.assertEqual(neighbors, Neighbors(ids[4], ids[6], ids[6:9]))
+
+    def test_account_timeline(self):
+        ids = self.timeline(user_id=self.user.id)
+        image = Image.objects.get(pk=ids[0])
+        self.assertEqual(find_neighbors(image, ACCOUNT), Neighbors(None, ids[1], ids[1:11]))
+
+    def test_newest_falls_back_to_previous(self):
+        ids = self.timeline(category_id=self.animals.id)
+        image = Image.objects.get(pk=ids[-1])
+        self.assertEqual(find_neighbors(image, CATEGORY, 4), Neighbors(ids[-2], None, ids[-2:-6:-1]))
+
+        following = get_following_queryset(image, CATEGORY)
+        self.assertEqual(list(following.values_list('id', flat=True)), ids[-2::-1])
+
+    def test_following_queryset(self):
+        ids = self.timeline(category_id=self.cars.id)
+        image = Image.objects.get(pk=ids[2])
+        self.assertEqual(list(get_following_queryset(image, CATEGORY).values_list('id', flat=True)), ids[3:])
+
+    def test_only_live_images(self):
+        ids = self.timeline(category_id=self.cars.id)
+        Image.objects.filter(pk=ids[3]).update(deleted_at=timezone.now())
+        image = Image.objects.get(pk=ids[2])
+        self.assertEqual(find_neighbors(image, CATEGORY, 2), Neighbors(ids[1], ids[4], [ids[4], ids[5]]))
+
+    def test_cached_until_timeline_changes(self):
+        ids = self.timeline(category_id=self.cars.id)
+        image = Image.objects.get(pk=ids[-2])
+        self.assertEqual(get_neighbors(image, CATEGORY).following, [ids[-1]])
+        with self.assertNumQueries(1):
+            get_neighbors(image, CATEGORY)
+
+        # Saving an image moves the markers of its timelines.
+        newest = Image.objects.get(pk=ids[-1])
+        newest.deleted_at = timezone.now()
+        newest.save()
+        self.assertEqual(get_neighbors(image, CATEGORY), Neighbors(ids[-3], None, ids[-3::-1][:10]))
+
+    def test_detail_page(self):
+        ids = self.timeline(category_id=self.cars.id)
+        image = Image.objects.get(pk=ids[5])
+        response = self.client.get(reverse('image_open', args=['cars', image.user_id, image.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['prev_image'].id, ids[4])
+        self.assertEqual(response.context['next_image'].id, ids[6])
+        self.assertEqual([_.id for _ in response.context['next_images']], ids[6:16])
+
+    def test_account_detail_page(self):
+        ids = self.timeline(user_id=self.user.id)
+        image = Image.objects.get(pk=ids[-1])
+        response = self.client.get(reverse('image_open', args=['testuser', image.user_id, image.id]))
+        self.assertEqual(response.context['prev_image'].id, ids[-2])
+        self.assertIsNone(response.context['next_image'])
+        self.assertEqual([_.id for _ in response.context['user_images']], ids[-2:-12:-1])
+
+    def test_detail_page_cursor(self):
+        ids = self.timeline(category_id=self.cars.id)
+        image = Image.objects.get(pk=ids[5])
+        response = self.client.get(reverse('image_open', args=['cars', image.user_id, image.id]))
+        cursor = encode_cursor(response.context['next_images'][-1])
+        self.assertContains(response, f'cursor: "{cursor}"')
+
+        response = self.client.get(f'/api/v1/image/id/{image.id}/after', {'cursor': cursor, 'limit': 10})
+        self.assertEqual([_['id'] for _ in response.data['results']], ids[16:])
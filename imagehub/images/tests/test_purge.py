@@ -0,0 +1,95 @@
+import os
+from datetime import timedelta
+
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+
+from images.models import Category, Image
+from images.purge import purge_deleted_images
+from images.search import search_images
+from images.tests.utils import MediaTestMixin
+
+
+class PurgeTest(MediaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = get_user_model().objects.create_user(username='testuser', password='testpassword')
+        self.category = Category.objects.create(name='Cars')
+        self.storage = Image._meta.get_field('file').storage
+
+    def get_settings(self):
+        return {**super().get_settings(), 'DELETED_IMAGE_RETENTION_DAYS': 30}
+
+    def create_image(self, name, deleted_days_ago=None, **fields):
+        if not self.storage.exists(f'images/{name}.jpg'):
+            self.storage.save(f'images/{name}.jpg', ContentFile(b'x' * 100))
+            self.storage.save(f'images/{name}_card.jpg', ContentFile(b'x' * 10))
+        deleted_at = timezone.now() - timedelta(days=deleted_days_ago) if deleted_days_ago is not None else None
+        return Image.objects.create(file=f'images/{name}.jpg', renditions={'card': f'images/{name}_card.jpg'},
+                                    category=self.category, user=self.user, description='red car',
+                                    deleted_at=deleted_at, **fields)
+
+    def exists(self, name):
+        return os.path.exists(os.path.join(self.media_root, 'images', name))
+
+    def test_purge(self):
+        live = self.create_image('live')
+        recent = self.create_image('recent', deleted_days_ago=5)
+        self.create_image('old', deleted_days_ago=40)
+        self.create_image('older', deleted_days_ago=50)
+
+        self.assertEqual(purge_deleted_images(batch_size=1), (2, 4, 220))
+        self.assertEqual(set(Image.objects.values_list('id', flat=True)), {live.id, recent.id})
+        self.assertFalse(self.exists('old.jpg') or self.exists('old_card.jpg') or self.exists('older.jpg'))
+        self.assertTrue(self.exists('recent.jpg') and self.exists('live_card.jpg'))
+        self.assertEqual(set(search_images(Image.objects.all(), 'red').values_list('id', flat=True)),
+                         {live.id, recent.id})
+
+        self.assertEqual(purge_deleted_images(days=1), (1, 2, 110))
+        self.assertEqual(purge_deleted_images(), (0, 0, 0))
+
+    def test_shared_file_kept(self):
+        self.create_image('shared', deleted_days_ago=40)
+        self.create_image('shared')
+        self.assertEqual(purge_deleted_images(), (1, 0, 0))
+        self.assertTrue(self.exists('shared.jpg'))
+
+    def test_stats_unchanged(self):
+        self.create_image('live')
+        self.create_image('old', deleted_days_ago=40)
+        self.user.refresh_from_db()
+        count, size = self.user.image_count, self.user.image_bytes
+
+        purge_deleted_images()
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.image_count, self.user.image_bytes), (count, size))
+
+    def test_batch_queries(self):
+        for _ in range(10):
+            self.create_image(f'old{_}', deleted_days_ago=40)
+        with CaptureQueriesContext(connection) as queries:
+            purge_deleted_images(batch_size=100)
+        small = len(queries)
+
+        for _ in range(30):
+            self.create_image(f'old{_}', deleted_days_ago=40)
+        with CaptureQueriesContext(connection) as queries:
+            purge_deleted_images(batch_size=100)
+        self.assertEqual(len(queries), small, 'Purging must not run queries per image')
+
+    def test_command(self):
+        self.create_image('old', deleted_days_ago=40, file_size=100)
+
+        with open(os.devnull, 'w') as devnull:
+            call_command('purgeimages', '--dry-run', stdout=devnull)
+        self.assertEqual(Image.objects.count(), 1)
+        self.assertEqual(purge_deleted_images(dry_run=True), (1, None, 100))
+
+        with open(os.devnull, 'w') as devnull:
+            call_command('purgeimages', stdout=devnull)
+        self.assertEqual(Image.objects.count(), 0)
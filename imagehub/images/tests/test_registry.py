@@ -0,0 +1,80 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+
+from images.forms import ImageEditForm
+from images.models import Category, Image
+from images.registry import VERSION_KEY, registry
+
+
+class CategoryRegistryTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='testuser', password='testpassword')
+        self.cars = Category.objects.create(name='Cars')
+        self.animals = Category.objects.create(name='Animals')
+
+    def test_snapshot(self):
+        self.assertEqual([_.slug for _ in registry.all()], ['cars', 'animals'])
+        self.assertEqual(registry.get('CARS').id, self.cars.id)
+        self.assertEqual(registry.get_by_id(self.animals.id).name, 'Animals')
+        self.assertIsNone(registry.get('missing'))
+
+        with self.assertNumQueries(0):
+            registry.all()
+            registry.get('cars')
+
+    def test_invalidated_on_save_and_delete(self):
+        registry.all()
+        self.cars.name = 'Automobiles'
+        self.cars.save()
+        self.assertEqual(registry.get('cars').name, 'Automobiles')
+
+        self.animals.delete()
+        self.assertIsNone(registry.get('animals'))
+
+    def test_shared_version(self):
+        registry.all()
+        # A rename committed by another worker only moves the shared version.
+        Category.objects.filter(pk=self.cars.pk).update(name='Automobiles')
+        self.assertEqual(registry.get('cars').name, 'Cars')
+
+        cache.set(VERSION_KEY, 'another worker')
+        self.assertEqual(registry.get('cars').name, 'Automobiles')
+
+    def test_views_and_tag(self):
+        registry.all()
+        with self.assertNumQueries(1):
+            self.client.get(reverse('image_board', args=['cars']))
+
+        response = self.client.get(reverse('image_board', args=['cars']))
+        self.assertEqual(response.context['page_key'], 'category')
+        self.assertContains(response, f'href="{reverse("image_board", args=["cars"])}" class="active"')
+        self.assertNotContains(response, f'href="{reverse("image_board", args=["animals"])}" class="active"')
+
+        response = self.client.get(reverse('image_board', args=['testuser']))
+        self.assertEqual(response.context['page_key'], 'account')
+        self.assertNotContains(response, 'class="active"')
+
+    def test_form(self):
+        image = Image.objects.create(file='images/a.jpg', category=self.cars, user=self.user)
+        form = ImageEditForm(instance=image)
+        registry.all()
+        with self.assertNumQueries(0):
+            html = str(form['category'])
+        self.assertIn(f'<option value="{self.animals.id}">Animals</option>', html)
+        self.assertIn(f'<option value="{self.cars.id}" selected>Cars</option>', html)
+
+        form = ImageEditForm({'category': self.animals.id, 'description': ''}, instance=image)
+        self.assertTrue(form.is_valid())
+        form.save()
+        image.refresh_from_db()
+        self.assertEqual(image.category_id, self.animals.id)
+
+        self.assertFalse(ImageEditForm({'category': 0}, instance=image).is_valid())
+        self.assertFalse(ImageEditForm({'category': 'x'}, instance=image).is_valid())
+
+        # Created elsewhere and not in this worker's snapshot yet.
+        registry.all()
+        birds = Category.objects.bulk_create([Category(name='Birds', slug='birds')])[0]
+        self.assertTrue(ImageEditForm({'category': birds.id}, instance=image).is_valid())
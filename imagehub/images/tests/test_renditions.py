@@ -0,0 +1,70 @@
+import os
+
+from PIL import Image as PILImage
+
+from django.test import TestCase
+from django.urls import reverse
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+
+from images.models import Category, Image
+from images.renditions import RENDITIONS
+from images.tests.utils import MediaTestMixin, generate_test_image
+
+
+class RenditionsTest(MediaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = get_user_model().objects.create_user(username='testuser', password='testpassword')
+        self.category = Category.objects.create(name='Cars')
+
+    def create_image(self, size=(2000, 1500)):
+        return super().create_image(generate_test_image(size, (255, 0, 0)))
+
+    def test_renditions_created_on_upload(self):
+        image = self.create_image()
+        image.refresh_from_db()
+        self.assertEqual(set(image.renditions), set(RENDITIONS))
+
+        for size, width in RENDITIONS.items():
+            path = os.path.join(self.media_root, image.renditions[size])
+            self.assertTrue(os.path.isfile(path), f'Rendition "{size}" is missing from the media folder')
+            with PILImage.open(path) as rendition:
+                self.assertLessEqual(rendition.width, width)
+
+    def test_renditions_not_upscaled(self):
+        image = self.create_image(size=(150, 100))
+        with PILImage.open(os.path.join(self.media_root, image.renditions['detail'])) as rendition:
+            self.assertEqual(rendition.size, (150, 100))
+
+    def test_renditions_deleted_with_image(self):
+        image = self.create_image()
+        paths = [os.path.join(self.media_root, name) for name in image.renditions.values()]
+        with self.captureOnCommitCallbacks(execute=True):
+            Image.objects.filter(pk=image.pk).delete()
+        for path in paths:
+            self.assertFalse(os.path.isfile(path), 'The rendition was not removed from the media directory')
+
+    def test_board_uses_card_rendition(self):
+        image = self.create_image()
+        response = self.client.get(reverse('recents'))
+        self.assertContains(response, image.card_url)
+        self.assertNotContains(response, f'src="{image.file.url}"')
+
+    def test_url_falls_back_to_original(self):
+        image = self.create_image()
+        Image.objects.filter(pk=image.pk).update(renditions={})
+        image.refresh_from_db()
+        self.assertEqual(image.card_url, image.file.url)
+
+    def test_backfill_command(self):
+        image = self.create_image()
+        for name in image.renditions.values():
+            os.remove(os.path.join(self.media_root, name))
+        Image.objects.filter(pk=image.pk).update(renditions={})
+
+        call_command('processimages', stdout=open(os.devnull, 'w'))
+        image.refresh_from_db()
+        self.assertEqual(set(image.renditions), set(RENDITIONS))
+        for name in image.renditions.values():
+            self.assertTrue(os.path.isfile(os.path.join(self.media_root, name)))
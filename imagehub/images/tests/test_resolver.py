@@ -0,0 +1,41 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+
+from images.models import Category
+from images.registry import registry
+from images.resolver import ACCOUNT, CATEGORY, resolver
+
+
+class SlugResolverTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='testuser', password='testpassword')
+        self.cars = Category.objects.create(name='Cars')
+        registry.all()
+
+    def test_get_object(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(resolver.get_object('testuser'), (ACCOUNT, self.user))
+        with self.assertNumQueries(0):
+            self.assertEqual(resolver.get_object('cars'), (CATEGORY, registry.get('cars')))
+        self.assertIsNone(resolver.get_object('missing'))
+        self.assertIsNone(resolver.get_object('TestUser'))
+
+    def test_rename_and_delete(self):
+        self.user.username = 'renamed'
+        self.user.save()
+        self.assertIsNone(resolver.get_object('testuser'))
+        self.assertEqual(resolver.get_object('renamed'), (ACCOUNT, self.user))
+
+        self.user.delete()
+        self.assertIsNone(resolver.get_object('renamed'))
+
+    def test_board(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('image_board', args=['testuser']))
+        self.assertEqual(response.context['account'], self.user)
+        self.assertEqual(response.context['page_key'], 'account')
+
+        self.assertEqual(self.client.get(reverse('image_board', args=['missing'])).status_code, 404)
@@ -0,0 +1,65 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+
+from images.models import Category, Image
+from images.sampling import sample_live_images, DENSE_SPAN, PROBE_ROUNDS
+
+
+class SampleLiveImagesTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='testuser', password='testpassword')
+        self.category = Category.objects.create(name='Cars')
+
+    def create_images(self, ids, **kwargs):
+        Image.objects.bulk_create([
+            Image(id=_, file=f'images/{_}.jpg', category=self.category, user=self.user, **kwargs) for _ in ids
+        ])
+
+    def test_empty_table(self):
+        self.assertEqual(sample_live_images(10), [])
+
+    def test_dense_returns_unique_live_images(self):
+        self.create_images(range(1, 31))
+        self.create_images(range(31, 41), deleted_at=timezone.now())
+
+        images = sample_live_images(10)
+        ids = [_.id for _ in images]
+        self.assertEqual(len(ids), 10)
+        self.assertEqual(len(set(ids)), 10)
+        self.assertTrue(all(_ <= 30 for _ in ids), 'Deleted images must not be sampled')
+
+    def test_dense_respects_exclude(self):
+        self.create_images(range(1, 13))
+        images = sample_live_images(10, exclude=range(1, 11))
+        self.assertEqual(sorted(_.id for _ in images), [11, 12])
+
+    def test_sparse_range(self):
+        ids = [1] + [DENSE_SPAN * 10 + _ for _ in range(20)]
+        self.create_images(ids)
+
+        with CaptureQueriesContext(connection) as queries:
+            images = sample_live_images(10, exclude=[1])
+        self.assertLessEqual(len(queries), PROBE_ROUNDS + 4)
+        sampled = [_.id for _ in images]
+        self.assertEqual(len(sampled), 10)
+        self.assertEqual(len(set(sampled)), 10)
+        self.assertNotIn(1, sampled)
+
+    def test_mostly_excluded(self):
+        self.create_images(range(1, 5001))
+        unseen = set(range(7, 5001, 100))
+        excluded = set(range(1, 5001)) - unseen
+
+        for _ in range(10):
+            sampled = {_.id for _ in sample_live_images(10, exclude=excluded)}
+            self.assertEqual(len(sampled), 10, 'Unseen images exist but too few were returned')
+            self.assertLessEqual(sampled, unseen)
+
+    def test_sparse_range_exhausted(self):
+        ids = [1, DENSE_SPAN * 10]
+        self.create_images(ids)
+        images = sample_live_images(10, exclude=[1])
+        self.assertEqual([_.id for _ in images], [DENSE_SPAN * 10])
@@ -0,0 +1,140 @@
+from io import StringIO
+
+from django.test import TestCase, override_settings
+from django.urls import get_resolver, reverse
+from django.utils import timezone
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.tokens import AccessToken
+
+from images.models import Category, Image, SearchTerm
+from main.validators import RESERVED_SLUGS
+from images.search import FTS5Backend, InvertedIndexBackend, get_backend, search_images
+from images.tests.utils import MediaTestMixin
+
+
+class SearchTestMixin(MediaTestMixin):
+    def setUp(self):
+        super().setUp()
+        self.user = get_user_model().objects.create_user(username='alice', password='testpassword')
+        self.cars = Category.objects.create(name='Cars')
+        self.animals = Category.objects.create(name='Animals')
+
+        self.red_car = self.create_image(self.cars, 'Red sports car on a mountain road')
+        self.cat = self.create_image(self.animals, 'A sleepy cat in the sun')
+        self.car_cat = self.create_image(self.animals, 'Cat sitting on a car roof')
+
+    def create_image(self, category, description):
+        return super().create_image(category=category, description=description)
+
+    def search(self, query):
+        return list(search_images(Image.live.all(), query))
+
+    def test_matches_every_word(self):
+        self.assertEqual(set(self.search('cat')), {self.cat, self.car_cat})
+        self.assertEqual(self.search('cat roof'), [self.car_cat])
+        self.assertEqual(self.search('dog'), [])
+        self.assertEqual(self.search('  '), [])
+
+    def test_prefix_and_case(self):
+        self.assertEqual(self.search('MOUNT'), [self.red_car])
+
+    def test_category_match_ranks_first(self):
+        # "car" is the category of the first image but only a word in the description of the other.
+        self.assertEqual(self.search('car')[0], self.red_car)
+
+    def test_username(self):
+        self.assertEqual(len(self.search('alice')), 3)
+
+    def test_edit_and_soft_delete(self):
+        self.cat.description = 'A sleepy dog in the sun'
+        self.cat.save()
+        self.assertEqual(self.search('dog'), [self.cat])
+
+        self.cat.deleted_at = timezone.now()
+        self.cat.save()
+        self.assertEqual(self.search('dog'), [])
+        # Still indexed, for the admin.
+        self.assertEqual(list(search_images(Image.objects.all(), 'dog')), [self.cat])
+
+        Image.objects.filter(pk=self.cat.pk).delete()
+        self.assertEqual(list(search_images(Image.objects.all(), 'dog')), [])
+
+    def test_category_and_user_renames(self):
+        self.animals.name = 'Pets'
+        self.animals.save()
+        self.assertEqual(set(self.search('pets')), {self.cat, self.car_cat})
+
+        self.user.username = 'bob'
+        self.user.save()
+        self.assertEqual(len(self.search('bob')), 3)
+        self.assertEqual(self.search('alice'), [])
+
+    def test_rebuild(self):
+        get_backend().clear()
+        self.assertEqual(self.search('cat'), [])
+        call_command('rebuildsearch', stdout=StringIO())
+        self.assertEqual(set(self.search('cat')), {self.cat, self.car_cat})
+
+
+class FTS5SearchTest(SearchTestMixin, TestCase):
+    def test_backend(self):
+        self.assertIs(get_backend(), FTS5Backend)
+        self.assertFalse(SearchTerm.objects.exists())
+
+    def test_operators_are_plain_words(self):
+        self.assertEqual(self.search('"roof* ('), [self.car_cat])
+        self.assertEqual(self.search('NEAR('), [])
+
+
+@override_settings(SEARCH_BACKEND='inverted')
+class InvertedIndexSearchTest(SearchTestMixin, TestCase):
+    def test_backend(self):
+        self.assertIs(get_backend(), InvertedIndexBackend)
+        self.assertTrue(SearchTerm.objects.filter(term='cat', image=self.car_cat).exists())
+
+
+class SearchViewsTest(SearchTestMixin, TestCase):
+    def test_api(self):
+        response = self.client.get('/api/v1/images/search', {'q': 'cat', 'limit': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(response.data['next'], 2)
+        self.assertEqual(len(response.data['results']), 1)
+
+        response = self.client.get('/api/v1/images/search', {'q': 'cat', 'limit': 1, 'p': 2})
+        self.assertIsNone(response.data['next'])
+
+        response = self.client.get('/api/v1/images/search', {'q': 'cat', 'html': 1})
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIn('<', response.data['results'][0])
+
+    def test_board(self):
+        response = self.client.get(reverse('search'), {'q': 'roof'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['page_key'], 'search')
+        self.assertEqual(list(response.context['images']), [self.car_cat])
+        self.assertIsNone(response.context['next_page'])
+        self.assertContains(response, 'value="roof"')
+
+    def test_reserved_names(self):
+        # Every single segment page is reserved, or a board of the same name would be unreachable.
+        routes = [str(pattern.pattern) for urlconf in ('accounts.urls', 'images.urls')
+                  for pattern in get_resolver(urlconf).url_patterns]
+        self.assertEqual({route for route in routes if route and not set('/<') & set(route)}, RESERVED_SLUGS)
+
+        admin = get_user_model().objects.create_superuser(username='admin', password='testpassword')
+        headers = {'authorization': f'Bearer {AccessToken.for_user(admin)}'}
+        for data in ({'name': 'Search'}, {'name': 'Search engines', 'slug': 'upload'}):
+            response = self.client.post(reverse('api-category-create'), data, headers=headers)
+            self.assertEqual(response.status_code, 400, data)
+        self.assertFalse(Category.objects.filter(name__startswith='Search').exists())
+
+    def test_admin(self):
+        self.cat.deleted_at = timezone.now()
+        self.cat.save()
+        admin = get_user_model().objects.create_superuser(username='admin', password='testpassword')
+        self.client.force_login(admin)
+
+        response = self.client.get(reverse('admin:images_image_changelist'), {'q': 'sleepy'})
+        self.assertEqual(list(response.context['cl'].result_list), [self.cat])
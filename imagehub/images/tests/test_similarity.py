@@ -0,0 +1,145 @@
+import os
+import random
+
+from PIL import Image as PILImage, ImageDraw
+from io import BytesIO
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+
+from images.models import Category, Image
+from images.similarity import MAX_DISTANCE, MultiIndexHash, dhash, hamming, index
+from images.tests.utils import MediaTestMixin
+
+
+def draw_picture(seed, size=(800, 600)):
+    generator = random.Random(seed)
+    img = PILImage.new('RGB', size, (255, 255, 255))
+    draw = ImageDraw.Draw(img)
+    for _ in range(12):
+        x, y = generator.randrange(size[0]), generator.randrange(size[1])
+        radius = generator.randrange(40, 200)
+        draw.ellipse((x - radius, y - radius, x + radius, y + radius),
+                     fill=tuple(generator.randrange(256) for _ in range(3)))
+    return img
+
+
+def encode(img, fmt='jpeg', **kwargs):
+    buffer = BytesIO()
+    img.save(buffer, fmt, **kwargs)
+    buffer.seek(0)
+    return buffer
+
+
+class PerceptualHashTest(TestCase):
+    def test_survives_resizing_and_reencoding(self):
+        original = draw_picture(1)
+        copy = original.resize((400, 300)).convert('L')
+
+        distance = hamming(int(dhash(encode(original)), 16), int(dhash(encode(copy, quality=40)), 16))
+        self.assertLessEqual(distance, 4)
+        distance = hamming(int(dhash(encode(original)), 16), int(dhash(encode(draw_picture(2))), 16))
+        self.assertGreater(distance, 16)
+
+    def test_multi_index_matches_linear_scan(self):
+        generator = random.Random(0)
+        values = [generator.getrandbits(64) for _ in range(2000)]
+        # Near copies of the first values, a few bits away and spread over the substrings.
+        values += [value ^ sum(1 << generator.randrange(64) for _ in range(generator.randrange(1, 8)))
+                   for value in values[:200]]
+        table = MultiIndexHash()
+        for pk, value in enumerate(values[:1000]):
+            table.add(value, pk)
+        table.compact()
+        for pk, value in enumerate(values[1000:], 1000):
+            table.add(value, pk)
+        self.assertEqual(table.size, len(values))
+
+        for query in values[:50]:
+            for radius in (0, 3, MAX_DISTANCE):
+                expected = sorted((hamming(query, value), pk) for pk, value in enumerate(values)
+                                  if hamming(query, value) <= radius)
+                self.assertEqual(sorted(table.search(query, radius)), expected)
+                self.assertEqual(sorted(MultiIndexHash.load(table.dump()).search(query, radius)), expected)
+
+        with self.assertRaises(ValueError):
+            table.search(values[0], MAX_DISTANCE + 1)
+
+
+class SimilarImagesTest(MediaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        index.clear()
+
+        self.user = get_user_model().objects.create_user(username='testuser', password='testpassword')
+        self.category = Category.objects.create(name='Cars')
+
+        self.original = self.create_image(encode(draw_picture(1)))
+        self.resized = self.create_image(encode(draw_picture(1).resize((500, 375)), quality=50))
+        self.other = self.create_image(encode(draw_picture(2), 'png'), 'other.png')
+
+    def tearDown(self):
+        index.clear()
+        super().tearDown()
+
+    def get_settings(self):
+        return {**super().get_settings(), 'PHASH_INDEX_PATH': os.path.join(self.media_root, 'phash.index')}
+
+    def create_image(self, data, name='test_image.jpg'):
+        return super().create_image(SimpleUploadedFile(name, data.getvalue()))
+
+    def test_hash_stored_on_processing(self):
+        self.assertEqual(len(self.original.phash), 16)
+        self.assertNotEqual(self.original.phash, self.other.phash)
+
+    def test_api_returns_near_duplicates(self):
+        response = self.client.get(f'/api/v1/image/id/{self.original.id}/similar')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([_['id'] for _ in response.json()], [self.resized.id])
+        self.assertLessEqual(response.json()[0]['distance'], 4)
+
+        self.assertEqual(self.client.get(f'/api/v1/image/id/{self.original.id}/similar?distance=99').status_code, 400)
+        self.assertEqual(self.client.get('/api/v1/image/id/0/similar').status_code, 404)
+
+    def test_deleted_images_are_skipped(self):
+        Image.objects.filter(pk=self.resized.pk).update(deleted_at=self.resized.uploaded_at)
+        response = self.client.get(f'/api/v1/image/id/{self.original.id}/similar')
+        self.assertEqual(response.json(), [])
+
+    def test_index_persisted(self):
+        call_command('rebuildsimilarity', stdout=open(os.devnull, 'w'))
+        index.clear()
+
+        # Loaded from the file without a catch-up query finding anything new.
+        self.assertEqual(len(index.search(self.original.phash, 4)), 2)
+        self.assertEqual(index.table.size, 3)
+
+    def test_pending_images_do_not_hold_back_catch_up(self):
+        self.assertEqual(len(index.search(self.original.phash, 4)), 2)
+
+        # Hashed by another process, as a job would, while the older upload is still waiting.
+        with override_settings(JOBS_RUN_EAGER=False):
+            waiting = self.create_image(encode(draw_picture(1)))
+            hashed = self.create_image(encode(draw_picture(1)))
+        Image.objects.filter(pk=hashed.pk).update(phash=self.original.phash, processing_status=Image.READY)
+        index.checked_at = 0
+        self.assertIn(hashed.id, [pk for _, pk in index.search(self.original.phash, 4)])
+        self.assertEqual(index.pending, {waiting.id})
+
+        Image.objects.filter(pk=waiting.pk).update(phash=self.original.phash, processing_status=Image.READY)
+        index.checked_at = 0
+        self.assertIn(waiting.id, [pk for _, pk in index.search(self.original.phash, 4)])
+        self.assertEqual(index.pending, set())
+
+    def test_admin_action(self):
+        admin = get_user_model().objects.create_superuser(username='admin', password='testpassword')
+        self.client.force_login(admin)
+        response = self.client.post(reverse('admin:images_image_changelist'), {
+            'action': 'show_similar',
+            '_selected_action': [self.original.id]
+        })
+        self.assertRedirects(response, f'{reverse("admin:images_image_changelist")}'
+                                       f'?id__in={self.original.id},{self.resized.id}', fetch_redirect_response=False)
@@ -0,0 +1,186 @@
+import os
+
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from images.models import Category, Image
+from images.tests.utils import MediaTestMixin, generate_test_image
+
+
+class CategoryStatsTest(MediaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = get_user_model().objects.create_user(username='testuser', password='testpassword')
+        self.cars = Category.objects.create(name='Cars')
+        self.animals = Category.objects.create(name='Animals')
+
+    def create_image(self, category):
+        return super().create_image(category=category)
+
+    def assertStats(self, category, count, latest):
+        category.refresh_from_db()
+        self.assertEqual(category.image_count, count)
+        self.assertEqual(category.latest_image_id, latest.id if latest else None)
+        self.assertEqual(category.last_uploaded_at, latest.uploaded_at if latest else None)
+
+    def test_upload(self):
+        first = self.create_image(self.cars)
+        second = self.create_image(self.cars)
+        self.assertStats(self.cars, 2, second)
+        self.assertStats(self.animals, 0, None)
+        self.assertNotEqual(first.id, second.id)
+
+    def test_soft_delete_and_restore(self):
+        first = self.create_image(self.cars)
+        second = self.create_image(self.cars)
+
+        second = Image.objects.get(pk=second.pk)
+        second.deleted_at = timezone.now()
+        second.save()
+        self.assertStats(self.cars, 1, first)
+
+        second.deleted_at = None
+        second.save()
+        self.assertStats(self.cars, 2, second)
+
+    def test_restore_older_image_keeps_latest(self):
+        first = self.create_image(self.cars)
+        second = self.create_image(self.cars)
+        Image.objects.filter(pk=first.pk).update(uploaded_at=second.uploaded_at - timedelta(days=1))
+
+        first = Image.objects.get(pk=first.pk)
+        first.deleted_at = timezone.now()
+        first.save()
+        first.deleted_at = None
+        first.save()
+        self.assertStats(self.cars, 2, second)
+
+    def test_category_change(self):
+        image = Image.objects.get(pk=self.create_image(self.cars).pk)
+        image.category = self.animals
+        image.save()
+        self.assertStats(self.cars, 0, None)
+        self.assertStats(self.animals, 1, image)
+
+    def test_hard_delete(self):
+        first = self.create_image(self.cars)
+        second = self.create_image(self.cars)
+        Image.objects.filter(pk=second.pk).delete()
+        self.assertStats(self.cars, 1, first)
+
+    def test_deferred_fields(self):
+        first = self.create_image(self.cars)
+        second = self.create_image(self.cars)
+        third = self.create_image(self.animals)
+
+        image = Image.objects.only('id', 'description').get(pk=second.pk)
+        image.category = self.animals
+        with CaptureQueriesContext(connection) as queries:
+            image.save()
+        self.assertStats(self.cars, 1, first)
+        self.assertStats(self.animals, 2, third)
+        self.assertFalse([_ for _ in queries if _['sql'].startswith('UPDATE "images_category"') and 'WHERE' not in
+                          _['sql']], 'Every category was recomputed')
+
+        Image.objects.only('id').filter(pk=third.pk).delete()
+        self.assertStats(self.animals, 1, image)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.image_count, 2)
+
+    def test_rebuild_command(self):
+        image = self.create_image(self.cars)
+        Category.objects.update(image_count=42, latest_image=None, last_uploaded_at=None)
+        call_command('rebuildstats', stdout=open(os.devnull, 'w'))
+        self.assertStats(self.cars, 1, image)
+        self.assertStats(self.animals, 0, None)
+
+    def test_category_list_single_query(self):
+        self.create_image(self.cars)
+        self.create_image(self.animals)
+
+        response = self.client.get(reverse('category'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['categories'][0].image_count, 1)
+
+        with self.assertNumQueries(1):
+            list(response.context['view'].get_queryset())
+
+
+class UserStatsTest(MediaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = get_user_model().objects.create_user(username='testuser', password='testpassword')
+        self.other = get_user_model().objects.create_user(username='otheruser', password='testpassword')
+        self.cars = Category.objects.create(name='Cars')
+        self.animals = Category.objects.create(name='Animals')
+
+    def create_image(self, user=None, color=(0, 0, 255)):
+        return super().create_image(generate_test_image(color=color), category=self.cars, user=user)
+
+    def assertStats(self, user, count, size, latest):
+        user.refresh_from_db()
+        self.assertEqual(user.image_count, count)
+        self.assertEqual(user.image_bytes, size)
+        self.assertEqual(user.last_upload_at, latest.uploaded_at if latest else None)
+
+    def test_upload_delete_and_restore(self):
+        first = self.create_image()
+        second = self.create_image(color=(255, 0, 0))
+        self.assertGreater(first.file_size, 0)
+        self.assertStats(self.user, 2, first.file_size + second.file_size, second)
+        self.assertStats(self.other, 0, 0, None)
+
+        second = Image.objects.get(pk=second.pk)
+        second.deleted_at = timezone.now()
+        second.save()
+        self.assertStats(self.user, 1, first.file_size, first)
+
+        # Moving between categories leaves the user aggregates alone.
+        second.deleted_at = None
+        second.category = self.animals
+        second.save()
+        self.assertStats(self.user, 2, first.file_size + second.file_size, second)
+
+        Image.objects.filter(pk=first.pk).delete()
+        self.assertStats(self.user, 1, second.file_size, second)
+        Image.objects.filter(pk=second.pk).delete()
+        self.assertStats(self.user, 0, 0, None)
+
+    def test_profile_save_keeps_stats(self):
+        user = get_user_model().objects.get(pk=self.user.pk)
+        image = self.create_image()
+        user.first_name = 'Test'
+        user.save()
+        self.assertStats(self.user, 1, image.file_size, image)
+        self.assertEqual(self.user.first_name, 'Test')
+
+    def test_rebuild_command(self):
+        image = self.create_image()
+        get_user_model().objects.update(image_count=42, image_bytes=1, last_upload_at=None)
+        call_command('rebuildstats', stdout=open(os.devnull, 'w'))
+        self.assertStats(self.user, 1, image.file_size, image)
+        self.assertStats(self.other, 0, 0, None)
+
+    def test_read_without_count_query(self):
+        self.create_image()
+        self.create_image(user=self.other)
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('image_board', args=['otheruser']))
+        self.assertEqual(response.context['image_count'], 1)
+        self.assertContains(response, '1 Posts', count=2)
+        token = RefreshToken.for_user(self.user).access_token
+        data = self.client.get('/api/v1/account/info', headers={'authorization': f'Bearer {token}'}).data
+        self.assertEqual((data['image_count'], data['last_upload_at'] is not None), (1, True))
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('image_board', args=['otheruser']))
+        self.assertFalse([_ for _ in queries if 'COUNT(' in _['sql']])
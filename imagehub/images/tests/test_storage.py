@@ -0,0 +1,106 @@
+import hashlib
+import os
+
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+
+from images.models import Category, Image
+from images.storage import hash_file
+from images.tests.utils import MediaTestMixin, generate_test_image
+
+
+class ContentAddressedStorageTest(MediaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = get_user_model().objects.create_user(username='testuser', password='testpassword')
+        self.category = Category.objects.create(name='Cars')
+
+    def files(self):
+        return sorted(os.listdir(os.path.join(self.media_root, 'images')))
+
+    def test_stored_by_content_hash(self):
+        image = self.create_image()
+        self.assertEqual(len(image.content_hash), 64)
+        self.assertEqual(image.file.name, f'images/{image.content_hash}.jpg')
+        with image.file.open('rb') as file:
+            self.assertEqual(hash_file(file), image.content_hash)
+
+    def test_duplicate_upload_shares_file(self):
+        first = self.create_image()
+        files = self.files()
+        second = self.create_image()
+
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertEqual(first.renditions, second.renditions)
+        self.assertEqual(self.files(), files)
+
+    def test_file_kept_until_last_reference(self):
+        first = self.create_image()
+        second = self.create_image()
+        path = os.path.join(self.media_root, first.file.name)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Image.objects.filter(pk=first.pk).delete()
+        self.assertTrue(os.path.isfile(path), 'A file still referenced by another image was removed')
+        for name in second.renditions.values():
+            self.assertTrue(os.path.isfile(os.path.join(self.media_root, name)))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Image.objects.filter(pk=second.pk).delete()
+        self.assertFalse(os.path.isfile(path), 'The file was not removed with its last reference')
+        self.assertEqual(self.files(), [])
+
+    def test_file_kept_on_rollback(self):
+        image = self.create_image()
+        path = os.path.join(self.media_root, image.file.name)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            try:
+                with transaction.atomic():
+                    Image.objects.filter(pk=image.pk).delete()
+                    raise IntegrityError
+            except IntegrityError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertTrue(os.path.isfile(path), 'The file was removed although the deletion rolled back')
+
+    def test_file_kept_when_reuploaded_before_commit(self):
+        image = self.create_image()
+        path = os.path.join(self.media_root, image.file.name)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Image.objects.filter(pk=image.pk).delete()
+            Image.objects.create(file=image.file.name, content_hash=image.content_hash, category=self.category,
+                                 user=self.user)
+        self.assertTrue(os.path.isfile(path), 'A file referenced again before commit was removed')
+
+    def test_file_restored_when_deleted_before_commit(self):
+        first = self.create_image()
+        path = os.path.join(self.media_root, first.file.name)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second = Image.objects.create(file=generate_test_image(), category=self.category, user=self.user)
+            # A purge that checked for references before this row existed.
+            os.remove(path)
+        self.assertEqual(second.file.name, first.file.name)
+        with open(path, 'rb') as file:
+            self.assertEqual(hashlib.sha256(file.read()).hexdigest(), first.content_hash)
+
+    def test_dedupe_command(self):
+        data = generate_test_image().read()
+        for name in ('legacy1.jpg', 'legacy2.jpg'):
+            Image._meta.get_field('file').storage.save(f'images/{name}', ContentFile(data))
+        Image.objects.bulk_create([
+            Image(file=f'images/{name}', category=self.category, user=self.user)
+            for name in ('legacy1.jpg', 'legacy2.jpg')
+        ])
+
+        call_command('dedupeimages', stdout=open(os.devnull, 'w'))
+
+        names = set(Image.objects.values_list('file', flat=True))
+        self.assertEqual(len(names), 1)
+        self.assertEqual(self.files(), [os.path.basename(names.pop())])
+        self.assertEqual(len(set(Image.objects.values_list('content_hash', flat=True))), 1)
@@ -0,0 +1,68 @@
+import hashlib
+import os
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.tokens import AccessToken
+
+from images.models import Category, Image
+from images.tests.utils import MediaTestMixin, generate_test_image
+
+
+class StreamingUploadTest(MediaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.data_auth = {'username': 'testuser', 'password': 'testpassword'}
+        self.user = get_user_model().objects.create_user(**self.data_auth)
+        self.category = Category.objects.create(name='Cars')
+        self.client.login(**self.data_auth)
+
+    def upload(self, data, name='test_image.jpg'):
+        return self.client.post(reverse('upload_image'), {
+            'file': SimpleUploadedFile(name, data, content_type='image/jpeg'),
+            'category': self.category.id,
+            'description': 'Streamed'
+        })
+
+    def test_upload_streams_and_hashes(self):
+        data = generate_test_image((100, 100)).read()
+        response = self.upload(data)
+        self.assertEqual(response.status_code, 302)
+
+        image = Image.objects.get()
+        self.assertEqual(image.content_hash, hashlib.sha256(data).hexdigest())
+        with open(os.path.join(self.media_root, image.file.name), 'rb') as file:
+            self.assertEqual(file.read(), data)
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'images', '.incoming')), [],
+                         'The spooled upload must be moved into place, not copied')
+
+    def test_api_upload_streams_and_hashes(self):
+        data = generate_test_image((100, 100)).read()
+        response = self.client.post(
+            reverse('api-image-upload'),
+            {'file': SimpleUploadedFile('test_image.jpg', data), 'category_id': self.category.id},
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Image.objects.get().content_hash, hashlib.sha256(data).hexdigest())
+
+    @override_settings(IMAGE_UPLOAD_MAX_BYTES=1024)
+    def test_byte_limit(self):
+        response = self.upload(generate_test_image((400, 400), fmt='png').read(), name='test_image.png')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('file', response.context['form'].errors)
+        self.assertFalse(Image.objects.exists())
+
+    @override_settings(IMAGE_UPLOAD_MAX_PIXELS=50 * 50)
+    def test_pixel_limit(self):
+        response = self.upload(generate_test_image((100, 100)).read())
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('file', response.context['form'].errors)
+        self.assertFalse(Image.objects.exists())
+
+    def test_not_an_image(self):
+        response = self.upload(b'not an image at all')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('file', response.context['form'].errors)
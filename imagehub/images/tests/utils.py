@@ -0,0 +1,44 @@
+import shutil
+import tempfile
+
+from PIL import Image as PILImage
+from io import BytesIO
+
+from django.test import override_settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from images.models import Image
+
+
+def generate_test_image(size=(10, 10), color=(0, 0, 255), fmt='jpeg', name='test_image.jpg'):
+    """An uploaded file holding a plain `size` image of `color`."""
+    img = PILImage.new('RGB', size, color)
+    img_file = BytesIO()
+    img.save(img_file, fmt)
+    return SimpleUploadedFile(name, img_file.getvalue(), content_type=f'image/{fmt}')
+
+
+class MediaTestMixin:
+    """Gives each test an empty MEDIA_ROOT and runs queued jobs eagerly."""
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(**self.get_settings())
+        self.override.enable()
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+        super().tearDown()
+
+    def get_settings(self):
+        return {'MEDIA_ROOT': self.media_root, 'JOBS_RUN_EAGER': True}
+
+    def create_image(self, file=None, category=None, user=None, **fields):
+        """Upload `file` (a generated image by default), running the jobs queued on commit."""
+        with self.captureOnCommitCallbacks(execute=True):
+            image = Image.objects.create(file=file or generate_test_image(), category=category or self.category,
+                                         user=user or self.user, **fields)
+        image.refresh_from_db()
+        return image
@@ -0,0 +1,81 @@
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile, UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopFutureHandlers
+
+from .storage import CHUNK_SIZE
+
+INCOMING_DIR = os.path.join('images', '.incoming')
+
+
+class IngestedImageFile(TemporaryUploadedFile):
+    """
+    An image upload spooled next to its final location in MEDIA_ROOT, so that
+    storing it is a rename rather than a copy. `content_hash` holds the SHA-256
+    of the body and `oversized` is set when it ran past IMAGE_UPLOAD_MAX_BYTES.
+    """
+
+    def __init__(self, name, content_type, size, charset, content_type_extra=None):
+        directory = os.path.join(settings.MEDIA_ROOT, INCOMING_DIR)
+        os.makedirs(directory, exist_ok=True)
+
+        _, ext = os.path.splitext(name)
+        file = tempfile.NamedTemporaryFile(suffix='.upload' + ext, dir=directory)
+        UploadedFile.__init__(self, file, name, content_type, size, charset, content_type_extra)
+        self.content_hash = None
+        self.oversized = False
+
+
+class ImageUploadHandler(FileUploadHandler):
+    """
+    Stream image fields of multipart bodies straight into MEDIA_ROOT, hashing
+    and counting bytes as chunks arrive. Other fields fall through to the next
+    handler. Bytes past the limit are discarded and the file is flagged for
+    the form field to reject, so memory stays flat whatever the upload size.
+    """
+    chunk_size = CHUNK_SIZE
+    field_names = ('file',)
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.active = field_name in self.field_names
+        if not self.active:
+            return
+
+        self.max_bytes = getattr(settings, 'IMAGE_UPLOAD_MAX_BYTES', 20 * 2 ** 20)
+        self.digest = hashlib.sha256()
+        self.file = IngestedImageFile(self.file_name, self.content_type, 0, self.charset, self.content_type_extra)
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.active:
+            return raw_data
+
+        if self.file.oversized or start + len(raw_data) > self.max_bytes:
+            self.file.oversized = True
+            return None
+
+        self.digest.update(raw_data)
+        self.file.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if not self.active:
+            return None
+
+        self.file.seek(0)
+        self.file.size = file_size
+        self.file.content_hash = None if self.file.oversized else self.digest.hexdigest()
+        return self.file
+
+    def upload_interrupted(self):
+        if getattr(self, 'active', False):
+            temp_location = self.file.temporary_file_path()
+            try:
+                self.file.close()
+                os.remove(temp_location)
+            except FileNotFoundError:
+                pass
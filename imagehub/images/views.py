@@ -1,14 +1,17 @@
-from django.contrib.auth import get_user_model
+from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse_lazy, reverse
 from django.utils import timezone
 from django.views import View
 from django.views.generic import ListView, CreateView, DetailView, UpdateView
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.db.models.functions import Random
 
 from .models import Category, Image
 from .forms import ImageUploadForm, ImageEditForm
+from .neighbors import get_neighbors
+from .resolver import ACCOUNT, CATEGORY, resolver
+from .sampling import sample_live_images
+from .search import search_images
 
 
 class IndexImageListView(ListView):
@@ -17,7 +20,7 @@ class IndexImageListView(ListView):
     context_object_name = 'images'
 
     def get_queryset(self):
-        return Image.objects.filter(deleted_at__isnull=True).order_by(Random())[:10]
+        return sample_live_images(10)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -31,7 +34,7 @@ class RecentsImageListView(ListView):
     context_object_name = 'images'
 
     def get_queryset(self):
-        return Image.objects.filter(deleted_at__isnull=True).order_by('-uploaded_at')[:10]
+        return Image.live.with_related().order_by('-uploaded_at', '-id')[:10]
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -40,6 +43,28 @@ class RecentsImageListView(ListView):
         return context
 
 
+class SearchImageListView(ListView):
+    model = Image
+    template_name = 'images/board.html'
+    context_object_name = 'images'
+    page_size = 10
+
+    def get_queryset(self):
+        self.query = self.request.GET.get('q', '').strip()
+        # One extra row tells whether there is a second page without counting the matches.
+        return search_images(Image.live.with_related(), self.query)[:self.page_size + 1]
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        images = list(context['images'])
+        context['images'] = images[:self.page_size]
+        context['next_page'] = 2 if len(images) > self.page_size else None
+        context['page_key'] = 'search'
+        context['query'] = self.query
+        context['title'] = f'Search: {self.query}' if self.query else 'Search'
+        return context
+
+
 class DynamicImageListView(ListView):
     model = Image
     template_name = 'images/board.html'
@@ -49,41 +74,43 @@ class DynamicImageListView(ListView):
         super().__init__(**kwargs)
         self.object_ = None
         self.switch_ = None
+        self.category = None
+        self.account = None
 
     def dispatch(self, request, *args, **kwargs):
         self.object_ = self.kwargs.get('object')
+        resolved = resolver.get_object(self.object_)
+        if resolved is None:
+            raise Http404('No category or account found matching the query')
 
-        if Category.objects.filter(slug__iexact=self.object_).exists():
-            self.switch_ = 'category'
+        self.switch_, owner = resolved
+        if self.switch_ == CATEGORY:
+            self.category = owner
         else:
-            self.switch_ = 'account'
+            self.account = owner
 
         return super().dispatch(request, *args, **kwargs)
 
     def get_queryset(self):
-        if self.switch_ == 'category':
-            category = get_object_or_404(Category, slug=self.object_)
-            return Image.objects.filter(category=category, deleted_at__isnull=True).order_by('-uploaded_at')[:10]
-
-        user = get_object_or_404(get_user_model(), username=self.object_)
-        return Image.objects.filter(user=user, deleted_at__isnull=True).order_by('-uploaded_at')[:10]
+        if self.switch_ == CATEGORY:
+            return Image.live.with_related().filter(category_id=self.category.id).order_by('-uploaded_at', '-id')[:10]
+        return Image.live.with_related().filter(user_id=self.account.id).order_by('-uploaded_at', '-id')[:10]
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['page_key'] = self.switch_
 
-        if self.switch_ == 'category':
-            context['category'] = get_object_or_404(Category, slug=self.object_)
-            context['images'] = self.get_queryset()
-            context['title'] = context['category'].name
+        if self.switch_ == CATEGORY:
+            context['category'] = self.category
+            context['title'] = self.category.name
             return context
 
-        context['account'] = get_object_or_404(get_user_model(), username=self.object_)
-        context['image_count'] = Image.objects.filter(user=context['account'], deleted_at__isnull=True).count()
+        context['account'] = self.account
+        context['image_count'] = self.account.image_count
         context['title'] = ' '.join([
-            context['account'].first_name,
-            context['account'].last_name,
-            f"(@{context['account'].username})"
+            self.account.first_name,
+            self.account.last_name,
+            f"(@{self.account.username})"
         ])
         return context
 
@@ -94,15 +121,7 @@ class CategoryListView(ListView):
     context_object_name = 'categories'
 
     def get_queryset(self):
-        categories = Category.objects.all()
-        for category in categories:
-            category.latest_image = Image.objects.filter(
-                category=category, deleted_at__isnull=True
-            ).order_by('-uploaded_at').first()
-            category.image_count = Image.objects.filter(
-                category=category, deleted_at__isnull=True
-            ).count()
-        return categories
+        return Category.objects.select_related('latest_image')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -143,60 +162,28 @@ class DynamicImageDetailView(DetailView):
         self.switch_ = None
 
     def dispatch(self, request, *args, **kwargs):
-        if Category.objects.filter(slug__iexact=self.kwargs.get('object')).exists():
-            self.switch_ = 'category'
-        else:
-            self.switch_ = 'account'
-
+        self.switch_ = resolver.get_kind(self.kwargs.get('object'))
         return super().dispatch(request, *args, **kwargs)
 
     def get_object(self):
-        return get_object_or_404(Image, id=self.kwargs['image_id'], user_id=self.kwargs['user_id'])
+        return get_object_or_404(Image.live.with_related(), id=self.kwargs['image_id'], user_id=self.kwargs['user_id'])
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        image = self.get_object()
-
-        if self.switch_ == 'category':
-            next_images = Image.objects.filter(
-                category=image.category,
-                uploaded_at__gt=image.uploaded_at,
-                deleted_at__isnull=True
-            ).order_by('uploaded_at')[:10]
-
-            if not next_images.exists():
-                next_images = Image.objects.filter(
-                    category=image.category,
-                    deleted_at__isnull=True
-                ).exclude(id=image.id).order_by('-uploaded_at')[:10]
+        image = self.object
 
-            context['next_images'] = next_images
+        neighbors = get_neighbors(image, self.switch_)
+        images = Image.live.with_related().in_bulk([neighbors.previous, *neighbors.following])
+        strip = [images[pk] for pk in neighbors.following if pk in images]
 
-            category = Image.objects.filter(category=image.category, deleted_at__isnull=True)
-            context['prev_image'] = category.filter(id__lt=image.id).order_by('-id').first()
-            context['next_image'] = category.filter(id__gt=image.id).order_by('id').first()
+        context['prev_image'] = images.get(neighbors.previous)
+        context['next_image'] = images.get(neighbors.next)
 
+        if self.switch_ == CATEGORY:
+            context['next_images'] = strip
             context['template_name'] = 'images/image_category.html'
-
         else:
-            user_images = Image.objects.filter(
-                user=image.user,
-                uploaded_at__gt=image.uploaded_at,
-                deleted_at__isnull=True
-            ).order_by('-uploaded_at')[:10]
-
-            if not user_images.exists():
-                user_images = Image.objects.filter(
-                    user=image.user,
-                    deleted_at__isnull=True
-                ).exclude(id=image.id).order_by('-uploaded_at')[:10]
-
-            context['user_images'] = user_images
-
-            account = Image.objects.filter(user=image.user, deleted_at__isnull=True)
-            context['prev_image'] = account.filter(id__lt=image.id).order_by('-id').first()
-            context['next_image'] = account.filter(id__gt=image.id).order_by('id').first()
-
+            context['user_images'] = strip
             context['template_name'] = 'images/image_account.html'
 
         if image.description:
@@ -211,7 +198,7 @@ class DynamicImageDetailView(DetailView):
 
         context['page_key'] = self.switch_
         context['category'] = image.category
-        context['account'] = image.user if self.switch_ == 'account' else False
+        context['account'] = image.user if self.switch_ == ACCOUNT else False
         return context
 
 
@@ -222,7 +209,7 @@ class ImageEditView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
     success_url = reverse_lazy('image_list')
 
     def get_object(self, queryset=None):
-        return get_object_or_404(Image, id=self.kwargs['image_id'], user__id=self.kwargs['user_id'])
+        return get_object_or_404(Image.live, id=self.kwargs['image_id'], user__id=self.kwargs['user_id'])
 
     def test_func(self):
         return self.request.user == self.get_object().user
@@ -245,11 +232,11 @@ class ImageEditView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
 
 class ImageDeleteView(LoginRequiredMixin, UserPassesTestMixin, View):
     def test_func(self):
-        image = get_object_or_404(Image, id=self.kwargs['image_id'])
-        return self.request.user == image.user
+        image = get_object_or_404(Image.live.only('id', 'user_id'), id=self.kwargs['image_id'])
+        return self.request.user.id == image.user_id
 
     def post(self, request, *args, **kwargs):
-        image = get_object_or_404(Image, id=self.kwargs['image_id'])
+        image = get_object_or_404(Image.live, id=self.kwargs['image_id'])
         image.deleted_at = timezone.now()
         image.save()
         return redirect(reverse('image_board', kwargs={'object': image.user.username}))
@@ -0,0 +1,280 @@
+import math
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from io import BytesIO
+
+import requests as http
+from PIL import Image as PILImage
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, connections
+from django.test import Client
+from django.urls import reverse
+
+from images.models import Category, Image
+
+from .instrumentation import percentile
+
+DEFAULT_MIX = {
+    'random': 3,
+    'recents': 3,
+    'category': 2,
+    'account': 2,
+    'detail': 3,
+    'after': 1,
+    'index': 1,
+    'board': 1,
+    'image': 1,
+    'upload': 0,
+}
+# Endpoints with a native async version under /api/v1/async/.
+ASYNC_ENDPOINTS = ('random', 'recents', 'category', 'account', 'detail', 'after')
+API_PREFIX = '/api/v1'
+ASYNC_API_PREFIX = '/api/v1/async'
+PAGE_SIZE = 25
+SAMPLE_SIZE = 1000
+
+
+def parse_mix(value):
+    """Parse "random=3,detail=1" into weights, keeping the defaults for endpoints that are not named."""
+    mix = dict(DEFAULT_MIX)
+    for item in filter(None, (value or '').split(',')):
+        name, _, weight = item.partition('=')
+        if name not in DEFAULT_MIX:
+            raise ValueError(f'Unknown endpoint "{name}", expected one of {", ".join(DEFAULT_MIX)}')
+        mix[name] = int(weight or 1)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def generate_upload():
+    buffer = BytesIO()
+    PILImage.new('RGB', (1200, 800), tuple(random.randrange(256) for _ in range(3))).save(buffer, 'jpeg')
+    return buffer.getvalue()
+
+
+class Targets:
+    """Ids, slugs and usernames sampled from the database for the requests to point at."""
+
+    def __init__(self):
+        images = list(Image.live.order_by('?').values_list('id', 'user_id', 'user__username', 'category__slug')
+                      [:SAMPLE_SIZE])
+        if not images:
+            raise ValueError('There are no images to benchmark against, run bulkimport first')
+
+        self.images = images
+        self.categories = list(Category.objects.filter(image_count__gt=0).values_list('slug', flat=True))
+        self.pages = max(1, math.ceil(Image.live.count() / PAGE_SIZE))
+
+    def build(self, name, prefix=API_PREFIX):
+        """Return (method, path) for one request to the named endpoint, API paths starting with `prefix`."""
+        image_id, user_id, username, slug = random.choice(self.images)
+        if name == 'random':
+            return 'get', f'{prefix}/images'
+        if name == 'recents':
+            # Skewed towards deep pages, which are the expensive ones with offset pagination.
+            return 'get', f'{prefix}/images/recents?p={math.ceil(self.pages * random.random() ** 0.5)}'
+        if name == 'category':
+            return 'get', f'{prefix}/images/category/{random.choice(self.categories)}'
+        if name == 'account':
+            return 'get', f'{prefix}/images/account/{username}'
+        if name == 'detail':
+            return 'get', f'{prefix}/image/id/{image_id}'
+        if name == 'after':
+            return 'get', f'{prefix}/image/id/{image_id}/after'
+        if name == 'index':
+            return 'get', reverse('index')
+        if name == 'board':
+            return 'get', reverse('image_board', args=[random.choice(self.categories)])
+        if name == 'image':
+            return 'get', reverse('image_open', args=[slug, user_id, image_id])
+        if name == 'upload':
+            return 'post', f'{API_PREFIX}/image/upload'
+        raise ValueError(name)
+
+
+class InProcessTransport:
+    """Calls the WSGI application through the test client in the worker thread, counting its queries."""
+    counts_queries = True
+
+    def __init__(self, token=None):
+        hosts = [_ for _ in settings.ALLOWED_HOSTS if _ != '*']
+        host = hosts[0].lstrip('.') if hosts else 'localhost'
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'} if token else dict()
+        self.local = threading.local()
+        self.defaults = {'HTTP_HOST': host, **headers}
+
+    @property
+    def client(self):
+        if not hasattr(self.local, 'client'):
+            self.local.client = Client(raise_request_exception=False, **self.defaults)
+        return self.local.client
+
+    def request(self, method, path, data=None):
+        queries = [0]
+
+        def count(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count):
+            response = getattr(self.client, method)(path, data) if data else getattr(self.client, method)(path)
+            # Streaming responses run their queries while being consumed.
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return response.status_code, queries[0]
+
+    def close(self):
+        connections.close_all()
+
+
+class HttpTransport:
+    """Sends requests to a running server over keep-alive connections, one session per worker thread."""
+    counts_queries = False
+
+    def __init__(self, base_url, token=None):
+        self.base_url = base_url.rstrip('/')
+        self.headers = {'Authorization': f'Bearer {token}'} if token else dict()
+        self.local = threading.local()
+
+    @property
+    def session(self):
+        if not hasattr(self.local, 'session'):
+            self.local.session = http.Session()
+            self.local.session.headers.update(self.headers)
+        return self.local.session
+
+    def request(self, method, path, data=None):
+        files = None
+        if data and 'file' in data:
+            data = dict(data)
+            files = {'file': data.pop('file')}
+        response = getattr(self.session, method)(self.base_url + path, data=data, files=files)
+        return response.status_code, None
+
+    def close(self):
+        pass
+
+
+@contextmanager
+def serve_asgi(workers=1, timeout=30):
+    """Run the ASGI application under uvicorn on a free local port and yield its base URL."""
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+
+    process = subprocess.Popen([
+        sys.executable, '-m', 'uvicorn', 'imagehub.asgi:application', '--host', '127.0.0.1', '--port', str(port),
+        '--workers', str(workers), '--no-access-log', '--log-level', 'warning'
+    ], cwd=settings.BASE_DIR)
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError('uvicorn exited during startup, is it installed?')
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError('uvicorn did not start listening in time')
+                time.sleep(0.1)
+        yield f'http://127.0.0.1:{port}'
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def get_upload_token(username):
+    return str(RefreshToken.for_user(get_user_model().objects.get(username=username)).access_token)
+
+
+def run(transport, targets, mix, requests, concurrency, warmup=0, prefix=API_PREFIX):
+    """Replay `requests` randomly mixed requests from `concurrency` threads and return the per-endpoint report."""
+    names, weights = list(mix), list(mix.values())
+    schedule = random.choices(names, weights, k=warmup + requests)
+    category_id = Category.objects.filter(slug__in=targets.categories).values_list('id', flat=True).first()
+
+    lock = threading.Lock()
+    position = [0]
+    measuring_since = [time.perf_counter()]
+    samples = defaultdict(list)
+
+    def next_request():
+        with lock:
+            if position[0] >= len(schedule):
+                return None, False
+            position[0] += 1
+            if position[0] == warmup + 1:
+                measuring_since[0] = time.perf_counter()
+            return schedule[position[0] - 1], position[0] > warmup
+
+    def worker():
+        try:
+            while True:
+                name, measured = next_request()
+                if name is None:
+                    break
+
+                method, path = targets.build(name, prefix)
+                data = None
+                if name == 'upload':
+                    # A fresh picture each time, so content deduplication does not turn uploads into no-ops.
+                    data = {'file': SimpleUploadedFile('loadtest.jpg', generate_upload(), content_type='image/jpeg'),
+                            'category_id': category_id}
+
+                started = time.perf_counter()
+                try:
+                    status, queries = transport.request(method, path, data)
+                except Exception:
+                    status, queries = None, None
+                elapsed = time.perf_counter() - started
+
+                if measured:
+                    with lock:
+                        samples[name].append((elapsed, status, queries))
+        finally:
+            transport.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - measuring_since[0]
+
+    return summarize(samples, duration, transport.counts_queries)
+
+
+def summarize(samples, duration, counts_queries=True):
+    def describe(items):
+        latencies = sorted(elapsed for elapsed, _, _ in items)
+        errors = sum(1 for _, status, _ in items if status is None or status >= 400)
+        report = {
+            'requests': len(items),
+            'errors': errors,
+            'rps': round(len(items) / duration, 2) if duration else None,
+            'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2) if latencies else None,
+        }
+        for percent in (50, 95, 99):
+            value = percentile(latencies, percent)
+            report[f'p{percent}_ms'] = round(value * 1000, 2) if value is not None else None
+        report['max_ms'] = round(latencies[-1] * 1000, 2) if latencies else None
+        if counts_queries:
+            queries = [count for _, _, count in items if count is not None]
+            report['queries'] = round(sum(queries) / len(queries), 2) if queries else None
+        return report
+
+    return {
+        'duration_s': round(duration, 3),
+        'endpoints': {name: describe(items) for name, items in sorted(samples.items())},
+        'total': describe([item for items in samples.values() for item in items]),
+    }
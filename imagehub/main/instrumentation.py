@@ -0,0 +1,144 @@
+import math
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+from django.conf import settings
+
+_current = ContextVar('request_metrics', default=None)
+_inactive = nullcontext()
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return None
+    return values[max(0, math.ceil(percent / 100 * len(values)) - 1)]
+
+
+class RequestMetrics:
+    """Counters for one request. Installed as a database execute wrapper, so it sees every query."""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.statements = Counter()
+        self.timings = defaultdict(float)
+        self.depth = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - started
+            self.queries += 1
+            self.statements[(sql, repr(params))] += 1
+
+    @property
+    def duplicates(self):
+        """Queries that repeat an earlier one with the same parameters."""
+        return sum(count - 1 for count in self.statements.values())
+
+    @property
+    def similar(self):
+        """Queries that repeat an earlier statement with other parameters, the signature of an N+1 loop."""
+        statements = Counter(sql for sql, _ in self.statements.elements())
+        return sum(count - 1 for count in statements.values()) - self.duplicates
+
+    @contextmanager
+    def timer(self, name):
+        # Only the outermost section counts, so a template rendering nested templates is not added up twice.
+        if self.depth[name]:
+            yield
+            return
+        self.depth[name] += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] += time.perf_counter() - started
+            self.depth[name] -= 1
+
+    def sample(self, total):
+        return {
+            'total_ms': total * 1000,
+            'queries': self.queries,
+            'sql_ms': self.sql_time * 1000,
+            'duplicates': self.duplicates,
+            'similar': self.similar,
+            'template_ms': self.timings['template'] * 1000,
+            'serializer_ms': self.timings['serializer'] * 1000,
+        }
+
+    def server_timing(self, total):
+        duplicates = f', {self.duplicates} duplicate' if self.duplicates else ''
+        return ', '.join([
+            f'db;dur={self.sql_time * 1000:.2f};desc="{self.queries} queries{duplicates}"',
+            f'tpl;dur={self.timings["template"] * 1000:.2f};desc="Templates"',
+            f'ser;dur={self.timings["serializer"] * 1000:.2f};desc="Serializers"',
+            f'total;dur={total * 1000:.2f}',
+        ])
+
+
+def current_metrics():
+    return _current.get()
+
+
+def timer(name):
+    """Time a section of the current request under `name`; a no-op when instrumentation is off."""
+    metrics = _current.get()
+    if metrics is None:
+        return _inactive
+    return metrics.timer(name)
+
+
+class TimedSerializerMixin:
+    """Count the time a serializer spends building its representation as serializer time."""
+
+    def to_representation(self, instance):
+        with timer('serializer'):
+            return super().to_representation(instance)
+
+
+class Aggregate:
+    """Rolling window of the latest request samples per URL name, shared by the threads of this process."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.windows = dict()
+
+    def record(self, key, sample):
+        size = getattr(settings, 'INSTRUMENTATION_WINDOW', 1000)
+        with self.lock:
+            window = self.windows.get(key)
+            if window is None or window.maxlen != size:
+                window = self.windows[key] = deque(window or (), maxlen=size)
+            window.append(sample)
+
+    def reset(self):
+        with self.lock:
+            self.windows.clear()
+
+    def snapshot(self):
+        with self.lock:
+            windows = {key: list(window) for key, window in self.windows.items()}
+
+        report = dict()
+        for key, samples in sorted(windows.items()):
+            totals = sorted(_['total_ms'] for _ in samples)
+            report[key] = {
+                'requests': len(samples),
+                'p50_ms': round(percentile(totals, 50), 2),
+                'p95_ms': round(percentile(totals, 95), 2),
+                'max_ms': round(totals[-1], 2),
+                'max_queries': max(_['queries'] for _ in samples),
+            }
+            for field in ('total_ms', 'queries', 'sql_ms', 'duplicates', 'similar', 'template_ms', 'serializer_ms'):
+                report[key][f'mean_{field}'] = round(sum(_[field] for _ in samples) / len(samples), 2)
+        return report
+
+
+aggregate = Aggregate()
@@ -0,0 +1,125 @@
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+registry = dict()
+failure_handlers = dict()
+
+
+def job(name, on_failure=None):
+    """
+    Register a function as the handler of jobs called `name`; the payload is
+    passed as keyword arguments. `on_failure` is called with the same payload
+    once the job has run out of attempts.
+    """
+    def decorator(func):
+        registry[name] = func
+        if on_failure is not None:
+            failure_handlers[name] = on_failure
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, key=None, priority=0, max_attempts=3):
+    """
+    Queue a job and return it. Jobs are idempotent on `key`: while a job with
+    the same key is queued or running, enqueueing it again returns the existing
+    row. A finished one is queued again. With JOBS_RUN_EAGER the job runs
+    immediately in the calling thread.
+    """
+    payload = payload or dict()
+    if key is None:
+        key = ':'.join([name, *(f'{k}={v}' for k, v in sorted(payload.items()))])
+
+    values = {'name': name, 'payload': payload, 'priority': priority, 'max_attempts': max_attempts}
+    instance, created = Job.objects.get_or_create(key=key, defaults=values)
+
+    if not created and instance.status in (Job.DONE, Job.FAILED):
+        # Keys are unique, so the finished row is reset rather than a new one inserted. The status condition
+        # makes it a compare-and-swap: of concurrent callers only one requeues it, the others get the result.
+        created = Job.objects.filter(pk=instance.pk, status=instance.status).update(
+            **values, status=Job.QUEUED, attempts=0, run_after=timezone.now(), locked_at=None, last_error='',
+            updated_at=timezone.now()
+        )
+        instance.refresh_from_db()
+
+    if created and getattr(settings, 'JOBS_RUN_EAGER', False):
+        Job.objects.filter(pk=instance.pk).update(status=Job.RUNNING, attempts=1, locked_at=timezone.now())
+        run_job(instance.pk)
+        instance.refresh_from_db()
+    return instance
+
+
+def claim(limit):
+    """Atomically move up to `limit` due jobs from queued to running and return their ids."""
+    now = timezone.now()
+    candidates = (Job.objects.filter(status=Job.QUEUED, run_after__lte=now)
+                  .order_by('-priority', 'run_after', 'id').values_list('id', 'attempts')[:limit])
+
+    claimed = list()
+    for pk, attempts in candidates:
+        # The status condition makes the claim a compare-and-swap, so concurrent workers never share a job.
+        if Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+                status=Job.RUNNING, attempts=attempts + 1, locked_at=now):
+            claimed.append(pk)
+    return claimed
+
+
+def requeue_stale(timeout):
+    """Return jobs whose worker died mid-run to the queue."""
+    return Job.objects.filter(status=Job.RUNNING, locked_at__lt=timezone.now() - timeout).update(
+        status=Job.QUEUED, locked_at=None)
+
+
+def prune_finished(age):
+    """Delete the jobs that have been done or failed for longer than `age`, returning how many were."""
+    count, _ = Job.objects.filter(status__in=[Job.DONE, Job.FAILED], updated_at__lt=timezone.now() - age).delete()
+    return count
+
+
+def run_job(pk):
+    """Run a claimed job, recording success, a delayed retry or the final failure."""
+    instance = Job.objects.get(pk=pk)
+
+    try:
+        handler = registry[instance.name]
+        handler(**instance.payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning('Job %s failed (attempt %s/%s)', instance.key, instance.attempts, instance.max_attempts)
+
+        if instance.attempts >= instance.max_attempts:
+            Job.objects.filter(pk=pk).update(status=Job.FAILED, last_error=error, locked_at=None,
+                                             updated_at=timezone.now())
+            on_failure = failure_handlers.get(instance.name)
+            if on_failure is not None:
+                try:
+                    on_failure(**instance.payload)
+                except Exception:
+                    logger.exception('Failure handler of job %s failed', instance.key)
+        else:
+            Job.objects.filter(pk=pk).update(
+                status=Job.QUEUED, last_error=error, locked_at=None, updated_at=timezone.now(),
+                run_after=timezone.now() + timedelta(seconds=2 ** instance.attempts)
+            )
+        return False
+
+    Job.objects.filter(pk=pk).update(status=Job.DONE, locked_at=None, updated_at=timezone.now())
+    return True
+
+
+def run_in_worker(pk):
+    """Entry point for pool workers, which own their database connections."""
+    close_old_connections()
+    try:
+        return run_job(pk)
+    finally:
+        close_old_connections()
@@ -0,0 +1,89 @@
+import json
+from contextlib import nullcontext
+
+from django.core.management import BaseCommand, CommandError
+
+from main.benchmark import (
+    API_PREFIX, ASYNC_API_PREFIX, ASYNC_ENDPOINTS, HttpTransport, InProcessTransport, Targets, get_upload_token,
+    parse_mix, run, serve_asgi
+)
+
+
+class Command(BaseCommand):
+    help = 'Replay a weighted mix of requests against the site and report latency percentiles as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help='Base URL of a running server (default: call the application in-process)')
+        parser.add_argument('--asgi', action='store_true',
+                            help='Start the ASGI application under uvicorn and send the requests to it')
+        parser.add_argument('--asgi-workers', type=int, default=1, help='Number of uvicorn worker processes')
+        parser.add_argument('--compare-async', action='store_true',
+                            help='Replay the read endpoints against both the DRF views and their async versions')
+        parser.add_argument('--requests', type=int, default=500, help='Number of measured requests')
+        parser.add_argument('--warmup', type=int, default=50, help='Requests sent before measuring')
+        parser.add_argument('--concurrency', type=int, default=4, help='Number of concurrent workers')
+        parser.add_argument('--mix', default='',
+                            help='Endpoint weights such as "random=3,detail=1,upload=1"; unnamed endpoints keep '
+                                 'their default weight and a weight of 0 disables one')
+        parser.add_argument('--user', help='Username uploads are sent as, required when the mix includes upload')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        if options['url'] and options['asgi']:
+            raise CommandError('--url and --asgi are mutually exclusive.')
+
+        try:
+            mix = parse_mix(options['mix'])
+            targets = Targets()
+        except ValueError as error:
+            raise CommandError(error)
+
+        if options['compare_async']:
+            mix = {name: weight for name, weight in mix.items() if name in ASYNC_ENDPOINTS}
+
+        token = None
+        if 'upload' in mix:
+            if not options['user']:
+                raise CommandError('Uploads need --user.')
+            token = get_upload_token(options['user'])
+
+        server = serve_asgi(options['asgi_workers']) if options['asgi'] else nullcontext(options['url'])
+        try:
+            with server as url:
+                def replay(prefix=API_PREFIX):
+                    transport = HttpTransport(url, token) if url else InProcessTransport(token)
+                    return run(transport, targets, mix, options['requests'], options['concurrency'],
+                               options['warmup'], prefix)
+
+                if options['compare_async']:
+                    report = {'sync': replay(), 'async': replay(ASYNC_API_PREFIX)}
+                    report['async_speedup'] = {
+                        name: round(report['async']['endpoints'][name]['rps'] / endpoint['rps'], 2)
+                        for name, endpoint in report['sync']['endpoints'].items()
+                        if name in report['async']['endpoints'] and endpoint['rps']
+                    }
+                    summary = report['async']['total']
+                else:
+                    report = replay()
+                    summary = report['total']
+        except RuntimeError as error:
+            raise CommandError(error)
+
+        report['config'] = {
+            'target': 'uvicorn' if options['asgi'] else options['url'] or 'in-process',
+            'requests': options['requests'],
+            'warmup': options['warmup'],
+            'concurrency': options['concurrency'],
+            'mix': mix,
+        }
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output)
+            self.stdout.write(self.style.SUCCESS(
+                f'{summary["requests"]} requests, {summary["rps"]} req/s, '
+                f'p95 {summary["p95_ms"]} ms; report written to {options["output"]}'
+            ))
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,74 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db import connections
+
+from main.jobs import claim, prune_finished, requeue_stale, run_in_worker
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs on a thread or process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'JOBS_WORKERS', 4),
+                            help='Number of jobs run concurrently')
+        parser.add_argument('--processes', action='store_true', default=getattr(settings, 'JOBS_USE_PROCESSES', False),
+                            help='Run jobs in worker processes instead of threads')
+        parser.add_argument('--poll', type=float, default=1.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--stale', type=int, default=600,
+                            help='Seconds after which a running job is considered abandoned and requeued')
+        parser.add_argument('--requeue-every', type=float, default=60.0,
+                            help='Seconds between checks for abandoned jobs while running')
+        parser.add_argument('--keep', type=int, default=getattr(settings, 'JOBS_KEEP_FINISHED_DAYS', 7),
+                            help='Days finished jobs are kept before being deleted')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is drained')
+
+    def requeue(self, stale):
+        requeued = requeue_stale(timedelta(seconds=stale))
+        if requeued:
+            self.stdout.write(self.style.WARNING(f'{requeued} abandoned jobs requeued'))
+
+    def handle(self, *args, **options):
+        self.requeue(options['stale'])
+        requeued_at = time.monotonic()
+        pruned = prune_finished(timedelta(days=options['keep']))
+        if pruned:
+            self.stdout.write(f'{pruned} finished jobs deleted')
+
+        if options['processes']:
+            executor = ProcessPoolExecutor(max_workers=options['workers'])
+        else:
+            executor = ThreadPoolExecutor(max_workers=options['workers'])
+
+        running, done, failed = set(), 0, 0
+        with executor:
+            while True:
+                # Other workers can crash at any time, not only before this one starts.
+                if time.monotonic() - requeued_at >= options['requeue_every']:
+                    self.requeue(options['stale'])
+                    requeued_at = time.monotonic()
+
+                free = options['workers'] - len(running)
+                claimed = claim(free) if free else list()
+                if claimed and options['processes']:
+                    # The pool forks its workers on submit, and they must not inherit the connection claim() used.
+                    connections.close_all()
+                running.update(executor.submit(run_in_worker, pk) for pk in claimed)
+
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll'])
+                    continue
+
+                finished, running = wait(running, timeout=options['poll'], return_when=FIRST_COMPLETED)
+                for future in finished:
+                    if future.result():
+                        done += 1
+                    else:
+                        failed += 1
+
+        self.stdout.write(self.style.SUCCESS(f'{done} jobs done, {failed} failed'))
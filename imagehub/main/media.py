@@ -0,0 +1,144 @@
+import mimetypes
+import os
+import posixpath
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from django.views.decorators.http import require_safe
+
+# Content hashes (images and their renditions) and uuid4 hex names (avatars) never change their bytes.
+IMMUTABLE_NAME = re.compile(r'^[0-9a-f]{32,64}(_[a-z]+)?\.\w+$')
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+DEFAULT_MAX_AGE = 60 * 60
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeFile:
+    """
+    Read at most `length` bytes of an open file from its current position.
+
+    Servers with a sendfile based wsgi.file_wrapper, such as gunicorn, stream
+    it straight from the descriptor, bounded by the Content-Length; others
+    read it in blocks through read().
+    """
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """Return the (start, end) byte positions of a single range header, None to ignore it."""
+    match = RANGE.match(header.replace(' ', ''))
+    if not match or not any(match.groups()):
+        # Malformed or multiple ranges: the whole file is a valid answer to either.
+        return None
+
+    start, end = match.groups()
+    if not start:
+        return max(0, size - int(end)), size - 1
+    return int(start), min(int(end), size - 1) if end else size - 1
+
+
+def is_immutable(name):
+    return bool(IMMUTABLE_NAME.match(posixpath.basename(name)))
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Serve a file from MEDIA_ROOT with validators, cache headers and byte ranges.
+
+    With MEDIA_OFFLOAD_HEADER set, the response is only headers and the front
+    proxy sends the file itself: X-Accel-Redirect for nginx, pointing into the
+    internal location at MEDIA_OFFLOAD_PREFIX, or X-Sendfile with the absolute
+    path for Apache and lighttpd. Range requests are then the proxy's job too.
+    Hidden files and directories, such as the upload spool, are never served.
+    """
+    path = posixpath.normpath(path).lstrip('/')
+    if any(part.startswith('.') for part in path.split('/')):
+        raise Http404('File not found')
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(fullpath)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404('File not found')
+    if not os.path.isfile(fullpath):
+        raise Http404('File not found')
+
+    size, modified = stat.st_size, int(stat.st_mtime)
+    etag = quote_etag(f'{modified:x}-{size:x}')
+    response = get_conditional_response(request, etag=etag, last_modified=modified)
+    if response is None:
+        response = build_response(request, path, fullpath, size, etag, modified)
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(modified)
+    max_age = IMMUTABLE_MAX_AGE if is_immutable(path) else DEFAULT_MAX_AGE
+    response['Cache-Control'] = f'public, max-age={max_age}' + (', immutable' if is_immutable(path) else '')
+    return response
+
+
+def build_response(request, path, fullpath, size, etag, modified):
+    content_type, encoding = mimetypes.guess_type(fullpath)
+    content_type = content_type or 'application/octet-stream'
+
+    offload = getattr(settings, 'MEDIA_OFFLOAD_HEADER', None)
+    if offload:
+        response = HttpResponse(content_type=content_type)
+        if offload.lower() == 'x-accel-redirect':
+            response[offload] = getattr(settings, 'MEDIA_OFFLOAD_PREFIX', '/protected-media/') + path
+        else:
+            response[offload] = fullpath
+        return response
+
+    start, end = 0, size - 1
+    byte_range = None
+    if 'range' in request.headers and size and if_range_matches(request, etag, modified):
+        byte_range = parse_range(request.headers['range'], size)
+    if byte_range is not None:
+        start, end = byte_range
+        if start > end:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    file = open(fullpath, 'rb')
+    file.seek(start)
+    response = FileResponse(RangeFile(file, end - start + 1), content_type=content_type)
+    if byte_range is not None:
+        response.status_code = 206
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = end - start + 1
+    response['Accept-Ranges'] = 'bytes'
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return response
+
+
+def if_range_matches(request, etag, modified):
+    """Whether a Range request applies to this version of the file, per its If-Range header."""
+    if_range = request.headers.get('if-range')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == modified
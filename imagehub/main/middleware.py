@@ -0,0 +1,53 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .instrumentation import RequestMetrics, _current, aggregate, current_metrics
+
+
+class InstrumentationMiddleware:
+    """
+    Per-request query and timing instrumentation, enabled with INSTRUMENTATION_ENABLED.
+
+    Records the query count, SQL time, repeated queries, template render time
+    and serializer time of every request, returns them in a Server-Timing
+    header and adds them to the rolling per URL name aggregate read by the
+    admin-only /api/v1/metrics endpoint.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'INSTRUMENTATION_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - started
+
+        match = request.resolver_match
+        aggregate.record(match.view_name if match else '<unresolved>', metrics.sample(total))
+        response['Server-Timing'] = metrics.server_timing(total)
+        return response
+
+    def process_template_response(self, request, response):
+        metrics = current_metrics()
+        if metrics is not None:
+            render = response.render
+
+            def timed_render():
+                with metrics.timer('template'):
+                    return render()
+            response.render = timed_render
+        return response
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 
 class CommandExecution(models.Model):
@@ -7,3 +8,33 @@ class CommandExecution(models.Model):
 
     def __str__(self):
         return f"{self.command_name} - {self.executed_at}"
+
+
+class Job(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    name = models.CharField(max_length=100)
+    key = models.CharField(max_length=255, unique=True)
+    payload = models.JSONField(default=dict, blank=True)
+    priority = models.SmallIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-priority', 'run_after', 'id'], condition=models.Q(status='queued'),
+                         name='job_queued_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.key}) - {self.status}"
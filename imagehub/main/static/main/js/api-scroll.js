@@ -1,6 +1,6 @@
 document.addEventListener("DOMContentLoaded", function () {
     let isLoading = false;
-    let page = 2;
+    let cursor = window.pageData.cursor;
     const limit = 10;
     let hasMore = true;
 
@@ -77,7 +77,13 @@ document.addEventListener("DOMContentLoaded", function () {
 
         if (newImages.length) {
             appendHtmlElements(htmlResults);
-        } else {
+        }
+
+        if (window.pageData.key !== "index") {
+            cursor = jsonData.next;
+        }
+
+        if (!newImages.length || cursor === null && window.pageData.key !== "index") {
             hasMore = false;
             showEndOfPosts();
         }
@@ -89,9 +95,18 @@ document.addEventListener("DOMContentLoaded", function () {
         showLoadingSpinner();
 
         let apiEndpoint = "";
-        let params = { limit, p: page };
+        let params = { limit, cursor: cursor || "" };
 
-        switch (window.pageData.key) {
+        if (window.pageData.imageId !== null) {
+            if (!cursor) {
+                hideLoadingSpinner();
+                isLoading = false;
+                hasMore = false;
+                return;
+            }
+            apiEndpoint = `image/id/${window.pageData.imageId}/after`;
+            params = { ...params, filter_by: window.pageData.key };
+        } else switch (window.pageData.key) {
             case "index":
                 apiEndpoint = "images";
                 params = {exclude: window.pageData.images.join(',')};
@@ -105,8 +120,16 @@ document.addEventListener("DOMContentLoaded", function () {
             case "account":
                 apiEndpoint = `images/account/${window.pageData.username}`;
                 break;
-            case "account" && window.pageData.imageId !== null:
-                apiEndpoint = `image/id/${window.pageData.imageId}/after`;
+            case "search":
+                if (!cursor) {
+                    hideLoadingSpinner();
+                    isLoading = false;
+                    hasMore = false;
+                    showEndOfPosts();
+                    return;
+                }
+                apiEndpoint = "images/search";
+                params = {q: window.pageData.query, p: cursor, limit};
                 break;
             default:
                 hideLoadingSpinner();
@@ -129,7 +152,6 @@ document.addEventListener("DOMContentLoaded", function () {
         }
 
         isLoading = false;
-        page++;
     }
 
     function checkScrollPosition() {
@@ -0,0 +1,68 @@
+import json
+import os
+
+from django.test import TransactionTestCase
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+
+from images.models import Category, Image
+from images.stats import refresh_category_stats
+from images.tests.utils import MediaTestMixin
+from main.benchmark import parse_mix, percentile
+
+
+class LoadTestCommandTest(MediaTestMixin, TransactionTestCase):
+    # Requests are replayed from worker threads, which only see committed rows.
+    def setUp(self):
+        super().setUp()
+        user = get_user_model().objects.create_user(username='testuser', password='testpassword')
+        category = Category.objects.create(name='Cars')
+        Image.objects.bulk_create([
+            Image(file=f'images/{index}.jpg', category=category, user=user) for index in range(30)
+        ])
+        refresh_category_stats()
+
+    def get_settings(self):
+        return {**super().get_settings(), 'JOBS_RUN_EAGER': False}
+
+    def test_report(self):
+        output = os.path.join(self.media_root, 'report.json')
+        # A single worker: the shared in-memory test database locks whole tables between threads.
+        call_command('loadtest', '--requests=40', '--warmup=5', '--concurrency=1', '--mix=upload=1',
+                     '--user=testuser', f'--output={output}', stdout=open(os.devnull, 'w'))
+
+        with open(output) as file:
+            report = json.load(file)
+
+        self.assertEqual(report['total']['requests'], 40)
+        self.assertEqual(report['total']['errors'], 0)
+        for name, endpoint in report['endpoints'].items():
+            self.assertLessEqual(endpoint['p50_ms'], endpoint['p99_ms'], name)
+            self.assertGreater(endpoint['queries'], 0, name)
+
+    def test_compare_async(self):
+        output = os.path.join(self.media_root, 'report.json')
+        call_command('loadtest', '--requests=20', '--warmup=0', '--concurrency=1', '--compare-async',
+                     f'--output={output}', stdout=open(os.devnull, 'w'))
+
+        with open(output) as file:
+            report = json.load(file)
+
+        self.assertEqual(report['sync']['total']['errors'], 0)
+        self.assertEqual(report['async']['total']['errors'], 0)
+        self.assertNotIn('index', report['config']['mix'])
+        self.assertTrue(set(report['async_speedup']) <= set(report['sync']['endpoints']))
+
+    def test_parse_mix(self):
+        mix = parse_mix('random=5,upload=2,index=0')
+        self.assertEqual(mix['random'], 5)
+        self.assertEqual(mix['upload'], 2)
+        self.assertNotIn('index', mix)
+        with self.assertRaises(ValueError):
+            parse_mix('unknown=1')
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertIsNone(percentile([], 95))
@@ -0,0 +1,75 @@
+import re
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+
+from images.models import Category, Image
+from main.instrumentation import RequestMetrics, aggregate
+
+
+@override_settings(INSTRUMENTATION_ENABLED=True)
+class InstrumentationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        aggregate.reset()
+        self.user = get_user_model().objects.create_user(username='testuser', password='testpassword')
+        self.category = Category.objects.create(name='Cars', slug='cars')
+        Image.objects.bulk_create([
+            Image(file=f'images/{_}.jpg', category=self.category, user=self.user) for _ in range(5)
+        ])
+
+    @staticmethod
+    def timings(response):
+        return dict(re.findall(r'(\w+);dur=([\d.]+)', response['Server-Timing']))
+
+    def test_server_timing_header(self):
+        response = self.client.get('/api/v1/images/recents')
+        self.assertIn('queries', response['Server-Timing'])
+        self.assertGreater(float(self.timings(response)['ser']), 0)
+
+        response = self.client.get(reverse('recents'))
+        self.assertGreater(float(self.timings(response)['tpl']), 0)
+
+    def test_aggregate_per_url_name(self):
+        for _ in range(3):
+            self.client.get(reverse('recents'))
+
+        views = aggregate.snapshot()
+        self.assertEqual(views['recents']['requests'], 3)
+        self.assertGreater(views['recents']['mean_queries'], 0)
+
+    def test_metrics_endpoint_is_admin_only(self):
+        self.client.get(reverse('recents'))
+        client = APIClient()
+        self.assertEqual(client.get(reverse('api-metrics')).status_code, 401)
+
+        client.force_authenticate(self.user)
+        self.assertEqual(client.get(reverse('api-metrics')).status_code, 403)
+
+        admin = get_user_model().objects.create_superuser(username='admin', password='testpassword')
+        client.force_authenticate(admin)
+        response = client.get(reverse('api-metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('recents', response.json()['views'])
+
+    @override_settings(INSTRUMENTATION_ENABLED=False)
+    def test_disabled(self):
+        response = self.client.get(reverse('recents'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_duplicate_queries(self):
+        metrics = RequestMetrics()
+
+        def execute(sql, params, many, context):
+            return None
+
+        for params in ((1,), (1,), (2,)):
+            metrics(execute, 'SELECT * FROM images_image WHERE id = %s', params, False, None)
+        metrics(execute, 'SELECT 1', (), False, None)
+
+        self.assertEqual(metrics.queries, 4)
+        self.assertEqual(metrics.duplicates, 1)
+        self.assertEqual(metrics.similar, 1)
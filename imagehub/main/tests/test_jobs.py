@@ -0,0 +1,123 @@
+import os
+from datetime import timedelta
+
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.core.management import call_command
+from django.utils import timezone
+
+from main import jobs
+from main.models import Job
+
+calls = list()
+failures = list()
+
+
+@jobs.job('tests.record')
+def record(value):
+    calls.append(value)
+
+
+@jobs.job('tests.fail', on_failure=lambda **payload: failures.append(payload))
+def fail(value=None):
+    raise RuntimeError('boom')
+
+
+@jobs.job('tests.abandon')
+def abandon(value):
+    # Leaves a job behind as a crashed worker would.
+    instance = jobs.enqueue('tests.record', {'value': value})
+    Job.objects.filter(pk=instance.pk).update(status=Job.RUNNING, locked_at=timezone.now() - timedelta(hours=1))
+
+
+class JobQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+        failures.clear()
+
+    def test_enqueue_is_idempotent(self):
+        first = jobs.enqueue('tests.record', {'value': 1})
+        second = jobs.enqueue('tests.record', {'value': 1})
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_finished_job_is_queued_again(self):
+        first = jobs.enqueue('tests.record', {'value': 1})
+        jobs.claim(1)
+        jobs.run_job(first.pk)
+
+        second = jobs.enqueue('tests.record', {'value': 1}, priority=5)
+        self.assertEqual(second.pk, first.pk)
+        self.assertEqual(second.status, Job.QUEUED)
+        self.assertEqual((second.attempts, second.priority), (0, 5))
+        self.assertEqual(jobs.claim(1), [first.pk])
+
+    def test_prune_finished(self):
+        done = jobs.enqueue('tests.record', {'value': 1})
+        queued = jobs.enqueue('tests.record', {'value': 2})
+        Job.objects.filter(pk=done.pk).update(status=Job.DONE)
+        Job.objects.filter(pk__in=[done.pk, queued.pk]).update(updated_at=timezone.now() - timedelta(days=10))
+
+        self.assertEqual(jobs.prune_finished(timedelta(days=7)), 1)
+        self.assertEqual(list(Job.objects.values_list('pk', flat=True)), [queued.pk])
+
+    def test_claim_orders_by_priority_and_is_exclusive(self):
+        low = jobs.enqueue('tests.record', {'value': 1})
+        high = jobs.enqueue('tests.record', {'value': 2}, priority=10)
+        later = jobs.enqueue('tests.record', {'value': 3})
+        Job.objects.filter(pk=later.pk).update(run_after=timezone.now() + timedelta(hours=1))
+
+        self.assertEqual(jobs.claim(10), [high.pk, low.pk])
+        self.assertEqual(jobs.claim(10), [])
+
+    def test_failed_job_is_retried_then_marked_failed(self):
+        instance = jobs.enqueue('tests.fail', {'value': 1}, max_attempts=2)
+
+        jobs.claim(1)
+        self.assertFalse(jobs.run_job(instance.pk))
+        instance.refresh_from_db()
+        self.assertEqual(instance.status, Job.QUEUED)
+        self.assertGreater(instance.run_after, timezone.now())
+        self.assertIn('boom', instance.last_error)
+        self.assertEqual(failures, [])
+
+        Job.objects.filter(pk=instance.pk).update(run_after=timezone.now())
+        jobs.claim(1)
+        jobs.run_job(instance.pk)
+        instance.refresh_from_db()
+        self.assertEqual(instance.status, Job.FAILED)
+        self.assertEqual(instance.attempts, 2)
+        self.assertEqual(failures, [{'value': 1}])
+
+    def test_stale_jobs_are_requeued(self):
+        instance = jobs.enqueue('tests.record', {'value': 1})
+        jobs.claim(1)
+        Job.objects.filter(pk=instance.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(jobs.requeue_stale(timedelta(minutes=10)), 1)
+        self.assertEqual(jobs.claim(1), [instance.pk])
+
+    @override_settings(JOBS_RUN_EAGER=True)
+    def test_eager_mode(self):
+        instance = jobs.enqueue('tests.record', {'value': 1})
+        self.assertEqual(calls, [1])
+        self.assertEqual(instance.status, Job.DONE)
+
+
+class RunJobsCommandTest(TransactionTestCase):
+    # Worker threads use their own connections, so the jobs must be committed.
+    def setUp(self):
+        calls.clear()
+
+    def test_runjobs_command(self):
+        for value in range(5):
+            jobs.enqueue('tests.record', {'value': value})
+
+        call_command('runjobs', '--once', '--workers=2', stdout=open(os.devnull, 'w'))
+        self.assertEqual(sorted(calls), list(range(5)))
+        self.assertFalse(Job.objects.exclude(status=Job.DONE).exists())
+
+    def test_runjobs_requeues_while_running(self):
+        jobs.enqueue('tests.abandon', {'value': 1})
+
+        call_command('runjobs', '--once', '--workers=1', '--requeue-every=0', stdout=open(os.devnull, 'w'))
+        self.assertEqual(calls, [1])
+        self.assertFalse(Job.objects.exclude(status=Job.DONE).exists())
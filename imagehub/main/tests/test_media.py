@@ -0,0 +1,100 @@
+import os
+
+from django.test import TestCase, override_settings
+from django.utils.http import http_date
+
+from images.tests.utils import MediaTestMixin
+from main.media import RangeFile, parse_range
+
+CONTENT = bytes(range(256)) * 40
+NAME = 'images/' + 'ab' * 32 + '.jpg'
+
+
+class MediaServingTest(MediaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        os.makedirs(os.path.join(self.media_root, 'images'))
+        with open(os.path.join(self.media_root, NAME), 'wb') as file:
+            file.write(CONTENT)
+        with open(os.path.join(self.media_root, 'notes.txt'), 'wb') as file:
+            file.write(b'plain')
+
+    def get(self, path=NAME, **headers):
+        return self.client.get(f'/media/{path}', headers=headers)
+
+    def test_full_file(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['Content-Length'], str(len(CONTENT)))
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+
+        response = self.get('notes.txt')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=3600')
+
+    def test_ranges(self):
+        for header, start, end in (('bytes=0-99', 0, 99), ('bytes=10000-', 10000, len(CONTENT) - 1),
+                                   ('bytes=-24', len(CONTENT) - 24, len(CONTENT) - 1),
+                                   ('bytes=100-999999', 100, len(CONTENT) - 1)):
+            response = self.get(range=header)
+            self.assertEqual(response.status_code, 206, header)
+            self.assertEqual(b''.join(response.streaming_content), CONTENT[start:end + 1], header)
+            self.assertEqual(response['Content-Range'], f'bytes {start}-{end}/{len(CONTENT)}', header)
+            self.assertEqual(response['Content-Length'], str(end - start + 1), header)
+
+        response = self.get(range=f'bytes={len(CONTENT)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(CONTENT)}')
+
+        # Several ranges and garbage are answered with the whole file.
+        self.assertEqual(self.get(range='bytes=0-1,5-6').status_code, 200)
+        self.assertEqual(self.get(range='lines=1-2').status_code, 200)
+
+    def test_if_range(self):
+        etag = self.get()['ETag']
+        self.assertEqual(self.get(range='bytes=0-9', if_range=etag).status_code, 206)
+        self.assertEqual(self.get(range='bytes=0-9', if_range='"stale"').status_code, 200)
+        self.assertEqual(self.get(range='bytes=0-9', if_range=http_date(0)).status_code, 200)
+
+    def test_conditional(self):
+        response = self.get()
+        self.assertEqual(self.get(if_none_match=response['ETag']).status_code, 304)
+        self.assertEqual(self.get(if_modified_since=response['Last-Modified']).status_code, 304)
+        self.assertEqual(self.client.post(f'/media/{NAME}').status_code, 405)
+
+    def test_missing_and_traversal(self):
+        self.assertEqual(self.get('images/missing.jpg').status_code, 404)
+        self.assertEqual(self.get('images').status_code, 404)
+        self.assertEqual(self.get('../settings.py').status_code, 404)
+        self.assertEqual(self.get('%2e%2e/%2e%2e/etc/passwd').status_code, 404)
+
+    def test_hidden_paths(self):
+        os.makedirs(os.path.join(self.media_root, 'images', '.incoming'))
+        for name in ('images/.incoming/upload.jpg', '.htaccess'):
+            with open(os.path.join(self.media_root, name), 'wb') as file:
+                file.write(b'private')
+            self.assertEqual(self.get(name).status_code, 404, name)
+        self.assertEqual(self.get('images/./.incoming/upload.jpg').status_code, 404)
+
+    @override_settings(MEDIA_OFFLOAD_HEADER='X-Accel-Redirect')
+    def test_accel_redirect(self):
+        response = self.get(range='bytes=0-9')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{NAME}')
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+
+    @override_settings(MEDIA_OFFLOAD_HEADER='X-Sendfile')
+    def test_sendfile(self):
+        response = self.get()
+        self.assertEqual(response['X-Sendfile'], os.path.join(self.media_root, NAME))
+
+    def test_range_file(self):
+        with open(os.path.join(self.media_root, NAME), 'rb') as file:
+            file.seek(10)
+            wrapper = RangeFile(file, 5)
+            self.assertEqual(wrapper.read(3) + wrapper.read(100) + wrapper.read(), CONTENT[10:15])
+            self.assertEqual(wrapper.fileno(), file.fileno())
+        self.assertIsNone(parse_range('bytes=-', 10))
@@ -0,0 +1,13 @@
+from django.core.exceptions import ValidationError
+from django.utils.text import slugify
+from unidecode import unidecode
+
+# Single segment pages of accounts.urls and images.urls. Category and account boards are served from the same
+# first segment, after them, so a category or user taking one of these names would never be reachable.
+RESERVED_SLUGS = frozenset({'signin', 'signup', 'recovery', 'logout', 'category', 'recents', 'upload', 'search'})
+
+
+def validate_unreserved_slug(value):
+    """Reject usernames, category names and slugs whose board URL a site page shadows."""
+    if slugify(unidecode(value or '')) in RESERVED_SLUGS:
+        raise ValidationError('"%(value)s" is reserved.', code='reserved', params={'value': value})